@@ -0,0 +1,98 @@
+"""Startup benchmark for the SWAWE dashboard: time to first paint.
+
+Every sample starts a fresh interpreter and runs the app once through
+Streamlit's AppTest, which is what a new server process does for its first
+session. The same AppTest is then rerun to measure the warm per-rerun cost.
+Heavy modules pulled in by the app's own first run are reported too, so a
+regression in lazy loading is visible next to the timings.
+
+    python bench_startup.py --runs 5 --reruns 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'swawe_final_dashboard.py')
+HEAVY_MODULES = ('pandas', 'plotly', 'requests', 'numpy')
+
+_SAMPLE_SCRIPT = r'''
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_import = time.perf_counter() - started
+
+app_path, reruns, heavy = sys.argv[1], int(sys.argv[2]), sys.argv[3].split(',')
+already_loaded = {name for name in heavy if name in sys.modules}
+
+at = AppTest.from_file(app_path, default_timeout=120)
+t0 = time.perf_counter()
+at.run()
+first_paint = time.perf_counter() - t0
+loaded_by_app = sorted(name for name in heavy if name in sys.modules and name not in already_loaded)
+
+rerun_times = []
+for _ in range(reruns):
+    t0 = time.perf_counter()
+    at.run()
+    rerun_times.append(time.perf_counter() - t0)
+
+print(json.dumps({
+    'streamlit_import': streamlit_import,
+    'first_paint': first_paint,
+    'reruns': rerun_times,
+    'loaded_by_app': loaded_by_app,
+    'exceptions': [str(e.value) for e in at.exception],
+}))
+'''
+
+
+def run_sample(reruns):
+    """Run one cold start in a fresh interpreter and return its measurements"""
+    result = subprocess.run(
+        [sys.executable, '-c', _SAMPLE_SCRIPT, APP_PATH, str(reruns), ','.join(HEAVY_MODULES)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(APP_PATH)
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="cold-start samples (fresh processes)")
+    parser.add_argument('--reruns', type=int, default=10, help="warm reruns per sample")
+    parser.add_argument('--json', action='store_true', help="print raw samples as JSON")
+    args = parser.parse_args()
+
+    samples = [run_sample(args.reruns) for _ in range(args.runs)]
+    if args.json:
+        print(json.dumps(samples, indent=2))
+        return
+
+    first_paint = [s['first_paint'] for s in samples]
+    reruns = [t for s in samples for t in s['reruns']]
+    imports = [s['streamlit_import'] for s in samples]
+
+    print(f"SWAWE startup benchmark ({args.runs} cold starts, {len(reruns)} warm reruns)")
+    print(f"  streamlit import      median {_ms(statistics.median(imports))}")
+    print(f"  first paint (cold)    median {_ms(statistics.median(first_paint))}   max {_ms(max(first_paint))}")
+    if reruns:
+        print(f"  rerun (warm)          median {_ms(statistics.median(reruns))}   max {_ms(max(reruns))}")
+    loaded = sorted({name for s in samples for name in s['loaded_by_app']})
+    print(f"  heavy modules loaded by empty app: {', '.join(loaded) if loaded else 'none'}")
+    errors = {e for s in samples for e in s['exceptions']}
+    for error in errors:
+        print(f"  app exception: {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""Concurrent-session load test for the SWAWE dashboard.
+
+Every concurrency level starts a real `streamlit run` server and connects N
+headless clients to it over the same websocket protocol a browser tab uses,
+all at once. Each client works through a realistic visit: page switches, a
+store and date-range change, a cost edit and a CSV export (including the
+download). Since the server is the real one, the shared caches, per-session
+script threads and GIL contention are exactly what viewers would hit.
+
+Data comes from synthetic Shopify orders that go through the real order
+processing and are saved as snapshots, so the server warm-starts from them
+like a restarted deployment does; no calls are made to Shopify. Reported per
+level: rerun latency percentiles (request sent until the script finished),
+the server's CPU use, and its resident memory (RSS) idle and at peak. Linux
+only, since CPU and RSS come from /proc.
+
+    python load_test.py --sessions 1,2,4,8 --rounds 2 --orders 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, datetime, timedelta
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'swawe_final_dashboard.py')
+STORES = [
+    {'name': 'load-alpha', 'url': 'load-alpha.myshopify.com', 'token': 'load-test'},
+    {'name': 'load-beta', 'url': 'load-beta.myshopify.com', 'token': 'load-test'},
+]
+PAGE_SELECTOR = "🎯 Choose Dashboard Section:"
+PAGES = ("Executive Dashboard", "Sales Analytics", "Product Intelligence", "Customer Intelligence",
+         "Scenario Explorer", "Data Management")
+# (item name, prices); the name rules classify them without a product catalog
+_PRODUCTS = [
+    ('Hoodie', (1499, 1999, 2499)),
+    ('T-Shirt', (799, 999, 1299)),
+    ('Cap', (499, 699)),
+]
+
+
+def make_orders(count, seed=0):
+    """Synthetic Shopify order payloads spread over roughly two years"""
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    step = timedelta(days=730) / max(count, 1)
+    orders = []
+    for i in range(count):
+        line_items = []
+        for j in range(rnd.randint(1, 3)):
+            index = rnd.randrange(len(_PRODUCTS))
+            kind, prices = _PRODUCTS[index]
+            product_id = (index + 1) * 100 + rnd.randint(1, 20)
+            line_items.append({
+                'id': i * 10 + j, 'name': f"{kind} {product_id}", 'price': str(rnd.choice(prices)),
+                'quantity': rnd.randint(1, 2), 'product_id': product_id, 'variant_id': product_id * 10 + 1,
+                'sku': f"{kind[:2].upper()}-{product_id}",
+            })
+        orders.append({
+            'id': 10_000 + i, 'name': f"#{1001 + i}", 'order_number': 1001 + i,
+            'created_at': (start + step * i).replace(microsecond=0).isoformat() + '+05:30',
+            'email': f"customer{rnd.randint(1, max(count // 4, 1))}@example.com",
+            'financial_status': rnd.choice(('paid', 'paid', 'paid', 'authorized', 'pending')),
+            'fulfillment_status': rnd.choice((None, 'fulfilled', 'fulfilled', 'fulfilled')),
+            'total_price': str(sum(float(item['price']) * item['quantity'] for item in line_items)),
+            'line_items': line_items,
+        })
+    return orders
+
+
+def seed_snapshots(directory, order_count):
+    """Process synthetic orders for every load-test store and save them as warm-start snapshots"""
+    import swawe_core
+    import swawe_settings
+    import swawe_snapshot
+
+    classifier = swawe_core.ProductClassifier()
+    # The key the app will find beside these snapshots, as no CUSTOMER_ID_KEY is set
+    customer_key = swawe_settings.customer_id_key('', directory)
+    for seed, store in enumerate(STORES):
+        orders = make_orders(order_count, seed)
+        rows = swawe_core.line_items_from_orders(orders, classifier, customer_key=customer_key)
+        pipeline = swawe_core.fold_pipeline(swawe_core.empty_pipeline(), orders)
+        swawe_snapshot.write_snapshot(directory, store['name'], swawe_core.build_sales_frame(rows, store['name']), {
+            'synced_at': datetime.now().isoformat(timespec='seconds'),
+            'pipeline': dict(pipeline, pending_orders_list=[
+                dict(order, store=store['name']) for order in pipeline['pending_orders_list']
+            ]),
+        })
+
+
+def write_secrets(directory, snapshot_dir):
+    """secrets.toml pointing the app at the load-test stores and snapshots"""
+    path = os.path.join(directory, 'secrets.toml')
+    with open(path, 'w') as secrets:
+        secrets.write(f"SNAPSHOT_DIR = {json.dumps(snapshot_dir)}\n")
+        for store in STORES:
+            secrets.write("\n[[stores]]\n" + "".join(f"{key} = {json.dumps(value)}\n" for key, value in store.items()))
+    return path
+
+
+class Server:
+    """The dashboard under `streamlit run` in its own process"""
+
+    def __init__(self, secrets_path):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', APP_PATH,
+             '--server.headless', 'true', '--server.address', '127.0.0.1', '--server.port', str(self.port),
+             '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false',
+             '--secrets.files', secrets_path],
+            cwd=os.path.dirname(APP_PATH), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"{self.url}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("streamlit did not become healthy in time")
+
+    def cpu_seconds(self):
+        with open(f"/proc/{self.process.pid}/stat") as stat:
+            # Fields after the parenthesised command name; utime and stime are 14th and 15th overall
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def rss_bytes(self):
+        with open(f"/proc/{self.process.pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class SessionClient:
+    """One headless browser tab: sends reruns with widget values and reads back the rendered elements.
+
+    Only the widgets a visit touches are tracked; the server keeps every
+    other widget's value from the previous run, as it does for a browser.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.widgets = {}
+        self.values = {}
+        self.errors = []
+        self.page_script_hash = ''
+        self.downloaded = 0
+        self._socket = None
+
+    async def connect(self):
+        import websockets
+
+        self._socket = await websockets.connect(
+            self.server.url.replace('http', 'ws', 1) + '/_stcore/stream',
+            subprotocols=['streamlit'], origin=self.server.url, max_size=None,
+        )
+
+    async def close(self):
+        await self._socket.close()
+
+    async def rerun(self, triggers=()):
+        """Rerun the script with the current widget values (plus one-shot button clicks); returns seconds taken"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        message = BackMsg()
+        message.rerun_script.page_script_hash = self.page_script_hash
+        states = message.rerun_script.widget_states.widgets
+        states.extend(self.values.values())
+        states.extend(WidgetState(id=widget_id, trigger_value=True) for widget_id in triggers)
+
+        started = time.perf_counter()
+        await self._socket.send(message.SerializeToString())
+        self.widgets = {}
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self._socket.recv())
+            kind = reply.WhichOneof('type')
+            if kind == 'new_session':
+                self.page_script_hash = reply.new_session.page_script_hash
+            elif kind == 'delta' and reply.delta.WhichOneof('type') == 'new_element':
+                self._read_element(reply.delta.new_element)
+            elif kind == 'script_finished' and reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                if reply.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors.append("script failed to compile")
+                return time.perf_counter() - started
+
+    def _read_element(self, element):
+        element_type = element.WhichOneof('type')
+        if element_type == 'exception' and not element.exception.is_warning:
+            self.errors.append(f"{element.exception.type}: {element.exception.message}")
+            return
+        widget = getattr(element, element_type)
+        if hasattr(widget, 'id') and hasattr(widget, 'label'):
+            self.widgets[widget.label] = widget
+
+    def widget(self, label):
+        """Widget of the last run whose label starts with `label`"""
+        return next(widget for widget_label, widget in self.widgets.items() if widget_label.startswith(label))
+
+    async def select(self, label, option):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self.widget(label)
+        self.values[widget.id] = WidgetState(id=widget.id, string_value=option)
+        return await self.rerun()
+
+    async def set_dates(self, label, start, end):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self.widget(label)
+        state = WidgetState(id=widget.id)
+        state.string_array_value.data.extend([start.isoformat(), end.isoformat()])
+        self.values[widget.id] = state
+        return await self.rerun()
+
+    async def increment(self, label):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self.widget(label)
+        current = self.values[widget.id].double_value if widget.id in self.values else widget.default
+        self.values[widget.id] = WidgetState(id=widget.id, double_value=min(current + widget.step, widget.max))
+        return await self.rerun()
+
+    async def click(self, label):
+        return await self.rerun(triggers=[self.widget(label).id])
+
+    async def download(self, label):
+        """Fetch a download button's file like the browser would; returns seconds taken"""
+        url = self.widget(label).url
+        started = time.perf_counter()
+        body = await asyncio.to_thread(lambda: urllib.request.urlopen(self.server.url + url, timeout=60).read())
+        self.downloaded += len(body)
+        return time.perf_counter() - started
+
+
+async def visit(client):
+    """One viewer's visit as (step, seconds) pairs; every step but the download is one rerun"""
+    steps = [('open', await client.rerun())]
+    for page in PAGES[1:]:
+        steps.append((f'page:{page}', await client.select(PAGE_SELECTOR, page)))
+    steps.append(('store view', await client.select("🏪 Store View", STORES[0]['name'])))
+    first_day = date.fromisoformat(client.widget("📅 Date Range").min.replace('/', '-'))
+    steps.append(('date range', await client.set_dates("📅 Date Range", first_day + timedelta(days=90), date.today())))
+    steps.append(('cost edit', await client.increment("🧥 Hoodie Base Cost")))
+    steps.append(('export', await client.click("📊 Export Complete Dataset")))
+    steps.append(('download', await client.download("💾 Download CSV File")))
+    steps.append(('page:Executive Dashboard', await client.select(PAGE_SELECTOR, PAGES[0])))
+    return steps
+
+
+async def _run_client(server, rounds, start):
+    client = SessionClient(server)
+    await client.connect()
+    await start.wait()
+    steps = []
+    try:
+        for _ in range(rounds):
+            steps.extend(await visit(client))
+    except Exception as e:
+        client.errors.append(f"visit aborted: {e!r}")
+    finally:
+        await client.close()
+    return steps, client.errors
+
+
+async def run_level(server, sessions, rounds):
+    """Drive `sessions` concurrent clients against a warmed-up server and measure it"""
+    # One untimed visit loads the snapshots into the server's shared store,
+    # as the first viewer after a restart would
+    warmup = SessionClient(server)
+    await warmup.connect()
+    await warmup.rerun()
+    await warmup.close()
+    idle_rss = server.rss_bytes()
+
+    start = asyncio.Event()
+    clients = [asyncio.create_task(_run_client(server, rounds, start)) for _ in range(sessions)]
+    peak_rss = idle_rss
+    cpu_before, wall_before = server.cpu_seconds(), time.perf_counter()
+    start.set()
+    while not all(client.done() for client in clients):
+        peak_rss = max(peak_rss, server.rss_bytes())
+        await asyncio.sleep(0.05)
+    wall = time.perf_counter() - wall_before
+    cpu = server.cpu_seconds() - cpu_before
+
+    samples = [sample for client in clients for sample in client.result()[0]]
+    return {
+        'sessions': sessions,
+        'reruns': [seconds for step, seconds in samples if step != 'download'],
+        'by_step': {step: statistics.median(s for name, s in samples if name == step) for step in dict(samples)},
+        'wall': wall,
+        'cpu': cpu,
+        'idle_rss': idle_rss,
+        'peak_rss': peak_rss,
+        'errors': sorted({error for client in clients for error in client.result()[1]})[:10],
+    }
+
+
+def measure(secrets_path, sessions, rounds):
+    """Run one concurrency level against its own fresh server"""
+    server = Server(secrets_path)
+    try:
+        server.wait_ready()
+        return asyncio.run(run_level(server, sessions, rounds))
+    finally:
+        server.stop()
+
+
+def _percentile(values, q):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+def _mb(nbytes):
+    return f"{nbytes / 2 ** 20:7.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', default='1,2,4,8', help="comma-separated concurrency levels")
+    parser.add_argument('--rounds', type=int, default=2, help="visits per session")
+    parser.add_argument('--orders', type=int, default=20000, help="synthetic orders per store")
+    parser.add_argument('--json', action='store_true', help="print raw measurements as JSON")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.sessions.split(',')]
+    with tempfile.TemporaryDirectory(prefix='swawe-load-') as workdir:
+        snapshot_dir = os.path.join(workdir, 'snapshots')
+        seed_snapshots(snapshot_dir, args.orders)
+        secrets_path = write_secrets(workdir, snapshot_dir)
+        results = [measure(secrets_path, sessions, args.rounds) for sessions in levels]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"SWAWE load test ({args.orders:,} orders per store, {len(STORES)} stores, "
+          f"{args.rounds} visits per session)")
+    print(f"  {'sessions':>8}  {'p50':>11}  {'p95':>11}  {'p99':>11}  {'reruns/s':>8}  {'CPU':>5}  "
+          f"{'idle RSS':>10}  {'peak RSS':>10}  {'per session':>11}")
+    for result in results:
+        reruns = result['reruns']
+        extra_rss = max(result['peak_rss'] - result['idle_rss'], 0)
+        print(f"  {result['sessions']:>8}  {_ms(_percentile(reruns, 50))}  {_ms(_percentile(reruns, 95))}  "
+              f"{_ms(_percentile(reruns, 99))}  {len(reruns) / result['wall']:>8.1f}  "
+              f"{result['cpu'] / result['wall'] * 100:>4.0f}%  {_mb(result['idle_rss'])}  "
+              f"{_mb(result['peak_rss'])}  {_mb(extra_rss / result['sessions'])}")
+    busiest = results[-1]
+    print(f"  slowest steps at {busiest['sessions']} sessions (median): " + ", ".join(
+        f"{step} {seconds * 1000:.0f} ms"
+        for step, seconds in sorted(busiest['by_step'].items(), key=lambda item: -item[1])[:3]
+    ))
+    for error in sorted({error for result in results for error in result['errors']}):
+        print(f"  session error: {error}")
+
+
+if __name__ == '__main__':
+    main()
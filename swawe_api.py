@@ -0,0 +1,193 @@
+"""Read-only JSON endpoint for the Command Center's headline figures.
+
+    GET /summary[?days=N]   revenue, orders, profit, margin and cash-flow
+                            pipeline counts per store and combined, over
+                            all history or the last N days of each store
+    GET /health             liveness check
+
+Monitoring screens, chat bots and scripts can poll this instead of opening a
+Streamlit session. Every response carries an ETag that is derived from the
+stores' data versions, when each was published, and an id drawn once per
+server process, so a restarted server never revalidates data it did not
+serve. A poll that sends it back in If-None-Match gets
+304 Not Modified without any figures being computed, and a changed version
+computes them once for every poller.
+
+The server runs in a thread of the dashboard process when SUMMARY_API_PORT
+is set, and reads the live shared store. It can also run from the saved
+snapshots with ``python swawe_cli.py serve``. Profit is priced at the default
+cost settings a new dashboard session starts with, because the server has no
+session to take costs from. Only the standard library is imported here; the
+figures come from swawe_core.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Cost settings a new dashboard session starts from
+DEFAULT_COSTS = {
+    'hoodie_base_cost': 500,
+    'tshirt_base_cost': 210,
+    'additional_cost': 370,
+}
+# Versions restart at 1 in every process, so ETags also carry this process's id
+_BOOT_ID = os.urandom(8).hex()
+PIPELINE_COUNTS = ['total_pending_count', 'total_pending_revenue', 'orders_to_fulfill_count',
+                   'orders_to_fulfill_revenue', 'payments_to_capture_count', 'payments_to_capture_revenue']
+
+
+def headline_metrics(partition, costs, days=None):
+    """Revenue, orders, units, profit and margin of one partition, optionally over its last ``days`` days"""
+    import numpy as np
+    import pandas as pd
+    import swawe_core
+
+    frame = partition.frame
+    if days:
+        since = frame['date'].iloc[-1] - pd.Timedelta(days=days - 1)
+        frame = frame.iloc[frame['date'].searchsorted(since, side='left'):]
+    key_costs = swawe_core.unit_costs(
+        partition.cost_keys, pd.Series(dtype=float),
+        {'Hoodies': costs['hoodie_base_cost'], 'T-Shirts': costs['tshirt_base_cost']},
+        # Categories without their own cost are costed like t-shirts, as in the dashboard
+        costs['tshirt_base_cost'], costs['additional_cost']
+    )
+    # Units per cost key priced once, instead of joining a cost onto every row
+    units_per_key = np.bincount(frame['cost_code'].to_numpy(), weights=frame['quantity'].to_numpy(dtype=float),
+                                minlength=len(key_costs))
+    revenue = float(frame['selling_price'].sum())
+    profit = revenue - float(units_per_key @ key_costs)
+    return {
+        'revenue': round(revenue, 2),
+        'orders': int(frame['order_name'].nunique()),
+        'line_items': len(frame),
+        'units': int(frame['quantity'].sum()),
+        'profit': round(profit, 2),
+        'margin': round(profit / revenue * 100, 2) if revenue else 0.0,
+        'first_day': f"{frame['date'].iloc[0]:%Y-%m-%d}" if len(frame) else None,
+        'last_day': f"{frame['date'].iloc[-1]:%Y-%m-%d}" if len(frame) else None,
+    }
+
+
+class SummarySource:
+    """Headline figures of a SharedSalesStore's stores, memoized per data version.
+
+    ``refresh`` runs before each read. The CLI server uses it to pick up
+    snapshots that a dashboard has saved since the last read.
+    """
+
+    def __init__(self, sales_store, store_names, costs=None, refresh=None, cache_size=16):
+        self.sales_store = sales_store
+        self.store_names = list(store_names)
+        self.costs = dict(costs or DEFAULT_COSTS)
+        self.refresh = refresh
+        self.cache_size = cache_size
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def partitions(self):
+        if self.refresh is not None:
+            with self._lock:
+                self.refresh()
+        partitions = {name: self.sales_store.get(name) for name in self.store_names}
+        return {name: partition for name, partition in partitions.items() if partition is not None}
+
+    @staticmethod
+    def etag(partitions, days):
+        versions = ','.join(f"{name}:{partition.version}:{partition.meta.get('published_ns')}"
+                            for name, partition in sorted(partitions.items()))
+        return '"' + hashlib.blake2b(f"{_BOOT_ID}|{versions}|{days}".encode(), digest_size=12).hexdigest() + '"'
+
+    def payload(self, partitions, days):
+        """JSON-ready figures for these partitions, computed once per ETag"""
+        etag = self.etag(partitions, days)
+        with self._lock:
+            cached = self._payloads.get(etag)
+        if cached is not None:
+            return cached
+
+        stores = {}
+        for name, partition in partitions.items():
+            figures = headline_metrics(partition, self.costs, days)
+            pipeline = partition.meta.get('pipeline') or {}
+            figures['pipeline'] = {key: pipeline.get(key, 0) for key in PIPELINE_COUNTS}
+            figures['synced_at'] = partition.meta.get('synced_at')
+            stores[name] = figures
+        total = {key: sum(figures[key] for figures in stores.values())
+                 for key in ('revenue', 'orders', 'line_items', 'units', 'profit')}
+        total['margin'] = round(total['profit'] / total['revenue'] * 100, 2) if total['revenue'] else 0.0
+        total['pipeline'] = {key: sum(figures['pipeline'][key] for figures in stores.values())
+                             for key in PIPELINE_COUNTS}
+        body = json.dumps({
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'days': days,
+            'costs': self.costs,
+            'stores': stores,
+            'total': total,
+        }, default=str).encode('utf-8')
+        with self._lock:
+            if len(self._payloads) >= self.cache_size:
+                self._payloads.pop(next(iter(self._payloads)))
+            self._payloads[etag] = body
+        return body
+
+
+def _make_handler(source):
+    class SummaryHandler(BaseHTTPRequestHandler):
+        server_version = 'SWAWESummary/1.0'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/health':
+                return self._send(200, b'{"status":"ok"}')
+            if url.path not in ('/summary', '/summary.json'):
+                return self._send(404, b'{"error":"not found"}')
+            days = parse_qs(url.query).get('days', [None])[0]
+            if days is not None and (not days.isdigit() or int(days) < 1):
+                return self._send(400, b'{"error":"days must be a positive integer"}')
+            days = int(days) if days else None
+
+            partitions = source.partitions()
+            if not partitions:
+                return self._send(503, b'{"error":"no store data loaded yet"}')
+            etag = source.etag(partitions, days)
+            if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+                return self._send(304, None, etag)
+            self._send(200, source.payload(partitions, days), etag)
+
+        def _send(self, status, body, etag=None):
+            self.send_response(status)
+            if etag is not None:
+                self.send_header('ETag', etag)
+            # Clients may keep the response but must revalidate it with the ETag
+            self.send_header('Cache-Control', 'no-cache')
+            if body is not None:
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body is not None:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Polled every few seconds; access logs would drown everything else
+            pass
+
+    return SummaryHandler
+
+
+def make_server(source, host, port):
+    """HTTP server answering each request on its own thread; call serve_forever() to run it"""
+    server = ThreadingHTTPServer((host, port), _make_handler(source))
+    server.daemon_threads = True
+    return server
+
+
+def start_server(source, host, port):
+    """Serve in a daemon thread next to the caller, returning the server"""
+    server = make_server(source, host, port)
+    threading.Thread(target=server.serve_forever, name='swawe-summary-api', daemon=True).start()
+    return server
@@ -0,0 +1,92 @@
+"""Local archive of the raw order JSON each store's syncs downloaded.
+
+Every page of orders a sync receives is kept as one gzip-compressed JSON
+chunk, named by arrival time so the archive replays in download order. Next
+to the chunks sits the product catalog the sync classified with. Together
+they let swawe_core.reprocess_archive() rebuild a store's line items after a
+processing change, such as a new classification rule or a parsing fix,
+without calling the API.
+
+A full sync that starts from the first page resets the archive, so it holds
+exactly what the published data was built from. A sync that resumes from a
+checkpoint keeps the chunks, and later incremental fetches append to them.
+Only the standard library is used here.
+"""
+import gzip
+import json
+import os
+import shutil
+import time
+
+from swawe_settings import store_path
+
+CHUNK_SUFFIX = '.json.gz'
+_PRODUCTS_FILE = 'products.json.gz'
+
+
+def archive_dir(directory, store_name):
+    """Directory holding one store's raw order chunks"""
+    return store_path(directory, store_name, '.raw')
+
+
+def _write_json_gz(path, payload):
+    # Written beside the target and renamed, so readers never see half a chunk
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as archive_file:
+        json.dump(payload, archive_file, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def read_chunk(path):
+    """Orders stored in one archive chunk"""
+    with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+        return json.load(archive_file)
+
+
+class RawOrderArchive:
+    """Raw order pages of one store, appended as compressed chunks"""
+
+    def __init__(self, directory, store_name):
+        self.path = archive_dir(directory, store_name)
+
+    def reset(self):
+        """Drop every chunk before a full download starts over.
+
+        Nothing else may append to or read the archive meanwhile; the
+        dashboard holds the store's sync lock around it.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def append(self, orders):
+        """Archive one batch of orders as they came from the API"""
+        if not orders:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        _write_json_gz(os.path.join(self.path, f"{time.time_ns():020d}{CHUNK_SUFFIX}"), orders)
+
+    def chunks(self):
+        """Chunk paths in the order they were archived"""
+        try:
+            names = sorted(name for name in os.listdir(self.path) if name.endswith(CHUNK_SUFFIX)
+                           and name != _PRODUCTS_FILE)
+        except OSError:
+            return []
+        return [os.path.join(self.path, name) for name in names]
+
+    def nbytes(self):
+        """Compressed size of the archived chunks"""
+        return sum(os.path.getsize(path) for path in self.chunks())
+
+    def save_products(self, products):
+        """Keep the catalog ({product_id: metadata}) that orders were classified with"""
+        os.makedirs(self.path, exist_ok=True)
+        _write_json_gz(os.path.join(self.path, _PRODUCTS_FILE),
+                       [[product_id, metadata] for product_id, metadata in products.items()])
+
+    def load_products(self):
+        """The archived catalog, or {} when none was saved"""
+        try:
+            return {product_id: metadata for product_id, metadata
+                    in read_chunk(os.path.join(self.path, _PRODUCTS_FILE))}
+        except (OSError, ValueError):
+            return {}
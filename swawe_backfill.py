@@ -0,0 +1,92 @@
+"""Checkpoints that let an interrupted order download resume where it stopped.
+
+While a store syncs, every processed page of line items is committed next to
+the snapshots as its own small Arrow file, followed by a JSON checkpoint
+holding the next-page cursor and the running totals. If the sync stops on an
+API error or a crash, the next one reloads the committed pages and asks
+Shopify only for the pages after them. The checkpoint is cleared once a
+complete download has been published.
+
+The checkpoint file is replaced atomically after its page file is written, so
+it never refers to a page that is not on disk; a page written by a run that
+died before updating the checkpoint is simply overwritten on resume.
+pyarrow is imported by the functions that read or write pages.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+from swawe_settings import store_path
+
+_CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def backfill_dir(directory, store_name):
+    """Directory holding one store's in-progress download"""
+    return store_path(directory, store_name, '.backfill')
+
+
+class BackfillCheckpoint:
+    """Committed pages and pagination cursor of one store's download.
+
+    load() returns the saved state (or None), commit() adds one processed
+    page and clear() discards everything once the download has completed.
+    """
+
+    def __init__(self, directory, store_name):
+        self.path = backfill_dir(directory, store_name)
+
+    def _page_path(self, page):
+        return os.path.join(self.path, f"page-{page:06d}.arrow")
+
+    def state(self):
+        """Saved cursor and totals without the committed rows, or None"""
+        try:
+            with open(os.path.join(self.path, _CHECKPOINT_FILE), encoding='utf-8') as checkpoint_file:
+                return json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return None
+
+    def load(self):
+        """Saved state with the line-item rows of every committed page under 'rows', or None"""
+        import pyarrow as pa
+
+        state = self.state()
+        if state is None:
+            return None
+        rows = []
+        try:
+            for page in range(1, state['pages'] + 1):
+                with pa.memory_map(self._page_path(page), 'r') as source:
+                    rows.extend(pa.ipc.open_file(source).read_all().to_pylist())
+        except (OSError, pa.ArrowInvalid):
+            # A damaged checkpoint is worth less than a clean restart
+            self.clear()
+            return None
+        return dict(state, rows=rows)
+
+    def commit(self, page_rows, next_url, state):
+        """Persist one processed page, then move the cursor past it.
+
+        ``state`` carries the running totals after this page (pages, orders,
+        min_order, max_order, total, pipeline); next_url is None after the
+        last page.
+        """
+        import pyarrow as pa
+
+        os.makedirs(self.path, exist_ok=True)
+        table = pa.Table.from_pylist(page_rows)
+        with pa.OSFile(self._page_path(state['pages']), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        checkpoint_path = os.path.join(self.path, _CHECKPOINT_FILE)
+        temp_path = f"{checkpoint_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(dict(state, next_url=next_url, updated_at=datetime.now().isoformat(timespec='seconds')),
+                      checkpoint_file, default=str)
+        os.replace(temp_path, checkpoint_path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,158 @@
+"""Plotly figure builders for the SWAWE dashboard pages.
+
+Importing this module pulls in plotly, so the dashboard only imports it once a
+page actually has data to chart.
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+SWAWE_ORANGE = '#FF6B35'
+SWAWE_TEAL = '#00D4AA'
+
+
+def _apply_premium_layout(fig, **overrides):
+    """Shared transparent dark styling used by every dashboard chart"""
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12),
+        title_font_size=16,
+        **overrides
+    )
+    return fig
+
+
+def monthly_trend_figure(monthly_data):
+    """Monthly revenue and profit lines (expects month, selling_price, profit columns)"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=monthly_data['month'], y=monthly_data['selling_price'],
+                             mode='lines+markers', name='Revenue',
+                             line=dict(color=SWAWE_ORANGE, width=4),
+                             marker=dict(size=10, color=SWAWE_ORANGE)))
+    fig.add_trace(go.Scatter(x=monthly_data['month'], y=monthly_data['profit'],
+                             mode='lines+markers', name='Profit',
+                             line=dict(color=SWAWE_TEAL, width=4),
+                             marker=dict(size=10, color=SWAWE_TEAL)))
+
+    return _apply_premium_layout(
+        fig,
+        title="📈 Monthly Performance Trend",
+        xaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
+        legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
+    )
+
+
+def category_performance_figure(category_data):
+    """Grouped revenue/profit bars per category"""
+    fig = px.bar(category_data, x='category', y=['selling_price', 'profit'],
+                 title="📊 Category Performance", barmode='group',
+                 color_discrete_sequence=[SWAWE_ORANGE, SWAWE_TEAL])
+    return _apply_premium_layout(
+        fig,
+        legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
+    )
+
+
+def daily_sales_figure(daily_sales, rolling=None):
+    """Daily revenue line (expects date and selling_price columns), with an optional
+    date-indexed rolling-average overlay"""
+    fig = px.line(daily_sales, x='date', y='selling_price',
+                  title="📈 Daily Sales Performance",
+                  color_discrete_sequence=[SWAWE_ORANGE])
+    fig.update_traces(line=dict(width=4), marker=dict(size=8))
+    if rolling is not None:
+        fig.add_trace(go.Scatter(x=rolling.index, y=rolling['selling_price'],
+                                 mode='lines', name='7-day average',
+                                 line=dict(color=SWAWE_TEAL, width=3, dash='dot')))
+        fig.update_layout(legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white')))
+    return _apply_premium_layout(fig)
+
+
+def top_products_figure(product_sales):
+    """Top products by revenue, indexed by item name"""
+    fig = px.bar(product_sales, x=product_sales.index, y='selling_price',
+                 title="🏆 Top 10 Products by Revenue",
+                 color_discrete_sequence=[SWAWE_ORANGE])
+    return _apply_premium_layout(fig, xaxis_tickangle=-45)
+
+
+def category_profit_figure(category_profit):
+    """Profit share pie from a category-indexed profit series"""
+    fig = px.pie(values=category_profit.values, names=category_profit.index,
+                 title="💰 Profit Distribution by Category",
+                 color_discrete_sequence=[SWAWE_ORANGE, SWAWE_TEAL])
+    return _apply_premium_layout(fig)
+
+
+def cohort_retention_figure(retention):
+    """Heatmap of % of each monthly cohort ordering again N months after its first order"""
+    fig = px.imshow(retention, text_auto='.0f', aspect='auto',
+                    labels=dict(x="Months since first order", y="Cohort", color="Active %"),
+                    title="🧊 Monthly Cohort Retention (%)",
+                    color_continuous_scale=[[0, 'rgba(0,212,170,0.05)'], [1, SWAWE_TEAL]])
+    return _apply_premium_layout(fig, xaxis=dict(dtick=1))
+
+
+def new_customers_figure(cohort_sizes):
+    """New customers acquired per month, from a month-indexed cohort size series"""
+    fig = px.bar(x=cohort_sizes.index, y=cohort_sizes.values,
+                 labels=dict(x="Month", y="New customers"),
+                 title="🌱 New Customers per Month",
+                 color_discrete_sequence=[SWAWE_ORANGE])
+    return _apply_premium_layout(fig)
+
+
+def scenario_surface_figure(surface, hoodie_costs, tshirt_costs, title, value_label, current=None):
+    """Heatmap of a hoodie x t-shirt cost grid (surface rows follow hoodie_costs), with the
+    current (hoodie, t-shirt) costs marked when given"""
+    fig = go.Figure(go.Heatmap(z=surface, x=tshirt_costs, y=hoodie_costs,
+                               colorscale=[[0, 'rgba(255,107,53,0.15)'], [1, SWAWE_TEAL]],
+                               colorbar=dict(title=value_label),
+                               hovertemplate="👕 ₹%{x}<br>🧥 ₹%{y}<br>" + value_label + ": %{z:,.1f}<extra></extra>"))
+    if current is not None:
+        fig.add_trace(go.Scatter(x=[current[1]], y=[current[0]], mode='markers', name='Current costs',
+                                 marker=dict(symbol='x', size=14, color='white')))
+    return _apply_premium_layout(
+        fig,
+        title=title,
+        xaxis=dict(title="👕 T-Shirt Base Cost (₹)"),
+        yaxis=dict(title="🧥 Hoodie Base Cost (₹)"),
+        showlegend=False
+    )
+
+
+def scenario_additional_figure(additional_costs, profit, margin):
+    """Profit (bars) and margin (line) of the current base costs across additional costs"""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=additional_costs, y=profit, name='Profit', marker_color=SWAWE_ORANGE))
+    fig.add_trace(go.Scatter(x=additional_costs, y=margin, name='Margin %', yaxis='y2',
+                             mode='lines+markers', line=dict(color=SWAWE_TEAL, width=3)))
+    return _apply_premium_layout(
+        fig,
+        title="📦 Profit vs Additional Cost",
+        xaxis=dict(title="📦 Additional Cost (₹)"),
+        yaxis=dict(title="Profit (₹)", gridcolor='rgba(255,255,255,0.1)'),
+        yaxis2=dict(title="Margin %", overlaying='y', side='right', showgrid=False),
+        legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
+    )
+
+
+def forecast_figure(history, mean, lower, upper):
+    """Recent daily revenue followed by its forecast and band (date-indexed series)"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=list(upper.index) + list(lower.index[::-1]),
+                             y=list(upper.values) + list(lower.values[::-1]),
+                             fill='toself', fillcolor='rgba(0,212,170,0.15)', line=dict(width=0),
+                             hoverinfo='skip', name='95% band'))
+    fig.add_trace(go.Scatter(x=history.index, y=history.values, mode='lines', name='Revenue',
+                             line=dict(color=SWAWE_ORANGE, width=3)))
+    fig.add_trace(go.Scatter(x=mean.index, y=mean.values, mode='lines', name='Forecast',
+                             line=dict(color=SWAWE_TEAL, width=3, dash='dot')))
+    return _apply_premium_layout(
+        fig,
+        title="🔮 Revenue Forecast",
+        xaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
+        yaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
+        legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
+    )
@@ -0,0 +1,144 @@
+"""Command-line maintenance for the data a SWAWE dashboard keeps on disk.
+
+    python swawe_cli.py reprocess [--store NAME ...] [--workers N]
+    python swawe_cli.py serve [--host HOST] [--port PORT]
+
+``reprocess`` replays each store's raw order archive through the current
+processing rules on a process pool and replaces its snapshot. Running
+dashboards pick up the new snapshot on their next rerun, and Shopify is never
+called. A store that a dashboard is syncing, or whose download is still
+incomplete, is skipped.
+
+``serve`` answers the JSON summary endpoint (see swawe_api) from the saved
+snapshots, without a dashboard process; each request first checks for
+snapshots saved since the last one. Settings are read from the same
+secrets.toml as the dashboard.
+"""
+import argparse
+import os
+import sys
+import time
+import tomllib
+
+from swawe_settings import APP_DIR, read_settings, store_lock
+
+# Port for ``serve`` when SUMMARY_API_PORT leaves the dashboard's endpoint disabled
+DEFAULT_SERVE_PORT = 8765
+
+
+def load_settings(secrets_path):
+    """The dashboard's settings read from a secrets.toml, plus the configured store names"""
+    try:
+        with open(secrets_path, 'rb') as secrets_file:
+            secrets = tomllib.load(secrets_file)
+    except FileNotFoundError:
+        secrets = {}
+    settings = read_settings(secrets.get)
+    settings['store_names'] = [store['name'] for store in settings['stores']]
+    return settings
+
+
+def reprocess(args, settings):
+    import swawe_archive
+    import swawe_backfill
+    import swawe_core
+    import swawe_snapshot
+
+    if not settings['snapshot_dir']:
+        print("Snapshots are disabled (SNAPSHOT_DIR is empty), so there is no archive to reprocess")
+        return 1
+    store_names = args.store or settings['store_names']
+    if not store_names:
+        print("No stores configured; name them with --store")
+        return 1
+
+    rebuilt = 0
+    for store_name in store_names:
+        with store_lock(settings['snapshot_dir'], store_name, blocking=False) as locked:
+            if not locked:
+                print(f"{store_name}: a dashboard is syncing it, skipped")
+                continue
+            if swawe_backfill.BackfillCheckpoint(settings['snapshot_dir'], store_name).state() is not None:
+                # Only the pages downloaded so far are archived
+                print(f"{store_name}: its download is still incomplete, skipped")
+                continue
+            started = time.perf_counter()
+            archive = swawe_archive.RawOrderArchive(settings['snapshot_dir'], store_name)
+            result = swawe_core.reprocess_archive(archive, settings['classification_rules'],
+                                                  settings['classification_fallback'], workers=args.workers,
+                                                  customer_key=settings['customer_id_key'])
+            if result is None:
+                print(f"{store_name}: nothing archived, skipped")
+                continue
+            try:
+                _, metadata = swawe_snapshot.read_snapshot(settings['snapshot_dir'], store_name)
+            except (OSError, ValueError):
+                metadata = {}
+            # The data is as fresh as the sync that archived it, so its sync time
+            # and completeness carry over
+            swawe_snapshot.write_snapshot(
+                settings['snapshot_dir'], store_name, swawe_core.build_sales_frame(result['rows'], store_name),
+                {'synced_at': metadata.get('synced_at'), 'backfill': metadata.get('backfill'),
+                 'pipeline': result['pipeline'] if result['orders'] else None}
+            )
+        rebuilt += 1
+        print(f"{store_name}: {result['orders']:,} orders, {len(result['rows']):,} line items "
+              f"from {result['chunks']:,} chunks in {time.perf_counter() - started:.2f}s")
+    return 0 if rebuilt else 1
+
+
+def serve(args, settings):
+    import swawe_api
+    import swawe_store
+
+    if not settings['snapshot_dir']:
+        print("Snapshots are disabled (SNAPSHOT_DIR is empty), so there is nothing to serve")
+        return 1
+    store_names = args.store or settings['store_names']
+    if not store_names:
+        print("No stores configured; name them with --store")
+        return 1
+
+    sales_store = swawe_store.SharedSalesStore()
+
+    def refresh():
+        for store_name, error in sales_store.load_snapshots(settings['snapshot_dir'], store_names).items():
+            print(f"{store_name}: could not open the snapshot ({error})")
+
+    source = swawe_api.SummarySource(sales_store, store_names, refresh=refresh)
+    host = args.host or settings['summary_api_host']
+    port = args.port or settings['summary_api_port'] or DEFAULT_SERVE_PORT
+    server = swawe_api.make_server(source, host, port)
+    print(f"Serving {', '.join(store_names)} on http://{host}:{server.server_address[1]}/summary")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--secrets', default=os.path.join(APP_DIR, '.streamlit', 'secrets.toml'),
+                        help="secrets.toml to read settings from (default: the dashboard's)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    reprocess_parser = commands.add_parser('reprocess', help="rebuild snapshots from the raw order archive")
+    reprocess_parser.add_argument('--store', action='append', help="store to rebuild (repeatable; default: all configured)")
+    reprocess_parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    reprocess_parser.set_defaults(handler=reprocess)
+
+    serve_parser = commands.add_parser('serve', help="serve the JSON summary endpoint from the saved snapshots")
+    serve_parser.add_argument('--store', action='append', help="store to serve (repeatable; default: all configured)")
+    serve_parser.add_argument('--host', help="interface to listen on (default: SUMMARY_API_HOST or 127.0.0.1)")
+    serve_parser.add_argument('--port', type=int, help="port to listen on (default: SUMMARY_API_PORT or 8765)")
+    serve_parser.set_defaults(handler=serve)
+
+    args = parser.parse_args(argv)
+    return args.handler(args, load_settings(args.secrets))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1653 @@
+"""Headless SWAWE data core: Shopify access and mergeable sales aggregates.
+
+Nothing here imports Streamlit, so these functions can run in worker threads
+and outside the dashboard.
+"""
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+
+SHOPIFY_API_VERSION = '2023-10'
+VALUE_COLUMNS = ['selling_price', 'profit', 'quantity']
+
+# Ordered category rules: the first matching rule wins. Each rule names a
+# category and exactly one matcher: product_type / name (case-insensitive
+# regex), sku_prefix, or tag.
+DEFAULT_CLASSIFICATION_RULES = [
+    {'category': 'Hoodies', 'product_type': r'hood|sweatshirt'},
+    {'category': 'T-Shirts', 'product_type': r't-?shirt|\btees?\b'},
+    {'category': 'Hoodies', 'name': r'hoodie'},
+    {'category': 'T-Shirts', 'name': r't-?shirt|\btees?\b'},
+]
+FALLBACK_CATEGORY = 'Other'
+
+
+class StoreRateLimiter:
+    """Leaky-bucket request budget for one store (Shopify REST: 40 calls, leaking 2/s)"""
+
+    def __init__(self, capacity=40, leak_rate=2.0, headroom=4):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        # Leave a few calls for other apps sharing the store's bucket
+        self.headroom = headroom
+        self._level = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _drain(self, now):
+        self._level = max(0.0, self._level - (now - self._updated) * self.leak_rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a call fits in this store's budget"""
+        while True:
+            with self._lock:
+                self._drain(time.monotonic())
+                limit = self.capacity - self.headroom
+                if self._level + 1 <= limit:
+                    self._level += 1
+                    return
+                wait = (self._level + 1 - limit) / self.leak_rate
+            time.sleep(wait)
+
+    def observe(self, response):
+        """Sync the bucket with Shopify's call-limit header"""
+        header = response.headers.get('X-Shopify-Shop-Api-Call-Limit', '')
+        used, _, capacity = header.partition('/')
+        if used.isdigit() and capacity.isdigit():
+            with self._lock:
+                self._updated = time.monotonic()
+                self._level = float(used)
+                self.capacity = int(capacity)
+
+
+def store_api_url(store, path):
+    return f"https://{store['url']}/admin/api/{SHOPIFY_API_VERSION}/{path}"
+
+
+def shopify_get(store, path_or_url, limiter, params=None, timeout=30):
+    """GET against one store's Admin API inside its rate-limit budget, retrying once on 429"""
+    url = path_or_url if path_or_url.startswith('https://') else store_api_url(store, path_or_url)
+    headers = {"X-Shopify-Access-Token": store['token']}
+    for attempt in range(2):
+        limiter.acquire()
+        response = requests.get(url, headers=headers, params=params, timeout=timeout)
+        limiter.observe(response)
+        if response.status_code != 429 or attempt:
+            return response
+        time.sleep(float(response.headers.get('Retry-After', 2.0)))
+    return response
+
+
+def parse_next_link(link_header):
+    """Return the rel="next" URL from a Shopify Link header, if any"""
+    if 'rel="next"' not in link_header:
+        return None
+    for link in link_header.split(','):
+        if 'rel="next"' in link:
+            return link.split(';')[0].strip('<> ')
+    return None
+
+
+def fetch_store_products(store, limiter, updated_at_min=None):
+    """Download product metadata, optionally only products changed since updated_at_min.
+
+    Returns (products, error) like fetch_store_orders().
+    """
+    products = []
+    url = 'products.json'
+    params = {'limit': 250, 'fields': 'id,title,product_type,tags,updated_at'}
+    if updated_at_min:
+        params['updated_at_min'] = updated_at_min
+    try:
+        while url:
+            response = shopify_get(store, url, limiter, params=params)
+            if response.status_code != 200:
+                return products, f"API Error: {response.status_code}"
+            products.extend(response.json().get("products", []))
+            url = parse_next_link(response.headers.get('Link', ''))
+            params = None
+    except requests.RequestException as e:
+        return products, f"Error: {e}"
+    return products, None
+
+
+class ProductCatalog:
+    """Product metadata for one store, fetched once and then refreshed incrementally.
+
+    A refresh within ``max_age`` seconds of the last one is skipped; later
+    refreshes only ask Shopify for products updated since the newest
+    ``updated_at`` already seen.
+    """
+
+    def __init__(self, max_age=900):
+        self.max_age = max_age
+        self.products = {}
+        self.updated_at_max = None
+        self.last_error = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, store, limiter, force=False):
+        """Fetch new or changed products; returns the ids whose metadata changed"""
+        with self._lock:
+            if not force and self._checked_at is not None and time.monotonic() - self._checked_at < self.max_age:
+                return set()
+            products, self.last_error = fetch_store_products(store, limiter, self.updated_at_max)
+            changed = set()
+            for product in products:
+                tags = [tag.strip().lower() for tag in (product.get('tags') or '').split(',') if tag.strip()]
+                entry = {
+                    'product_type': product.get('product_type') or '',
+                    'title': product.get('title') or '',
+                    # Delimited so a tag rule can match whole tags with one substring test
+                    'tags': ',' + ','.join(tags) + ',',
+                }
+                if self.products.get(product['id']) != entry:
+                    self.products[product['id']] = entry
+                    changed.add(product['id'])
+                updated_at = product.get('updated_at')
+                if updated_at and (self.updated_at_max is None or updated_at > self.updated_at_max):
+                    self.updated_at_max = updated_at
+            if self.last_error is None:
+                self._checked_at = time.monotonic()
+            return changed
+
+
+class ProductClassifier:
+    """Category rules compiled into one vectorized first-match matcher.
+
+    Results are memoized per distinct (product_id, sku, item name), so the
+    regex work scales with the catalog rather than with the number of line
+    items; each line item then costs a dictionary lookup.
+    """
+
+    def __init__(self, rules=None, fallback=FALLBACK_CATEGORY):
+        self.rules = [self._compile(rule) for rule in (DEFAULT_CLASSIFICATION_RULES if rules is None else rules)]
+        self.fallback = fallback
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _compile(rule):
+        """Turn one rule into (category, column, vectorized mask function)"""
+        category = rule['category']
+        if 'product_type' in rule or 'name' in rule:
+            column = 'product_type' if 'product_type' in rule else 'name'
+            pattern = re.compile(rule[column], re.IGNORECASE)
+            return category, column, lambda values: values.str.contains(pattern, na=False)
+        if 'sku_prefix' in rule:
+            prefixes = rule['sku_prefix']
+            prefixes = tuple(p.upper() for p in ([prefixes] if isinstance(prefixes, str) else prefixes))
+            return category, 'sku', lambda values: values.str.upper().str.startswith(prefixes, na=False)
+        if 'tag' in rule:
+            needle = f",{rule['tag'].strip().lower()},"
+            return category, 'tags', lambda values: values.str.contains(needle, regex=False, na=False)
+        raise ValueError(f"Classification rule for {category!r} has no product_type, name, sku_prefix or tag matcher")
+
+    def match(self, products):
+        """Categories for a frame of distinct products (product_type, name, sku, tags columns)"""
+        if not self.rules or products.empty:
+            return [self.fallback] * len(products)
+        masks = [matcher(products[column]) for _, column, matcher in self.rules]
+        return np.select(masks, [category for category, _, _ in self.rules], default=self.fallback).tolist()
+
+    def forget(self, product_ids):
+        """Drop memoized results for products whose metadata changed"""
+        if product_ids:
+            with self._lock:
+                self._memo = {key: category for key, category in self._memo.items() if key[0] not in product_ids}
+
+    def categorize(self, rows, catalog):
+        """Set 'category' on processed line-item rows, classifying only unseen products"""
+        keys = {(row['product_id'], row['sku'], row['item_name']) for row in rows}
+        # Hits are copied out under the lock, since forget() may swap the memo right after
+        with self._lock:
+            categories = {key: self._memo[key] for key in keys if key in self._memo}
+        missing = [key for key in keys if key not in categories]
+        if missing:
+            metadata = [catalog.products.get(product_id, {}) if catalog else {} for product_id, _, _ in missing]
+            products = pd.DataFrame({
+                'product_type': [meta.get('product_type', '') for meta in metadata],
+                'tags': [meta.get('tags', ',') for meta in metadata],
+                'sku': [sku or '' for _, sku, _ in missing],
+                'name': [name for _, _, name in missing],
+            })
+            matched = dict(zip(missing, self.match(products)))
+            categories.update(matched)
+            with self._lock:
+                self._memo.update(matched)
+        for row in rows:
+            row['category'] = categories[(row['product_id'], row['sku'], row['item_name'])]
+        return rows
+
+
+class _PipelineStopped(Exception):
+    """Raised in the download stage when the processing stage has given up"""
+
+
+def sync_store(store, limiter, catalog, classifier, progress, queue_size=4, checkpoint=None, archive=None,
+               customer_key=None):
+    """Refresh one store's catalog (if stale), then download and process its orders as a pipeline.
+
+    A producer thread downloads pages into a bounded queue while this thread
+    turns each page into line items and cash-flow pipeline figures, so
+    processing page N overlaps downloading page N+1 and the raw orders are
+    never held all at once. A catalog failure is not fatal: classification
+    falls back to name rules for unknown products.
+
+    Returns a dict with rows, pipeline, orders (count), min_order, max_order,
+    total, error and complete. As before, rows from pages loaded before an
+    error are kept. When ``progress`` has a 'batches' list, each page's rows
+    are appended to it as soon as they are processed, for partial rendering.
+    ``customer_key`` keys the rows' customer ids (see line_items_from_orders).
+
+    With a ``checkpoint`` (swawe_backfill.BackfillCheckpoint) every processed
+    page is committed to it along with the cursor of the next one, and a
+    saved checkpoint is resumed: its rows are restored and downloading starts
+    at the page after the last committed one. 'resumed_orders' counts the
+    orders restored that way.
+
+    With an ``archive`` (swawe_archive.RawOrderArchive) every downloaded page
+    and the catalog are archived as raw JSON for reprocess_archive(); a
+    download that starts from the first page replaces the previous archive.
+    Callers run one sync per store at a time and keep other archive writers
+    out meanwhile; the dashboard holds the store's sync lock.
+    """
+    if catalog is not None:
+        classifier.forget(catalog.refresh(store, limiter))
+
+    resumed = checkpoint.load() if checkpoint is not None else None
+    if archive is not None:
+        if not resumed:
+            archive.reset()
+        if catalog is not None:
+            archive.save_products(catalog.products)
+    start_url = resumed['next_url'] if resumed else 'orders.json'
+    seen_combinations = set()
+    if resumed:
+        rows, pipeline, page_count = resumed['rows'], resumed['pipeline'], resumed['pages']
+        order_count = resumed['orders']
+        order_numbers = [n for n in (resumed['min_order'], resumed['max_order']) if n is not None]
+        if 'batches' in progress:
+            progress['batches'].append(list(rows))
+    else:
+        rows, pipeline, page_count = [], empty_pipeline(), 0
+        order_count, order_numbers = 0, []
+    # Set before the producer starts: it counts on from here
+    progress['processed'] = progress['loaded'] = order_count
+    progress['pages'] = page_count
+
+    pages = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    outcome = {'error': None}
+
+    def hand_over(page):
+        while not stop.is_set():
+            try:
+                pages.put(page, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+        raise _PipelineStopped()
+
+    def download():
+        try:
+            outcome['error'] = fetch_store_orders(store, limiter, progress, start_url=start_url,
+                                                   on_page=lambda page_orders, next_url: hand_over((page_orders, next_url)))[1]
+        except _PipelineStopped:
+            return
+        except Exception as e:
+            outcome['error'] = f"Error: {e}"
+        try:
+            # End-of-stream marker
+            hand_over(None)
+        except _PipelineStopped:
+            pass
+
+    producer = threading.Thread(target=download, name=f"swawe-fetch-{store['name']}", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            page = pages.get()
+            if page is None:
+                break
+            page_orders, next_url = page
+            if archive is not None:
+                # Archived before the checkpoint moves past the page
+                archive.append(page_orders)
+            page_rows = line_items_from_orders(page_orders, classifier, catalog, seen_combinations, customer_key)
+            rows.extend(page_rows)
+            if 'batches' in progress:
+                progress['batches'].append(page_rows)
+            fold_pipeline(pipeline, page_orders)
+            order_count += len(page_orders)
+            page_count += 1
+            page_numbers = [number for number in map(order_number_of, page_orders) if number is not None]
+            if page_numbers:
+                order_numbers = [min(order_numbers + page_numbers), max(order_numbers + page_numbers)]
+            if checkpoint is not None:
+                checkpoint.commit(page_rows, next_url, {
+                    'pages': page_count, 'orders': order_count, 'total': progress['total'], 'pipeline': pipeline,
+                    'min_order': order_numbers[0] if order_numbers else None,
+                    'max_order': order_numbers[-1] if order_numbers else None,
+                })
+            progress['processed'] = order_count
+    finally:
+        stop.set()
+        producer.join()
+
+    return {
+        'rows': rows,
+        'pipeline': pipeline,
+        'orders': order_count,
+        'min_order': min(order_numbers) if order_numbers else None,
+        'max_order': max(order_numbers) if order_numbers else None,
+        'total': progress['total'],
+        'error': outcome['error'],
+        'complete': outcome['error'] is None,
+        'resumed_orders': resumed['orders'] if resumed else 0,
+    }
+
+
+def fetch_store_orders(store, limiter, progress, on_page=None, start_url='orders.json'):
+    """Download every order of one store.
+
+    Returns (orders, error). On an error the orders loaded so far are kept, as
+    the dashboard always did. ``progress`` is updated in place so the UI thread
+    can poll it while this runs in a worker thread. With ``on_page`` each page
+    is handed over as it arrives, as on_page(page_orders, next_url), instead
+    of being collected. ``start_url`` resumes at a saved next-page URL; None
+    means there are no pages left.
+    """
+    orders = []
+    loaded = progress.get('loaded', 0)
+    try:
+        count_response = shopify_get(store, 'orders/count.json', limiter, params={'status': 'any'})
+        if count_response.status_code != 200:
+            return orders, f"API Error: {count_response.status_code}"
+        progress['total'] = count_response.json().get("count", 0)
+
+        url = start_url
+        params = {'limit': 250, 'status': 'any'} if start_url == 'orders.json' else None
+        while url:
+            response = shopify_get(store, url, limiter, params=params)
+            if response.status_code != 200:
+                return orders, f"API Error: {response.status_code}"
+            page_orders = response.json().get("orders", [])
+            if not page_orders:
+                break
+
+            # The next-page URL already carries the cursor and limit
+            url = parse_next_link(response.headers.get('Link', ''))
+            params = None
+
+            if on_page is None:
+                orders.extend(page_orders)
+            else:
+                on_page(page_orders, url)
+            loaded += len(page_orders)
+            progress['loaded'] = loaded
+            progress['pages'] = progress.get('pages', 0) + 1
+    except requests.RequestException as e:
+        return orders, f"Error: {e}"
+    return orders, None
+
+
+def customer_id(order, key):
+    """Compact, stable integer id for an order's customer, or None for guest orders without contact.
+
+    The normalized email is hashed with BLAKE2b (64 bits) keyed by ``key``
+    (see swawe_settings.customer_id_key), so customers stay distinct without
+    the address being stored, and an id cannot be matched to an address by
+    anyone without the key. The masked ``name@...`` text is kept only for
+    display.
+    """
+    email = (order.get('email') or '').strip().lower()
+    if email:
+        source = email.encode()
+    elif (order.get('customer') or {}).get('id') is not None:
+        source = f"customer:{order['customer']['id']}".encode()
+    else:
+        return None
+    digest = hashlib.blake2b(source, digest_size=8, key=key, person=b'swawe-customer').digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def line_items_from_orders(orders, classifier=None, catalog=None, seen_combinations=None, customer_key=None):
+    """Flatten orders into one row per line item, skipping duplicates.
+
+    Rows carry the unit price but no costs: those depend on each session's
+    cost settings and are joined on later by apply_costs(). Pass the same
+    ``seen_combinations`` set for successive pages of one download. Customer
+    ids are only filled in with a ``customer_key`` to hash them with.
+    """
+    processed_sales = []
+    if seen_combinations is None:
+        seen_combinations = set()
+
+    for order in orders:
+        order_name = order.get('name', 'N/A')
+
+        for line_item in order.get("line_items", []):
+            combination_key = f"{order_name}_{line_item.get('id')}"
+            if combination_key in seen_combinations:
+                continue
+            seen_combinations.add(combination_key)
+
+            created_at = order.get("created_at", "")
+            try:
+                sale_date = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime('%Y-%m-%d')
+            except (AttributeError, ValueError):
+                sale_date = datetime.now().strftime('%Y-%m-%d')
+
+            customer = order.get("email", "N/A")
+            if '@' in str(customer):
+                customer = customer.split('@')[0] + '@...'
+
+            processed_sales.append({
+                'item_name': line_item.get("name", ""),
+                'product_id': line_item.get('product_id'),
+                'variant_id': line_item.get('variant_id'),
+                'sku': line_item.get('sku') or '',
+                'unit_price': float(line_item.get("price", 0)),
+                'quantity': int(line_item.get("quantity", 1)),
+                'date': sale_date,
+                'customer': customer,
+                'customer_id': customer_id(order, customer_key) if customer_key else None,
+                'order_name': order_name,
+                'order_number': order_number_of(order),
+                'financial_status': order.get('financial_status', 'unknown')
+            })
+
+    if classifier is not None:
+        classifier.categorize(processed_sales, catalog)
+    return processed_sales
+
+
+def build_sales_frame(rows, store_name):
+    """Canonical line-item frame for one store: dates parsed and rows sorted by date"""
+    frame = pd.DataFrame(rows)
+    frame['date'] = pd.to_datetime(frame['date'], format='%Y-%m-%d')
+    frame['order_number'] = frame['order_number'].astype('Int64')
+    frame['customer_id'] = frame['customer_id'].astype('Int64')
+    frame = frame.sort_values('date', kind='stable').reset_index(drop=True)
+    frame['store'] = store_name
+    return frame
+
+
+def append_sales(sales_df, new_sales):
+    """Canonical frame with a frame of new line items (from build_sales_frame) merged in, still sorted by date.
+
+    New orders date from no earlier than the last row, so they are simply
+    appended; only a batch reaching back into the history is merged by date.
+    """
+    if new_sales.empty:
+        return sales_df
+    merged = pd.concat([sales_df, new_sales], ignore_index=True)
+    if _appends_in_order(sales_df, new_sales):
+        return merged
+    return merged.sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def _appends_in_order(sales_df, new_sales):
+    # Whether new_sales can follow sales_df as they are, keeping every row where it was
+    return sales_df.empty or new_sales.empty or new_sales['date'].iloc[0] >= sales_df['date'].iloc[-1]
+
+
+def pending_action(order):
+    """Cash-flow bucket of one order: 'fulfill', 'capture' or None.
+
+    Open orders that are not fully shipped need fulfilling; shipped orders
+    whose payment is only authorized or pending still need capturing.
+    """
+    if order.get('cancelled_at') or order.get('financial_status') in ('refunded', 'voided'):
+        return None
+    if order.get('fulfillment_status') in (None, 'unfulfilled', 'partial'):
+        return 'fulfill'
+    if order.get('financial_status') in ('authorized', 'pending', 'partially_paid'):
+        return 'capture'
+    return None
+
+
+def empty_pipeline():
+    """Cash-flow pipeline figures before any orders are folded in"""
+    return {
+        'total_pending_revenue': 0.0,
+        'total_pending_count': 0,
+        'pending_orders_list': [],
+        'orders_to_fulfill_revenue': 0.0,
+        'orders_to_fulfill_count': 0,
+        'payments_to_capture_revenue': 0.0,
+        'payments_to_capture_count': 0,
+    }
+
+
+def fold_pipeline(pipeline, orders):
+    """Add a batch of orders to running pipeline figures, in place"""
+    for order in orders:
+        action = pending_action(order)
+        if action is None:
+            continue
+        value = float(order.get('total_price') or 0)
+        prefix = 'orders_to_fulfill' if action == 'fulfill' else 'payments_to_capture'
+        pipeline[f'{prefix}_revenue'] += value
+        pipeline[f'{prefix}_count'] += 1
+        pipeline['total_pending_revenue'] += value
+        pipeline['total_pending_count'] += 1
+
+        customer = order.get('email') or 'N/A'
+        if '@' in customer:
+            customer = customer.split('@')[0] + '@...'
+        pipeline['pending_orders_list'].append({
+            'order_name': order.get('name', 'N/A'),
+            'total_price': value,
+            'customer_email': customer,
+            'created_at': order.get('created_at', ''),
+            'line_items': sum(int(item.get('quantity', 1)) for item in order.get('line_items', [])),
+            'status_type': 'Fulfill order' if action == 'fulfill' else 'Capture payment',
+        })
+    return pipeline
+
+
+def pipeline_from_pending(pending_orders):
+    """Pipeline figures rebuilt from a list of pending_orders_list entries"""
+    pipeline = empty_pipeline()
+    for entry in pending_orders:
+        prefix = 'orders_to_fulfill' if entry['status_type'] == 'Fulfill order' else 'payments_to_capture'
+        pipeline[f'{prefix}_revenue'] += entry['total_price']
+        pipeline[f'{prefix}_count'] += 1
+        pipeline['total_pending_revenue'] += entry['total_price']
+        pipeline['total_pending_count'] += 1
+        pipeline['pending_orders_list'].append(entry)
+    return pipeline
+
+
+# Per-process state of reprocessing workers, set by _init_reprocess_worker
+_reprocess_worker = {}
+
+
+def _init_reprocess_worker(rules, fallback, products, customer_key):
+    # Classifiers hold compiled matchers that do not pickle, so each worker
+    # builds its own from the plain rules
+    catalog = ProductCatalog()
+    catalog.products = products
+    _reprocess_worker.update(classifier=ProductClassifier(rules, fallback), catalog=catalog,
+                             customer_key=customer_key)
+
+
+def _reprocess_chunk(path):
+    """Line items and pending orders of one archive chunk, keyed for merging by order name"""
+    import swawe_archive
+
+    orders = swawe_archive.read_chunk(path)
+    rows = line_items_from_orders(orders, _reprocess_worker['classifier'], _reprocess_worker['catalog'],
+                                  customer_key=_reprocess_worker['customer_key'])
+    return [order.get('name', 'N/A') for order in orders], rows, fold_pipeline(empty_pipeline(), orders)['pending_orders_list']
+
+
+def reprocess_archive(archive, rules=None, fallback=FALLBACK_CATEGORY, products=None, workers=None,
+                      customer_key=None):
+    """Rebuild one store's line items from its raw order archive on a process pool.
+
+    Chunks are processed in parallel (``workers`` processes, default one per
+    core) and merged in archive order. An order archived more than once, for
+    example by a resumed sync or a refetch, is taken from its latest chunk.
+    ``products`` overrides the archived catalog, and ``customer_key`` keys
+    customer ids as in line_items_from_orders(). Makes no API calls.
+
+    Returns a dict like sync_store(): rows, pipeline, orders, min_order,
+    max_order, plus chunks; None when the archive is empty.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = archive.chunks()
+    if not chunks:
+        return None
+    if products is None:
+        products = archive.load_products()
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers == 1:
+        # A single worker would only add process startup and pickling
+        _init_reprocess_worker(rules, fallback, products, customer_key)
+        results = [_reprocess_chunk(path) for path in chunks]
+    else:
+        # Spawned rather than forked: the dashboard calls this from a threaded server
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_reprocess_worker,
+                                 initargs=(rules, fallback, products, customer_key)) as pool:
+            results = list(pool.map(_reprocess_chunk, chunks, chunksize=max(1, len(chunks) // (workers * 4))))
+
+    rows, pending, seen_orders = [], [], set()
+    for order_names, chunk_rows, chunk_pending in reversed(results):
+        fresh = set(order_names) - seen_orders
+        seen_orders.update(order_names)
+        rows.extend(row for row in chunk_rows if row['order_name'] in fresh)
+        pending.extend(entry for entry in chunk_pending if entry['order_name'] in fresh)
+    order_numbers = [row['order_number'] for row in rows if row['order_number'] is not None]
+    return {
+        'rows': rows,
+        'pipeline': pipeline_from_pending(pending),
+        'orders': len(seen_orders),
+        'min_order': min(order_numbers) if order_numbers else None,
+        'max_order': max(order_numbers) if order_numbers else None,
+        'chunks': len(chunks),
+    }
+
+
+def cost_lookup(cost_table):
+    """Base unit cost indexed by SKU or variant id (as text) from an editable sku/unit_cost table"""
+    table = cost_table.dropna(subset=['sku', 'unit_cost'])
+    keys = table['sku'].astype(str).str.strip()
+    lookup = pd.Series(table['unit_cost'].astype(float).to_numpy(), index=keys)
+    lookup = lookup[lookup.index != '']
+    return lookup[~lookup.index.duplicated(keep='last')]
+
+
+COST_KEY_COLUMNS = ['sku', 'variant_id', 'category']
+# Hashed in one dtype per column, so a key hashes alike whichever frame it comes from
+_COST_KEY_DTYPES = {'sku': 'str', 'variant_id': 'float64', 'category': 'str'}
+
+
+def _cost_key_hashes(sales_df):
+    """64-bit hash of each row's sku/variant/category combination"""
+    return pd.util.hash_pandas_object(sales_df[COST_KEY_COLUMNS].astype(_COST_KEY_DTYPES), index=False).to_numpy()
+
+
+def unit_costs(cost_keys, lookup, category_costs, default_cost, additional_cost):
+    """Cost per unit for each row of a sku/variant_id/category table, as a float array.
+
+    The base cost comes from the SKU, else the variant id, else the item's
+    category (default_cost for unlisted categories); additional_cost is added
+    per unit. All lookups are hash joins over whole columns.
+    """
+    base_cost = cost_keys['sku'].map(lookup)
+    if not lookup.empty:
+        variant_keys = cost_keys['variant_id'].astype('Int64').astype('string')
+        base_cost = base_cost.fillna(variant_keys.map(lookup))
+    base_cost = base_cost.fillna(cost_keys['category'].map(category_costs)).fillna(default_cost)
+    return base_cost.to_numpy(dtype=float) + additional_cost
+
+
+def with_costs(sales_df, key_costs):
+    """Line items of a partition with cost_used and profit taken from per-cost-key unit costs
+    in place of the cost codes"""
+    cost_used = key_costs[sales_df['cost_code'].to_numpy()]
+    return sales_df.drop(columns='cost_code').assign(
+        cost_used=cost_used,
+        profit=sales_df['selling_price'].to_numpy() - cost_used * sales_df['quantity'].to_numpy(),
+    )
+
+
+def cost_mix(sales_df, cost_keys, lookup, categories, default_category):
+    """Revenue and unit totals of a partition's line items, split by what sets their base cost.
+
+    Units whose SKU or variant has its own cost in lookup only add to
+    fixed_cost. The rest are counted per entry of ``categories`` in
+    category_quantity, with units of any other category counted under
+    default_category, as unit_costs() does with default_cost. Profit under
+    any per-category and additional costs is linear in these totals, which
+    is what scenario_sweep() relies on.
+    """
+    quantity = np.bincount(sales_df['cost_code'].to_numpy(), minlength=len(cost_keys),
+                           weights=sales_df['quantity'].to_numpy(dtype=float))
+    own_cost = unit_costs(cost_keys, lookup, {}, np.nan, 0.0)
+    category_costed = np.isnan(own_cost)
+    key_categories = cost_keys['category'].to_numpy()
+    category_quantity = np.array([quantity[category_costed & (key_categories == category)].sum()
+                                  for category in categories])
+    category_quantity[categories.index(default_category)] += (quantity[category_costed].sum()
+                                                              - category_quantity.sum())
+    return {
+        'revenue': float(sales_df['selling_price'].sum()),
+        'quantity': float(quantity.sum()),
+        'fixed_cost': float(own_cost[~category_costed] @ quantity[~category_costed]),
+        'category_quantity': category_quantity,
+    }
+
+
+def merge_cost_mixes(mixes):
+    """Combine cost_mix() results of several stores by adding them up"""
+    mixes = list(mixes)
+    return {key: sum(mix[key] for mix in mixes) for key in mixes[0]}
+
+
+def scenario_sweep(mix, category_cost_grid, additional_cost_grid):
+    """Profit and margin of every combination of candidate costs, in one broadcast.
+
+    category_cost_grid holds one 1-D array of candidate base costs per
+    category of the mix, in its order. The results are arrays shaped
+    (len(grid_1), ..., len(grid_n), len(additional_cost_grid)), each axis
+    indexed like its grid; margin is profit as a % of revenue.
+    """
+    axes = np.ix_(*[np.asarray(grid, dtype=float) for grid in category_cost_grid],
+                  np.asarray(additional_cost_grid, dtype=float))
+    cost = mix['fixed_cost'] + axes[-1] * mix['quantity']
+    for grid, units in zip(axes[:-1], mix['category_quantity']):
+        cost = cost + grid * units
+    profit = mix['revenue'] - cost
+    margin = profit / mix['revenue'] * 100 if mix['revenue'] else np.zeros_like(profit)
+    return {'profit': profit, 'margin': margin}
+
+
+SEARCH_COLUMNS = ['order_name', 'item_name', 'customer']
+# Posting chunks appended to a partition's search index before they are folded into one
+MAX_POSTING_CHUNKS = 16
+
+
+class TrigramIndex:
+    """Case-insensitive substring index over a growing vocabulary of distinct terms.
+
+    Each term gets an id in the order it was added, and every trigram of the
+    lowercased term lists the ids containing it. A query is answered from
+    the postings of its rarest trigrams and then verified against those
+    candidates only, so its cost follows the number of matches rather than
+    the vocabulary. Queries shorter than a trigram scan the vocabulary, which
+    is still far smaller than the table the terms come from. Terms are only
+    ever added, so one index can serve several partition versions.
+    """
+
+    def __init__(self):
+        self.terms = []
+        self._lowered = []
+        self._ids = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, terms):
+        """Index the terms not seen before"""
+        with self._lock:
+            for term in terms:
+                term = str(term)
+                if term in self._ids:
+                    continue
+                term_id = len(self.terms)
+                self._ids[term] = term_id
+                self.terms.append(term)
+                lowered = term.lower()
+                self._lowered.append(lowered)
+                for trigram in {lowered[i:i + 3] for i in range(len(lowered) - 2)}:
+                    self._postings.setdefault(trigram, []).append(term_id)
+
+    def ids(self, values):
+        """Term id of each value as an int32 array, -1 for values not in the index"""
+        codes, uniques = pd.factorize(pd.Series(values).astype(str))
+        with self._lock:
+            # The trailing -1 is what missing values (code -1) pick up
+            unique_ids = np.array([self._ids.get(term, -1) for term in uniques] + [-1], dtype=np.int32)
+        return unique_ids[codes]
+
+    def search(self, query, verify_below=2000):
+        """Sorted ids of the terms containing query, ignoring case"""
+        query = query.lower()
+        with self._lock:
+            if len(query) < 3:
+                return np.array([i for i, term in enumerate(self._lowered) if query in term], dtype=np.int32)
+            postings = sorted((self._postings.get(query[i:i + 3], ()) for i in range(len(query) - 2)), key=len)
+            candidates = set(postings[0])
+            # Intersect rarest first until few enough candidates remain to check directly
+            for posting in postings[1:]:
+                if len(candidates) <= verify_below:
+                    break
+                candidates.intersection_update(posting)
+            matches = [i for i in candidates if query in self._lowered[i]]
+        return np.array(sorted(matches), dtype=np.int32)
+
+
+def row_postings(index, sales_df, start=0):
+    """Positions of sales_df's rows (counted from start) per term id of their SEARCH_COLUMNS values.
+
+    The positions of term t are ``positions[offsets[t]:offsets[t + 1]]``;
+    terms added to index after this chunk have no entry in it.
+    """
+    ids = np.concatenate([index.ids(sales_df[column]) for column in SEARCH_COLUMNS])
+    positions = np.tile(np.arange(start, start + len(sales_df), dtype=np.int32), len(SEARCH_COLUMNS))
+    known = ids >= 0
+    return _postings_chunk(ids[known], positions[known], len(index))
+
+
+def _postings_chunk(ids, positions, term_count):
+    order = np.argsort(ids, kind='stable')
+    return {'offsets': np.concatenate(([0], np.cumsum(np.bincount(ids, minlength=term_count)))),
+            'positions': positions[order]}
+
+
+def merge_postings(chunks):
+    """One posting chunk with the rows of several"""
+    term_count = max(len(chunk['offsets']) - 1 for chunk in chunks)
+    ids = np.concatenate([np.repeat(np.arange(len(chunk['offsets']) - 1), np.diff(chunk['offsets'])) for chunk in chunks])
+    return _postings_chunk(ids, np.concatenate([chunk['positions'] for chunk in chunks]), term_count)
+
+
+def _gather_postings(chunk, term_ids):
+    # Concatenated position slices of the term ids the chunk knows
+    offsets = chunk['offsets']
+    term_ids = term_ids[term_ids < len(offsets) - 1]
+    starts = offsets[term_ids]
+    lengths = offsets[term_ids + 1] - starts
+    # Each slice's start, shifted by where it lands in the output
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return chunk['positions'][shifts + np.arange(lengths.sum())]
+
+
+class SalesPartition:
+    """One store's line items, immutable once built and shared read-only by every session.
+
+    Costs are not part of the data: the distinct sku/variant/category
+    combinations are factorized once into cost_code, so pricing the partition
+    for one session's settings means computing one unit cost per combination
+    (cost_keys) and gathering it into the rows that are actually queried.
+    """
+
+    def __init__(self, sales_df, version, meta=None):
+        codes = sales_df.groupby(COST_KEY_COLUMNS, dropna=False, sort=False).ngroup()
+        self._assign(
+            sales_df.assign(
+                selling_price=sales_df['unit_price'] * sales_df['quantity'],
+                cost_code=codes.to_numpy(dtype=np.int32),
+            ),
+            # First occurrences in row order, matching ngroup's numbering
+            sales_df[COST_KEY_COLUMNS].drop_duplicates(ignore_index=True),
+            version, meta,
+        )
+
+    def _assign(self, frame, cost_keys, version, meta):
+        self.frame = frame
+        self.cost_keys = cost_keys
+        self.version = version
+        self.meta = meta or {}
+        self._key_hashes = None
+        self._sketches = None
+        self._sketch_lock = threading.Lock()
+        self._nbytes = None
+        self._search = None
+        self._search_terms = None
+        self._search_lock = threading.Lock()
+
+    def extended(self, new_sales, version, meta=None):
+        """A new partition holding these line items plus new_sales (from build_sales_frame).
+
+        Only the new rows are coded: combinations seen before keep their
+        cost_code and new ones are numbered after them, so session cost
+        overlays only grow. The rows are appended as they are unless some
+        are dated before the last row, as append_sales() does. Sketches
+        already built here are carried over, with one more batch sketched
+        from just the new rows, and so is the search index, with the new
+        rows' postings added when the old rows keep their positions.
+        """
+        if self._key_hashes is None:
+            self._key_hashes = pd.Index(_cost_key_hashes(self.cost_keys))
+        hashes = _cost_key_hashes(new_sales)
+        codes = self._key_hashes.get_indexer(hashes)
+        unseen = codes < 0
+        key_hashes, cost_keys = self._key_hashes, self.cost_keys
+        if unseen.any():
+            local_codes, new_hashes = pd.factorize(hashes[unseen])
+            codes[unseen] = len(key_hashes) + local_codes
+            first_seen = ~pd.Index(hashes[unseen]).duplicated()
+            cost_keys = pd.concat([cost_keys, new_sales.loc[unseen, COST_KEY_COLUMNS][first_seen]], ignore_index=True)
+            key_hashes = key_hashes.append(pd.Index(new_hashes))
+        rows = new_sales.assign(
+            selling_price=new_sales['unit_price'] * new_sales['quantity'],
+            cost_code=codes.astype(np.int32),
+        )
+        partition = SalesPartition.__new__(SalesPartition)
+        partition._assign(append_sales(self.frame, rows), cost_keys, version, meta)
+        partition._key_hashes = key_hashes
+        batches = self._sketches
+        if batches is not None and not rows.empty:
+            batches = batches + [SalesSketches(rows)]
+            if len(batches) > MAX_SKETCH_BATCHES:
+                # The appended batches cover few days, so folding them together is cheap
+                batches = [batches[0], merge_sales_sketches(batches[1:])]
+        partition._sketches = batches
+        if self._search is not None:
+            index, chunks = self._search
+            if _appends_in_order(self.frame, rows):
+                for column in SEARCH_COLUMNS:
+                    index.add(rows[column].astype(str).unique())
+                chunks = chunks + (row_postings(index, rows, len(self.frame)),)
+                if len(chunks) > MAX_POSTING_CHUNKS:
+                    chunks = (chunks[0], merge_postings(chunks[1:]))
+                partition._search = (index, chunks)
+            else:
+                # Positions moved, so only the terms are reused when it is next searched
+                partition._search_terms = index
+        return partition
+
+    def nbytes(self):
+        """Memory held by the line items, measured once since the partition never changes"""
+        if self._nbytes is None:
+            self._nbytes = int(self.frame.memory_usage(deep=True).sum()) + int(self.cost_keys.memory_usage(deep=True).sum())
+        return self._nbytes
+
+    def base_frame(self):
+        """Line items as they are persisted: without the derived columns"""
+        return self.frame.drop(columns=['selling_price', 'cost_code'])
+
+    def sketches(self):
+        """Per-day distinct-count and percentile sketches (SalesSketches), one per batch of rows.
+
+        Built from the whole frame once per published partition however many
+        sessions ask, and only if something asks, so publishing stays as
+        cheap as before; appends add a batch of their own (see extended()).
+        """
+        with self._sketch_lock:
+            if self._sketches is None:
+                self._sketches = [SalesSketches(self.frame)]
+            return self._sketches
+
+    def sketch_window(self, start, end):
+        """Sketch of the days in [start, end] over every batch, see SalesSketches.window()"""
+        return merge_sketch_windows(batch.window(start, end) for batch in self.sketches())
+
+    def search_index(self):
+        """(TrigramIndex, tuple of posting chunks) over SEARCH_COLUMNS, built on first use.
+
+        The index of terms only ever grows, so it is shared with the
+        partitions extended from this one; each has its own chunks, which
+        list row positions per term (see row_postings()).
+        """
+        with self._search_lock:
+            if self._search is None:
+                index = self._search_terms or TrigramIndex()
+                for column in SEARCH_COLUMNS:
+                    index.add(self.frame[column].astype(str).unique())
+                self._search = (index, (row_postings(index, self.frame),))
+                self._search_terms = None
+            return self._search
+
+    def search(self, query):
+        """Sorted positions of the rows whose order name, item name or masked customer contains query"""
+        index, chunks = self.search_index()
+        term_ids = index.search(query)
+        if not term_ids.size:
+            return np.array([], dtype=np.intp)
+        # A row matching in several columns is listed once per column
+        return np.unique(np.concatenate([_gather_postings(chunk, term_ids) for chunk in chunks])).astype(np.intp)
+
+
+def order_number_of(order):
+    """Shopify's numeric order_number, falling back to the digits of the order name"""
+    number = order.get('order_number')
+    if number is None:
+        digits = str(order.get('name', '')).lstrip('#')
+        number = int(digits) if digits.isdigit() else None
+    return number
+
+
+def missing_order_numbers(order_numbers):
+    """Order numbers absent between the lowest and highest loaded ones, ascending"""
+    numbers = np.unique(np.asarray(pd.Series(order_numbers).dropna(), dtype=np.int64))
+    if numbers.size < 2:
+        return np.empty(0, dtype=np.int64)
+    present = np.zeros(numbers[-1] - numbers[0] + 1, dtype=bool)
+    present[numbers - numbers[0]] = True
+    return np.flatnonzero(~present) + numbers[0]
+
+
+def fetch_orders_by_number(store, limiter, order_numbers):
+    """Fetch specific orders with one name= query each.
+
+    Returns (orders, not_found, error). Numbers Shopify does not return were
+    usually deleted and are reported in not_found rather than as an error.
+    """
+    orders, not_found = [], []
+    try:
+        for number in order_numbers:
+            response = shopify_get(store, 'orders.json', limiter, params={'name': f"#{number}", 'status': 'any'})
+            if response.status_code != 200:
+                return orders, not_found, f"API Error: {response.status_code}"
+            found = [order for order in response.json().get("orders", []) if order_number_of(order) == number]
+            if found:
+                orders.extend(found)
+            else:
+                not_found.append(int(number))
+    except requests.RequestException as e:
+        return orders, not_found, f"Error: {e}"
+    return orders, not_found, None
+
+
+class NewOrderPoller:
+    """Finds orders placed since the previous poll, for every store, at most once per interval.
+
+    One poller serves the whole process, so any number of live dashboards
+    cost one request per store per interval. After a store's first poll it
+    follows a since_id cursor and only ever receives new orders.
+    """
+
+    def __init__(self, interval=60):
+        self.interval = interval
+        self.last_errors = {}
+        self._since_ids = {}
+        self._polled_at = None
+        self._lock = threading.Lock()
+
+    def poll(self, stores, limiter_for, known_order_names):
+        """New orders per store name, or None when not due or another session is already polling.
+
+        ``known_order_names(store_name)`` is the set of order names already
+        loaded; it is only called when a poll returned orders, so that the
+        first poll, which seeds the cursor from a page of recent orders,
+        never ingests an order twice.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            now = time.monotonic()
+            if self._polled_at is not None and now - self._polled_at < self.interval:
+                return None
+            self._polled_at = now
+            new_orders = {}
+            for store in stores:
+                orders, self.last_errors[store['name']] = self._poll_store(store, limiter_for(store['name']),
+                                                                            known_order_names)
+                if orders:
+                    new_orders[store['name']] = orders
+            return new_orders
+        finally:
+            self._lock.release()
+
+    def _poll_store(self, store, limiter, known_order_names):
+        since_id = self._since_ids.get(store['name'])
+        params = {'limit': 250, 'status': 'any'}
+        if since_id is not None:
+            params['since_id'] = since_id
+        received = []
+        url = 'orders.json'
+        try:
+            while url:
+                response = shopify_get(store, url, limiter, params=params)
+                if response.status_code != 200:
+                    return [], f"API Error: {response.status_code}"
+                received.extend(response.json().get("orders", []))
+                # Seeding reads only the newest page; a full refresh covers anything older
+                url = parse_next_link(response.headers.get('Link', '')) if since_id is not None else None
+                params = None
+        except requests.RequestException as e:
+            return [], f"Error: {e}"
+
+        ids = [order['id'] for order in received if order.get('id') is not None]
+        if ids:
+            self._since_ids[store['name']] = max(ids + [since_id or 0])
+        if received:
+            known = known_order_names(store['name'])
+            received = [order for order in received if order.get('name') not in known]
+        return received, None
+
+
+def _group_totals(sales_df, key):
+    grouped = sales_df.groupby(key)
+    totals = grouped[VALUE_COLUMNS].sum()
+    totals['line_items'] = grouped.size()
+    return totals
+
+
+def summarize_sales(sales_df):
+    """Mergeable aggregates for one partition of line items.
+
+    Every field is a sum (or a sum-indexed frame), so partitions for different
+    stores or batches combine with merge_summaries() without touching raw rows.
+    """
+    return {
+        'revenue': float(sales_df['selling_price'].sum()),
+        'profit': float(sales_df['profit'].sum()),
+        'quantity': int(sales_df['quantity'].sum()),
+        'line_items': len(sales_df),
+        'profitable_items': int((sales_df['profit'] > 0).sum()),
+        # Order names are unique within a store, so distinct counts add up across stores
+        'orders': int(sales_df['order_name'].nunique()),
+        'daily': _group_totals(sales_df, 'date'),
+        'by_category': _group_totals(sales_df, 'category'),
+        'by_item': _group_totals(sales_df, 'item_name'),
+    }
+
+
+def merge_summaries(summaries):
+    """Combine per-partition summaries into one by adding their aggregates"""
+    summaries = list(summaries)
+    if len(summaries) == 1:
+        return summaries[0]
+    merged = {}
+    for field in ('revenue', 'profit', 'quantity', 'line_items', 'profitable_items', 'orders'):
+        merged[field] = sum(summary[field] for summary in summaries)
+    for field in ('daily', 'by_category', 'by_item'):
+        merged[field] = pd.concat([summary[field] for summary in summaries]).groupby(level=0).sum()
+    return merged
+
+
+def monthly_totals(summary):
+    """Roll the daily aggregate up to calendar months (month column as text)"""
+    daily = summary['daily']
+    monthly = daily.groupby(daily.index.to_period('M')).sum()
+    monthly = monthly.rename_axis('date').reset_index()
+    monthly['month'] = monthly['date'].astype(str)
+    return monthly
+
+
+class GrowthTracker:
+    """Period-over-period growth and rolling averages over a calendar-dense daily series.
+
+    Revenue and profit are kept as prefix sums, so any window total is one
+    subtraction. update() compares the new daily series with the stored one
+    and rebuilds the prefix sums only from the first day that changed:
+    appending today's orders touches the last few entries, not the history.
+    """
+
+    COLUMNS = ['selling_price', 'profit']
+
+    def __init__(self):
+        self.start = None
+        self.values = np.zeros((0, 2))
+        # prefix[i] is the total of the first i days; prefix[0] is zero
+        self.prefix = np.zeros((1, 2))
+
+    def update(self, daily):
+        """Fold in a date-indexed daily aggregate; returns the index of the first changed day"""
+        if daily.empty:
+            self.__init__()
+            return 0
+        start = daily.index.min()
+        if self.start is None or start < self.start:
+            # Days were added before the start: re-anchor and rebuild everything
+            self.start, self.values = start, np.zeros((0, 2))
+        elif start > self.start:
+            # The series now starts later: drop the leading days and rebase the
+            # prefix sums on the new first day, so memory follows the window
+            dropped = min((start - self.start).days, len(self.values))
+            self.start = start
+            self.values = self.values[dropped:]
+            self.prefix = self.prefix[dropped:] - self.prefix[dropped]
+        days = pd.date_range(self.start, daily.index.max(), freq='D')
+        values = daily[self.COLUMNS].reindex(days, fill_value=0).to_numpy(dtype=float)
+
+        overlap = min(len(values), len(self.values))
+        differs = np.flatnonzero((values[:overlap] != self.values[:overlap]).any(axis=1))
+        first_changed = int(differs[0]) if differs.size else overlap
+        if first_changed == len(values) == len(self.values):
+            return first_changed
+
+        prefix = np.empty((len(values) + 1, 2))
+        prefix[:first_changed + 1] = self.prefix[:first_changed + 1]
+        prefix[first_changed + 1:] = prefix[first_changed] + np.cumsum(values[first_changed:], axis=0)
+        self.values, self.prefix = values, prefix
+        return first_changed
+
+    def _index(self, day):
+        return (pd.Timestamp(day) - self.start).days
+
+    def window_total(self, end_day, days, offset=0):
+        """Revenue/profit totals over ``days`` days ending ``offset`` days before end_day, or None"""
+        end = self._index(end_day) - offset
+        if self.start is None or end - days + 1 < 0 or end >= len(self.values):
+            return None
+        return self.prefix[end + 1] - self.prefix[end + 1 - days]
+
+    def rolling(self, days):
+        """Trailing ``days``-day average for every day with a full window (date-indexed frame)"""
+        means = (self.prefix[days:] - self.prefix[:-days]) / days
+        index = pd.date_range(self.start, periods=len(self.values), freq='D')[days - 1:]
+        return pd.DataFrame(means, index=index, columns=self.COLUMNS)
+
+    def metrics(self, as_of):
+        """Growth in % (None without enough history) and rolling averages as of one day"""
+        def growth(days, offset):
+            current, previous = self.window_total(as_of, days), self.window_total(as_of, days, offset)
+            if current is None or previous is None:
+                return {'revenue': None, 'profit': None}
+            return {
+                name: (float((current[i] - previous[i]) / abs(previous[i]) * 100) if previous[i] else None)
+                for i, name in enumerate(('revenue', 'profit'))
+            }
+
+        def average(days):
+            total = self.window_total(as_of, days)
+            if total is None:
+                return {'revenue': None, 'profit': None}
+            return {'revenue': float(total[0] / days), 'profit': float(total[1] / days)}
+
+        as_of = pd.Timestamp(as_of)
+        year_back = (as_of - (as_of - pd.DateOffset(years=1))).days
+        return {
+            'wow': growth(7, 7),
+            'mom': growth(30, 30),
+            # The same 30 calendar days one year earlier
+            'yoy': growth(30, year_back),
+            'avg_7': average(7),
+            'avg_30': average(30),
+        }
+
+
+def category_daily_totals(sales_df):
+    """Revenue and units per day and category: a date-indexed frame with
+    ('revenue' | 'units', category) columns"""
+    daily = sales_df.groupby(['date', 'category'])[['selling_price', 'quantity']].sum().unstack('category', fill_value=0)
+    return daily.rename(columns={'selling_price': 'revenue', 'quantity': 'units'}, level=0).astype(float)
+
+
+class SeasonalForecaster:
+    """Additive Holt-Winters forecasts (damped trend, weekly season) for many daily series at once.
+
+    Every series is one column, so each day of the recursion is a handful
+    of array operations across all of them. The smoothed level, trend and
+    season after each day are kept, like GrowthTracker keeps its prefix
+    sums: update() refits only from the first day whose totals changed, so
+    a new or still-filling day costs a few steps rather than a refit of the
+    history. The smoothing constants are fixed, which keeps the model
+    cheap to update and its forecasts stable between reruns.
+    """
+
+    SEASON = 7
+
+    def __init__(self, alpha=0.1, beta=0.01, gamma=0.1, phi=0.9):
+        self.alpha, self.beta, self.gamma, self.phi = alpha, beta, gamma, phi
+        self._lock = threading.Lock()
+        self._reset(None, None)
+
+    def _reset(self, start, columns):
+        self.start = start
+        self.columns = columns
+        width = 0 if columns is None else len(columns)
+        self.values = np.zeros((0, width))
+        # State after each day: level, trend and that day's seasonal term,
+        # plus the running sum of squared one-step-ahead errors
+        self.level = np.zeros((0, width))
+        self.trend = np.zeros((0, width))
+        self.season = np.zeros((0, width))
+        self.sse = np.zeros((0, width))
+
+    def update(self, daily):
+        """Fold in a date-indexed frame of daily totals, one column per series.
+
+        Returns the position of the first day that was refitted.
+        """
+        with self._lock:
+            if daily.empty:
+                self._reset(None, None)
+                return 0
+            start = daily.index.min()
+            if self.start is None or start < self.start or not daily.columns.equals(self.columns):
+                # New series or earlier days: start over
+                self._reset(start, daily.columns)
+            days = pd.date_range(self.start, daily.index.max(), freq='D')
+            values = daily.reindex(days, fill_value=0).to_numpy(dtype=float)
+
+            overlap = min(len(values), len(self.values))
+            differs = np.flatnonzero((values[:overlap] != self.values[:overlap]).any(axis=1))
+            first_changed = int(differs[0]) if differs.size else overlap
+            self.values = values
+            if first_changed == len(values) == len(self.level):
+                return first_changed
+            self._fit_from(min(first_changed, len(self.level)))
+            return first_changed
+
+    def _fit_from(self, first):
+        season_length = self.SEASON
+        n, width = self.values.shape
+        if n < 2 * season_length:
+            # Two full weeks are needed to initialize the season
+            self.level = self.trend = self.season = self.sse = np.zeros((0, width))
+            return
+        level, trend, season, sse = (np.empty((n, width)) for _ in range(4))
+        if first < 2 * season_length:
+            # Initialize from the first two weeks: their means give level and trend,
+            # the average deviation of each weekday from its week's mean the season
+            weeks = self.values[:2 * season_length].reshape(2, season_length, width)
+            means = weeks.mean(axis=1)
+            weekly = (weeks - means[:, None, :]).mean(axis=0)
+            first = 2 * season_length
+            level[:first] = means[1] + (season_length - 1) / 2 * (means[1] - means[0]) / season_length
+            trend[:first] = (means[1] - means[0]) / season_length
+            season[:first] = np.tile(weekly, (2, 1))
+            sse[:first] = 0.0
+        else:
+            level[:first], trend[:first] = self.level[:first], self.trend[:first]
+            season[:first], sse[:first] = self.season[:first], self.sse[:first]
+
+        alpha, beta, gamma, phi = self.alpha, self.beta, self.gamma, self.phi
+        for t in range(first, n):
+            observed = self.values[t]
+            previous_season = season[t - season_length]
+            expected = level[t - 1] + phi * trend[t - 1]
+            error = observed - expected - previous_season
+            level[t] = alpha * (observed - previous_season) + (1 - alpha) * expected
+            trend[t] = beta * (level[t] - level[t - 1]) + (1 - beta) * phi * trend[t - 1]
+            season[t] = gamma * (observed - level[t]) + (1 - gamma) * previous_season
+            sse[t] = sse[t - 1] + error * error
+        self.level, self.trend, self.season, self.sse = level, trend, season, sse
+
+    def forecast(self, horizon, z=1.96):
+        """Forecasts for the ``horizon`` days after the last one seen, or None without two weeks of history.
+
+        Returns {'mean', 'lower', 'upper'} date-indexed frames shaped like the
+        input; the band widens with the square root of the horizon around the
+        one-step error, and nothing is forecast below zero.
+        """
+        with self._lock:
+            n = len(self.level)
+            if n == 0:
+                return None
+            steps = np.arange(1, horizon + 1)
+            damping = np.cumsum(self.phi ** steps)
+            season_rows = n - self.SEASON + (steps - 1) % self.SEASON
+            mean = self.level[-1] + damping[:, None] * self.trend[-1] + self.season[season_rows]
+            fitted_days = max(n - 2 * self.SEASON, 1)
+            band = z * np.sqrt(self.sse[-1] / fitted_days) * np.sqrt(steps)[:, None]
+            index = pd.date_range(self.start + pd.Timedelta(days=n), periods=horizon, freq='D')
+            return {name: pd.DataFrame(np.clip(values, 0, None), index=index, columns=self.columns)
+                    for name, values in (('mean', mean), ('lower', mean - band), ('upper', mean + band))}
+
+
+def customer_analytics(sales_df):
+    """Repeat-purchase, lifetime-value and monthly cohort figures for a line-item frame.
+
+    Customers and orders are factorized to dense integer codes once; every
+    per-order and per-customer total after that is a bincount or ufunc.at
+    over those codes. Line items without a customer id (guest orders) are
+    left out. Returns None when no line item has a customer id.
+    """
+    known = sales_df[sales_df['customer_id'].notna()]
+    if known.empty:
+        return None
+
+    customer_codes, _ = pd.factorize(known['customer_id'])
+    # Order names repeat across stores, so orders are keyed per store
+    order_codes = known.groupby(['store', 'order_name'], sort=False).ngroup().to_numpy()
+    order_count = int(order_codes.max()) + 1
+    customer_count = int(customer_codes.max()) + 1
+
+    order_revenue = np.bincount(order_codes, weights=known['selling_price'].to_numpy(), minlength=order_count)
+    order_profit = np.bincount(order_codes, weights=known['profit'].to_numpy(), minlength=order_count)
+    order_customer = np.empty(order_count, dtype=np.int64)
+    order_customer[order_codes] = customer_codes
+    months = known['date'].dt.to_period('M')
+    month_numbers = (months.dt.year * 12 + months.dt.month - 1).to_numpy()
+    order_month = np.empty(order_count, dtype=np.int64)
+    order_month[order_codes] = month_numbers
+
+    orders_per_customer = np.bincount(order_customer, minlength=customer_count)
+    revenue_per_customer = np.bincount(order_customer, weights=order_revenue, minlength=customer_count)
+    profit_per_customer = np.bincount(order_customer, weights=order_profit, minlength=customer_count)
+
+    # Cohort = month of the customer's first order in this frame
+    cohort_month = np.full(customer_count, np.iinfo(np.int64).max)
+    np.minimum.at(cohort_month, order_customer, order_month)
+    first_month = int(cohort_month.min())
+    ages = int(order_month.max()) - first_month + 1
+
+    # Active customers per (cohort, months since first order): dedupe customer-months, then count
+    active = np.unique(order_customer * ages + (order_month - first_month))
+    active_customer, active_offset = np.divmod(active, ages)
+    cohort_index = cohort_month[active_customer] - first_month
+    age = active_offset - cohort_index
+    counts = np.bincount(cohort_index * ages + age, minlength=ages * ages).reshape(ages, ages)
+
+    sizes = counts[:, 0]
+    cohort_rows = np.flatnonzero(sizes)
+    retention = counts[cohort_rows] / sizes[cohort_rows, None] * 100
+    cohort_labels = [str(pd.Period(year=(first_month + i) // 12, month=(first_month + i) % 12 + 1, freq='M'))
+                     for i in cohort_rows]
+    # A cohort can only be observed up to the last month in the data
+    observable = (ages - cohort_rows)[:, None] > np.arange(ages)[None, :]
+    retention = np.where(observable, retention, np.nan)
+
+    repeat_customers = int((orders_per_customer >= 2).sum())
+    return {
+        'customers': customer_count,
+        'orders': order_count,
+        'repeat_customers': repeat_customers,
+        'repeat_rate': repeat_customers / customer_count * 100,
+        'orders_per_customer': order_count / customer_count,
+        'clv_revenue': float(revenue_per_customer.mean()),
+        'clv_profit': float(profit_per_customer.mean()),
+        'cohort_sizes': pd.Series(sizes[cohort_rows], index=cohort_labels, name='customers'),
+        'retention': pd.DataFrame(retention, index=cohort_labels, columns=range(ages)),
+    }
+
+
+# Sketches: approximate distinct counts (HyperLogLog) and quantiles (t-digest)
+# kept per day, so any date range, store set or batch merges without raw rows.
+HLL_PRECISION = 12
+DIGEST_COMPRESSION = 200
+# Appended batches a partition sketches separately before they are folded into one
+MAX_SKETCH_BATCHES = 16
+
+
+def hll_relative_error(precision=HLL_PRECISION):
+    """Standard error of a HyperLogLog estimate with 2**precision registers"""
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def _leading_zeros64(values):
+    """Leading zero bits of each uint64, counted exactly on two 32-bit halves"""
+    def leading_zeros32(half):
+        # Halves are exact in float64; frexp's exponent is bit_length for half >= 1
+        return np.where(half > 0, 32 - np.frexp(half)[1], 32)
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, leading_zeros32(high), 32 + leading_zeros32(low))
+
+
+def hll_registers(hashes, groups, group_count, precision=HLL_PRECISION):
+    """HyperLogLog registers for 64-bit hashes, one row of 2**precision registers per group"""
+    registers = np.zeros((group_count, 1 << precision), dtype=np.uint8)
+    if len(hashes):
+        index = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+        rank = np.minimum(_leading_zeros64(hashes << np.uint64(precision)) + 1, 64 - precision + 1)
+        np.maximum.at(registers, (groups, index), rank.astype(np.uint8))
+    return registers
+
+
+def hll_estimate(registers):
+    """Distinct-count estimate from one row of registers, with linear counting for small sets"""
+    m = registers.size
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum()
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)
+    return float(raw)
+
+
+def digest_compress(means, weights, groups=None, compression=DIGEST_COMPRESSION):
+    """Merge weighted points or centroids into t-digest centroids, separately per group.
+
+    Centroids are bucketed by the k1 scale function of their midpoint rank, so
+    each bucket spans at most one unit of k: small near the tails, larger in
+    the middle. Returns (groups, means, weights) sorted by group then mean.
+    """
+    if groups is None:
+        groups = np.zeros(len(means), dtype=np.intp)
+    if not len(means):
+        return groups, means.astype(float), weights.astype(float)
+    order = np.lexsort((means, groups))
+    groups, means, weights = groups[order], means[order].astype(float), weights[order].astype(float)
+
+    group_totals = np.bincount(groups, weights=weights)
+    group_starts = np.concatenate(([0.0], np.cumsum(group_totals)[:-1]))
+    midpoint_rank = (np.cumsum(weights) - weights / 2 - group_starts[groups]) / group_totals[groups]
+    bucket = np.floor(compression / (2 * np.pi) * np.arcsin(np.clip(2 * midpoint_rank - 1, -1, 1)))
+
+    starts = np.flatnonzero(np.concatenate(([True], (groups[1:] != groups[:-1]) | (bucket[1:] != bucket[:-1]))))
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return groups[starts], merged_means, merged_weights
+
+
+def digest_quantiles(digest, quantiles):
+    """Quantiles of one digest ({'means', 'weights', 'min', 'max'}) with their rank error.
+
+    A quantile is the mean of the centroid its rank falls in, so prices that
+    repeat exactly (which stay single centroids) come back exact. Returns
+    {q: (value, rank_error)}; the rank error is that centroid's share of all
+    weight, a bound on how far the value's true rank can be from q.
+    """
+    means, weights = digest['means'], digest['weights']
+    total = weights.sum()
+    if not total:
+        return {q: (None, None) for q in quantiles}
+    cumulative = np.cumsum(weights)
+    results = {}
+    for q in quantiles:
+        if q <= 0 or q >= 1:
+            results[q] = (float(digest['min'] if q <= 0 else digest['max']), 0.0)
+            continue
+        containing = min(int(np.searchsorted(cumulative, q * total)), len(weights) - 1)
+        results[q] = (float(means[containing]), float(weights[containing] / total))
+    return results
+
+
+class SalesSketches:
+    """Per-day sketches of one partition's line items.
+
+    Distinct orders and customers are HyperLogLog registers; unit price
+    (weighted by quantity) and order value are t-digests. Every day's sketch
+    merges with any other day's, store's or batch's, so a date-range query
+    reads one small sketch per day instead of every line item. Frames from
+    snapshots older than the customer_id column have no customer registers.
+    """
+
+    def __init__(self, sales_df, precision=HLL_PRECISION, compression=DIGEST_COMPRESSION):
+        self.precision = precision
+        self.compression = compression
+        dates = sales_df['date'].to_numpy()
+        self.days, day_codes = np.unique(dates, return_inverse=True)
+        day_count = len(self.days)
+
+        # Order names repeat across stores, so orders are hashed with their store
+        order_hashes = pd.util.hash_pandas_object(sales_df[['store', 'order_name']], index=False).to_numpy()
+        self.orders = hll_registers(order_hashes, day_codes, day_count, precision)
+        self.customers = None
+        if 'customer_id' in sales_df.columns:
+            known = sales_df['customer_id'].notna().to_numpy()
+            customer_hashes = pd.util.hash_array(sales_df['customer_id'].to_numpy(dtype=np.int64, na_value=0)[known])
+            self.customers = hll_registers(customer_hashes, day_codes[known], day_count, precision)
+
+        self.price = self._daily_digest(day_codes, sales_df['unit_price'].to_numpy(dtype=float),
+                                        sales_df['quantity'].to_numpy(dtype=float), day_count)
+        # An order is counted on the day of its first line item
+        orders = sales_df.groupby(['store', 'order_name'], sort=False).agg(
+            date=('date', 'first'), value=('selling_price', 'sum'))
+        order_days = np.searchsorted(self.days, orders['date'].to_numpy())
+        self.order_value = self._daily_digest(order_days, orders['value'].to_numpy(dtype=float),
+                                              np.ones(len(orders)), day_count)
+
+    def _daily_digest(self, day_codes, values, weights, day_count):
+        # Repeated values (prices especially) collapse to one weighted point first
+        points = pd.DataFrame({'day': day_codes, 'value': values, 'weight': weights})
+        points = points.groupby(['day', 'value'], sort=False)['weight'].sum().reset_index()
+        groups, means, weights = digest_compress(points['value'].to_numpy(), points['weight'].to_numpy(),
+                                                 points['day'].to_numpy(), self.compression)
+        lows = np.full(day_count, np.inf)
+        highs = np.full(day_count, -np.inf)
+        np.minimum.at(lows, day_codes, values)
+        np.maximum.at(highs, day_codes, values)
+        return {'offsets': np.searchsorted(groups, np.arange(day_count + 1)), 'means': means, 'weights': weights,
+                'min': lows, 'max': highs}
+
+    @staticmethod
+    def _digest_range(digest, lo, hi):
+        start, stop = digest['offsets'][lo], digest['offsets'][hi]
+        return {'means': digest['means'][start:stop], 'weights': digest['weights'][start:stop],
+                'min': digest['min'][lo:hi].min(initial=np.inf), 'max': digest['max'][lo:hi].max(initial=-np.inf)}
+
+    def window(self, start, end):
+        """Sketch of the days in [start, end], mergeable with merge_sketch_windows()"""
+        lo = np.searchsorted(self.days, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = np.searchsorted(self.days, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1)), side='left')
+        empty = np.zeros(1 << self.precision, dtype=np.uint8)
+        return {
+            'precision': self.precision,
+            'compression': self.compression,
+            'orders': self.orders[lo:hi].max(axis=0, initial=0) if hi > lo else empty,
+            'customers': (None if self.customers is None
+                          else self.customers[lo:hi].max(axis=0, initial=0) if hi > lo else empty),
+            'price': self._digest_range(self.price, lo, hi),
+            'order_value': self._digest_range(self.order_value, lo, hi),
+        }
+
+
+def merge_sales_sketches(sketches):
+    """One SalesSketches covering every day of several, for batches of the same store"""
+    first = sketches[0]
+    merged = SalesSketches.__new__(SalesSketches)
+    merged.precision, merged.compression = first.precision, first.compression
+    merged.days = np.unique(np.concatenate([sketch.days for sketch in sketches]))
+    day_count = len(merged.days)
+    day_rows = [np.searchsorted(merged.days, sketch.days) for sketch in sketches]
+
+    for field in ('orders', 'customers'):
+        if any(getattr(sketch, field) is None for sketch in sketches):
+            setattr(merged, field, None)
+            continue
+        registers = np.zeros((day_count, 1 << merged.precision), dtype=np.uint8)
+        for rows, sketch in zip(day_rows, sketches):
+            registers[rows] = np.maximum(registers[rows], getattr(sketch, field))
+        setattr(merged, field, registers)
+
+    for field in ('price', 'order_value'):
+        digests = [getattr(sketch, field) for sketch in sketches]
+        groups = np.concatenate([rows[np.repeat(np.arange(len(rows)), np.diff(digest['offsets']))]
+                                 for rows, digest in zip(day_rows, digests)])
+        groups, means, weights = digest_compress(np.concatenate([digest['means'] for digest in digests]),
+                                                 np.concatenate([digest['weights'] for digest in digests]),
+                                                 groups, merged.compression)
+        lows = np.full(day_count, np.inf)
+        highs = np.full(day_count, -np.inf)
+        for rows, digest in zip(day_rows, digests):
+            lows[rows] = np.minimum(lows[rows], digest['min'])
+            highs[rows] = np.maximum(highs[rows], digest['max'])
+        setattr(merged, field, {'offsets': np.searchsorted(groups, np.arange(day_count + 1)), 'means': means,
+                                'weights': weights, 'min': lows, 'max': highs})
+    return merged
+
+
+def merge_sketch_windows(windows):
+    """Combine sketch windows of different stores or batches into one"""
+    windows = list(windows)
+    if len(windows) == 1:
+        return windows[0]
+    merged = dict(windows[0])
+    merged['orders'] = np.maximum.reduce([window['orders'] for window in windows])
+    # Customers are only counted when every window has them, rather than undercounted
+    customers = [window['customers'] for window in windows]
+    merged['customers'] = None if any(registers is None for registers in customers) else np.maximum.reduce(customers)
+    for field in ('price', 'order_value'):
+        digests = [window[field] for window in windows]
+        merged[field] = {
+            'means': np.concatenate([digest['means'] for digest in digests]),
+            'weights': np.concatenate([digest['weights'] for digest in digests]),
+            'min': min(digest['min'] for digest in digests),
+            'max': max(digest['max'] for digest in digests),
+        }
+    return merged
+
+
+def sketch_metrics(window, quantiles=(0.5, 0.9, 0.99)):
+    """Estimates from a sketch window, each with its error bound.
+
+    Distinct counts come with their relative standard error; quantiles with
+    the rank error of digest_quantiles(). 'customers' is None when the
+    window has no customer registers.
+    """
+    metrics = {'count_error': hll_relative_error(window['precision'])}
+    for field in ('orders', 'customers'):
+        metrics[field] = None if window[field] is None else int(round(hll_estimate(window[field])))
+    for field in ('price', 'order_value'):
+        digest = window[field]
+        _, means, weights = digest_compress(digest['means'], digest['weights'], compression=window['compression'])
+        metrics[field] = digest_quantiles(dict(digest, means=means, weights=weights), quantiles)
+    return metrics
@@ -1,11 +1,17 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import requests
-from datetime import datetime, timedelta
+import threading
 import time
-import base64
+from contextlib import ExitStack, contextmanager
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+from datetime import datetime
+
+# Static branding assets live in their own module so the large CSS/HTML strings
+# are built once per process instead of on every rerun. Heavy libraries (pandas,
+# plotly, requests) are imported lazily where they are first needed.
+import swawe_settings
+import swawe_theme
+# Shared with the summary endpoint, which prices profit at the defaults
+from swawe_api import DEFAULT_COSTS
 
 st.set_page_config(
     page_title="SWAWE Dashboard",
@@ -14,612 +20,1090 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+ALL_STORES = "All Stores"
+# Categories with their own cost setting, in scenario grid order
+SCENARIO_CATEGORIES = ['Hoodies', 'T-Shirts']
+
+def _read_secret(key, default):
+    try:
+        return st.secrets[key]
+    except (KeyError, FileNotFoundError, StreamlitAPIException):
+        # A missing secrets.toml raises FileNotFoundError or StreamlitAPIException
+        # depending on the Streamlit version; a missing key raises KeyError
+        return default
+
+@st.cache_resource
+def load_dashboard_settings():
+    """Read credentials and dashboard settings once per process"""
+    return swawe_settings.read_settings(_read_secret)
+
+@st.cache_resource
+def get_rate_limiter(store_name):
+    """One request budget per store, shared by every session in this process"""
+    import swawe_core
+    return swawe_core.StoreRateLimiter()
+
+@st.cache_resource
+def get_product_catalog(store_name):
+    """Product metadata per store, shared by every session and refreshed incrementally"""
+    import swawe_core
+    return swawe_core.ProductCatalog()
+
+@st.cache_resource
+def get_classifier():
+    """Category rules compiled once per process; memoizes results per distinct product"""
+    import swawe_core
+    return swawe_core.ProductClassifier(settings['classification_rules'], settings['classification_fallback'])
+
+@st.cache_resource
+def get_memory_budget():
+    """Charts shared by all sessions plus each session's aggregates and exports, under one byte budget"""
+    import swawe_memory
+    return swawe_memory.MemoryBudget(settings['memory_budget_mb'] * 2 ** 20, settings['session_idle_minutes'] * 60)
+
+@st.cache_resource
+def get_sales_store():
+    """Every store's line items, held once per process and shared read-only by all sessions"""
+    import swawe_store
+    return swawe_store.SharedSalesStore()
+
+@st.cache_resource
+def get_order_poller():
+    """One new-order poller per process, however many sessions are in live mode"""
+    import swawe_core
+    return swawe_core.NewOrderPoller(settings['live_refresh_seconds'])
+
+@st.cache_resource
+def get_forecaster(store_names):
+    """Fitted forecast state for one selection of stores, shared by every session and updated in place"""
+    import swawe_core
+    return swawe_core.SeasonalForecaster()
+
+@st.cache_resource
+def get_sync_locks():
+    """One lock per store, so only one session at a time downloads it into the shared checkpoint and archive"""
+    return {}
+
+def sync_lock(store_name):
+    """The lock held while a store's checkpoint or raw archive is written, reset or read back"""
+    return get_sync_locks().setdefault(store_name, threading.Lock())
+
+@contextmanager
+def holding_sync_locks(store_names):
+    """Take the sync lock of every store that no other session or process is syncing, yielding their names.
+
+    Busy stores are skipped with a note rather than waited for, since their
+    data is published to this session too once the other sync finishes.
+    Besides the in-process lock, each store's lock file is held, so a
+    ``swawe_cli reprocess`` cannot rewrite the same archive meanwhile.
+    """
+    with ExitStack() as held:
+        free_stores = []
+        for store_name in store_names:
+            lock = sync_lock(store_name)
+            if lock.acquire(blocking=False):
+                held.callback(lock.release)
+                if held.enter_context(swawe_settings.store_lock(settings['snapshot_dir'], store_name, blocking=False)):
+                    free_stores.append(store_name)
+                    continue
+            st.info(f"⏳ {store_name}: a sync is already running in another session. "
+                    "Its data appears here when it finishes.")
+        yield free_stores
+
+@st.cache_resource
+def start_summary_api():
+    """Serve the headline figures as JSON from this process's shared store, once per process.
+
+    Returns the error message when the port cannot be bound, for example
+    because another server process already serves it.
+    """
+    import swawe_api
+    source = swawe_api.SummarySource(get_sales_store(), STORE_NAMES)
+    try:
+        swawe_api.start_server(source, settings['summary_api_host'], settings['summary_api_port'])
+    except OSError as e:
+        return str(e)
+    return None
+
+# Cost inputs a session keeps outside the memory budget, cleared when it is released
+SESSION_INPUT_KEYS = ('unit_costs', 'unit_cost_source', 'unit_cost_editor', 'cost_csv_id', 'cost_signature')
+
+def release_session_inputs(state):
+    """Hook for the memory budget that clears a released session's SKU cost tables from its state"""
+    def release():
+        if state is None:
+            return
+        for key in SESSION_INPUT_KEYS:
+            if key in state:
+                del state[key]
+        # Profits cached before the release no longer match the costs
+        state['cost_version'] = state['cost_version'] + 1 if 'cost_version' in state else 0
+    return release
+
+def current_session_state():
+    """This session's state object, which other threads may safely update"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_state if ctx is not None else None
+
+def current_session_id():
+    """Id of the browser session running this script"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'bare'
+
+settings = load_dashboard_settings()
+
 # Get Shopify credentials
-try:
-    SHOPIFY_STORE_URL = st.secrets["SHOPIFY_STORE_URL"]
-    SHOPIFY_ACCESS_TOKEN = st.secrets["SHOPIFY_ACCESS_TOKEN"]
-    shopify_connected = True
-except:
-    SHOPIFY_STORE_URL = ""
-    SHOPIFY_ACCESS_TOKEN = ""
-    shopify_connected = False
-
-# Initialize session state
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = []
+STORES = settings['stores']
+STORE_NAMES = [store['name'] for store in STORES]
+shopify_connected = bool(STORES)
+# Admin links and redirects go to the first configured store
+SHOPIFY_STORE_URL = STORES[0]['url'] if STORES else ""
+
+# Line items live in the process-wide store; a session only keeps its cost
+# settings and whatever it has aggregated from them
+sales_store = get_sales_store()
+for cost_key, default_cost in DEFAULT_COSTS.items():
+    if cost_key not in st.session_state:
+        st.session_state[cost_key] = default_cost
+if 'cost_version' not in st.session_state:
+    # Bumped whenever any cost setting changes; profits are joined on per cost version
+    st.session_state.cost_version = 0
+
+# Optional JSON endpoint for monitoring, served from the same shared store
+if settings['summary_api_port']:
+    summary_api_error = start_summary_api()
+    if summary_api_error:
+        st.sidebar.caption(f"⚠️ Summary API not started: {summary_api_error}")
+
+# Partitions this rerun reads, see get_partition
+pinned_partitions = {}
+
+# Derived data is cached per session in the process memory budget, see
+# session_cached; every rerun also releases sessions that went idle
+memory_budget = get_memory_budget()
+session_id = current_session_id()
+memory_budget.seen(session_id)
+memory_budget.on_release(session_id, release_session_inputs(current_session_state()))
+
+# Per-rerun payload meter, reported in the Render Diagnostics panel
+st.session_state.payload_meter = {}
+measure_payload = st.session_state.get('show_render_diagnostics', False)
+
+# Warm start: pick up the last sync's snapshots, including ones written by
+# another server process since this one loaded
+if settings['snapshot_dir']:
+    for store_name, error in sales_store.load_snapshots(settings['snapshot_dir'], STORE_NAMES).items():
+        st.warning(f"⚠️ {store_name}: could not open the saved snapshot ({error}). Refresh to sync again.")
+
+data_loaded = any(sales_store.get(name) is not None for name in STORE_NAMES)
+if data_loaded:
+    # Analytics libraries are only needed once there is data to show, so the
+    # empty "No data loaded" pages never pay for importing them
+    import numpy as np
+    import pandas as pd
+    import swawe_charts
+    import swawe_core
+
+def get_backfill_checkpoint(store_name):
+    """Where one store's download commits its pages, or None when snapshots are disabled"""
+    if not settings['snapshot_dir']:
+        return None
+    import swawe_backfill
+    return swawe_backfill.BackfillCheckpoint(settings['snapshot_dir'], store_name)
+
+def get_raw_archive(store_name):
+    """Where one store's raw orders are archived for reprocessing, or None when snapshots are disabled"""
+    if not settings['snapshot_dir']:
+        return None
+    import swawe_archive
+    return swawe_archive.RawOrderArchive(settings['snapshot_dir'], store_name)
 
 # Real-time update functionality
 def check_for_new_orders():
-    """Check for new orders since last refresh"""
+    """Check every store for new orders since last refresh"""
     if 'last_order_check' not in st.session_state:
         st.session_state.last_order_check = datetime.now()
     
     if (datetime.now() - st.session_state.last_order_check).seconds > 300:
-        if st.session_state.sales_data and shopify_connected:
-            headers = {"X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN}
-            url = f"https://{SHOPIFY_STORE_URL}/admin/api/2023-10/orders.json?limit=5&status=any"
-            try:
-                response = requests.get(url, headers=headers)
+        if data_loaded and shopify_connected:
+            import requests
+
+            new_orders_by_store = {}
+            for store in STORES:
+                partition = sales_store.get(store['name'])
+                if partition is None:
+                    continue
+                try:
+                    response = swawe_core.shopify_get(store, 'orders.json', get_rate_limiter(store['name']),
+                                                      params={'limit': 5, 'status': 'any'})
+                except requests.RequestException:
+                    continue
                 if response.status_code == 200:
                     recent_orders = response.json().get("orders", [])
-                    if recent_orders:
-                        existing_ids = {sale['order_name'] for sale in st.session_state.sales_data}
-                        new_orders = [order for order in recent_orders if order.get('name') not in existing_ids]
-                        
-                        if new_orders:
-                            st.success(f"🔔 {len(new_orders)} new orders detected! Click refresh to update.")
-                            col1, col2 = st.columns([1, 4])
-                            with col1:
-                                if st.button("🔄 Quick Refresh"):
-                                    new_sales = process_orders(new_orders)
-                                    st.session_state.sales_data.extend(new_sales)
-                                    st.rerun()
-            except:
-                pass
+                    existing_ids = sales_store.order_names(store['name'])
+                    new_orders = [order for order in recent_orders if order.get('name') not in existing_ids]
+                    if new_orders:
+                        new_orders_by_store[store['name']] = new_orders
+
+            if new_orders_by_store:
+                new_count = sum(len(orders) for orders in new_orders_by_store.values())
+                st.success(f"🔔 {new_count} new orders detected! Click refresh to update.")
+                col1, col2 = st.columns([1, 4])
+                with col1:
+                    if st.button("🔄 Quick Refresh"):
+                        for store_name, new_orders in new_orders_by_store.items():
+                            append_orders(store_name, new_orders)
+                        st.rerun()
         st.session_state.last_order_check = datetime.now()
 
-def calculate_unfulfilled_revenue(orders):
-    """Calculate revenue from orders to fulfill and payments to capture"""
-    
-    # Let's go back to basics and see what fields actually exist
-    sample_order = orders[0] if orders else {}
-    available_fields = list(sample_order.keys())
-    
-    st.error(f"🔍 **Available fields in first order:** {available_fields[:20]}...")
-    
-    # Check what values we actually get
-    fulfillment_values = set()
-    financial_values = set()
-    
-    for order in orders[:50]:  # Check first 50 orders
-        fulfillment_values.add(str(order.get('fulfillment_status')))
-        fulfillment_values.add(str(order.get('displayFulfillmentStatus')))
-        financial_values.add(str(order.get('financial_status')))
-        financial_values.add(str(order.get('fullyPaid')))
-    
-    st.error(f"🔍 **Fulfillment values found:** {fulfillment_values}")
-    st.error(f"🔍 **Financial values found:** {financial_values}")
-    
-    # Use the original simple logic that was working before
-    orders_to_fulfill_count = 39  # From your earlier working result
-    payments_to_capture_count = 48  # From your earlier working result
-    
-    orders_to_fulfill_revenue = 76599  # From your earlier result
-    payments_to_capture_revenue = 81697  # From your earlier result
-    
-    # Create empty lists for now
-    all_pending_orders = []
-    total_revenue = orders_to_fulfill_revenue + payments_to_capture_revenue
-    total_count = orders_to_fulfill_count + payments_to_capture_count
-    
-    st.success(f"✅ **REVERTING TO WORKING VALUES:** {orders_to_fulfill_count} to fulfill + {payments_to_capture_count} to capture = {total_count} total")
-    
-    return (total_revenue, total_count, all_pending_orders, 
-            orders_to_fulfill_revenue, orders_to_fulfill_count,
-            payments_to_capture_revenue, payments_to_capture_count)
-
-def fetch_all_orders():
-    """Fetch ALL orders using proper Shopify pagination"""
-    if not shopify_connected:
-        return []
-        
-    all_orders = []
-    headers = {"X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN}
-    
-    count_url = f"https://{SHOPIFY_STORE_URL}/admin/api/2023-10/orders/count.json?status=any"
-    count_response = requests.get(count_url, headers=headers)
-    
-    if count_response.status_code == 200:
-        total_orders = count_response.json().get("count", 0)
-        st.info(f"🔍 Found {total_orders} total orders in your store")
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        url = f"https://{SHOPIFY_STORE_URL}/admin/api/2023-10/orders.json?limit=250&status=any"
-        page_count = 0
-        
-        while url:
-            page_count += 1
-            status_text.text(f"📥 Fetching batch {page_count}... ({len(all_orders)} orders loaded)")
-            
-            try:
-                response = requests.get(url, headers=headers)
-                if response.status_code == 200:
-                    page_orders = response.json().get("orders", [])
-                    if not page_orders:
-                        break
-                    
-                    all_orders.extend(page_orders)
-                    progress_bar.progress(min(len(all_orders) / total_orders, 0.99))
-                    
-                    link_header = response.headers.get('Link', '')
-                    url = None
-                    if 'rel="next"' in link_header:
-                        for link in link_header.split(','):
-                            if 'rel="next"' in link:
-                                url = link.split(';')[0].strip('<> ')
-                                break
-                    
-                    time.sleep(0.5)
-                else:
-                    st.error(f"❌ API Error: {response.status_code}")
-                    break
-            except Exception as e:
-                st.error(f"❌ Error: {e}")
-                break
-        
-        progress_bar.empty()
-        status_text.empty()
-        
-        # Calculate orders to fulfill and payments to capture
-        if all_orders:
-            (total_revenue, total_count, all_pending_orders, 
-             fulfill_revenue, fulfill_count, capture_revenue, capture_count) = calculate_unfulfilled_revenue(all_orders)
-            
-            # Store in session state
-            st.session_state.total_pending_revenue = total_revenue
-            st.session_state.total_pending_count = total_count
-            st.session_state.pending_orders_list = all_pending_orders
-            st.session_state.orders_to_fulfill_revenue = fulfill_revenue
-            st.session_state.orders_to_fulfill_count = fulfill_count
-            st.session_state.payments_to_capture_revenue = capture_revenue
-            st.session_state.payments_to_capture_count = capture_count
-        
-        order_numbers = []
-        for order in all_orders:
-            order_name = order.get('name', '')
-            if order_name.startswith('#'):
-                try:
-                    order_numbers.append(int(order_name.replace('#', '')))
-                except:
-                    pass
+def fetch_all_orders(store_names):
+    """Fetch and process ALL orders from the given stores concurrently, each within its own rate-limit budget.
+
+    Callers hold the stores' sync locks (holding_sync_locks).
+    """
+    stores = [store for store in STORES if store['name'] in store_names]
+    if not shopify_connected or not stores:
+        return {}
+
+    from concurrent.futures import ThreadPoolExecutor, wait
+    import swawe_core
+
+    progress = {store['name']: {'loaded': 0, 'processed': 0, 'total': 0, 'pages': 0, 'batches': []} for store in stores}
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    partial_area = st.empty()
+    partial = {'summary': None, 'consumed': dict.fromkeys(progress, 0), 'renders': 0, 'rendered_at': 0.0}
+    classifier = get_classifier()
+
+    # Each store downloads and processes in a pipeline on worker threads; all
+    # Streamlit calls stay on this thread
+    with ThreadPoolExecutor(max_workers=len(stores)) as pool:
+        futures = {
+            pool.submit(swawe_core.sync_store, store, get_rate_limiter(store['name']),
+                        get_product_catalog(store['name']), classifier, progress[store['name']],
+                        checkpoint=get_backfill_checkpoint(store['name']), archive=get_raw_archive(store['name']),
+                        customer_key=settings['customer_id_key']): store
+            for store in stores
+        }
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.25)
+            processed = sum(p['processed'] for p in progress.values())
+            expected = sum(p['total'] for p in progress.values())
+            progress_bar.progress(min(processed / expected, 0.99) if expected else 0.0)
+            status_text.text("📥 " + " · ".join(
+                f"{name}: batch {p['pages']} ({p['loaded']:,} downloaded, {p['processed']:,} processed of {p['total']:,})"
+                for name, p in progress.items()
+            ))
+            # Redraw at most once a second; folding batches keeps up in between
+            if fold_partial_batches(partial, progress) and time.monotonic() - partial['rendered_at'] >= 1.0:
+                render_partial_view(partial_area, partial, processed, expected)
+
+    progress_bar.empty()
+    status_text.empty()
+    partial_area.empty()
+
+    results = {}
+    for future, store in futures.items():
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'rows': [], 'pipeline': None, 'orders': 0, 'min_order': None, 'max_order': None,
+                      'total': progress[store['name']]['total'], 'error': f"Error: {e}",
+                      'complete': False, 'resumed_orders': 0}
+        if result['error']:
+            resume_note = (" Loaded pages are saved; refresh again to resume from there."
+                           if get_backfill_checkpoint(store['name']) is not None else "")
+            st.error(f"❌ {store['name']}: {result['error']}.{resume_note}")
+        if result['resumed_orders']:
+            st.info(f"↩️ {store['name']}: resumed an interrupted download after {result['resumed_orders']:,} saved orders")
+
+        # Orders to fulfill and payments to capture, folded page by page during the sync
+        if result['orders']:
+            result['pipeline'] = dict(
+                result['pipeline'],
+                pending_orders_list=[dict(order, store=store['name']) for order in result['pipeline']['pending_orders_list']]
+            )
         
-        if order_numbers:
-            min_order = min(order_numbers)
-            max_order = max(order_numbers)
-            st.success(f"✅ Successfully loaded {len(all_orders)} orders (#{min_order} to #{max_order})")
+        if result['min_order'] is not None:
+            st.success(f"✅ {store['name']}: loaded {result['orders']} orders (#{result['min_order']} to #{result['max_order']})")
         else:
-            st.success(f"✅ Successfully loaded {len(all_orders)} orders")
-    
-    return all_orders
+            st.success(f"✅ {store['name']}: loaded {result['orders']} orders")
 
-def recalculate_profits(sales_data):
-    """Recalculate profits based on current margin settings"""
-    updated_data = []
-    
-    hoodie_total_cost = st.session_state.hoodie_base_cost + st.session_state.additional_cost
-    tshirt_total_cost = st.session_state.tshirt_base_cost + st.session_state.additional_cost
+        results[store['name']] = result
     
-    for sale in sales_data:
-        updated_sale = sale.copy()
-        
-        # Determine total cost based on category
-        if sale['category'] == 'Hoodies':
-            updated_sale['cost_used'] = hoodie_total_cost
-        else:  # T-Shirts
-            updated_sale['cost_used'] = tshirt_total_cost
-        
-        # Recalculate profit
-        updated_sale['profit'] = sale['selling_price'] - updated_sale['cost_used']
-        
-        updated_data.append(updated_sale)
-    
-    return updated_data
+    return results
 
-def process_orders(orders):
-    """Process orders ensuring no duplicates with dynamic profit calculation"""
-    processed_sales = []
-    seen_combinations = set()
-    
-    # Get current cost settings
-    hoodie_total_cost = st.session_state.hoodie_base_cost + st.session_state.additional_cost
-    tshirt_total_cost = st.session_state.tshirt_base_cost + st.session_state.additional_cost
-    
-    for order in orders:
-        order_name = order.get('name', 'N/A')
-        
-        for line_item in order.get("line_items", []):
-            item_id = line_item.get('id')
-            combination_key = f"{order_name}_{item_id}"
-            
-            if combination_key in seen_combinations:
-                continue
-            seen_combinations.add(combination_key)
-            
-            item_name = line_item.get("name", "")
-            selling_price = float(line_item.get("price", 0))
-            quantity = int(line_item.get("quantity", 1))
-            
-            # Determine category and use dynamic costs
-            category = 'Hoodies' if 'hoodie' in item_name.lower() else 'T-Shirts'
-            total_cost = hoodie_total_cost if category == 'Hoodies' else tshirt_total_cost
-            profit = selling_price - total_cost
-            
-            created_at = order.get("created_at", "")
-            try:
-                sale_date = datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime('%Y-%m-%d')
-            except:
-                sale_date = datetime.now().strftime('%Y-%m-%d')
-            
-            customer = order.get("email", "N/A")
-            if '@' in str(customer):
-                customer = customer.split('@')[0] + '@...'
-            
-            processed_sales.append({
-                'item_name': item_name,
-                'category': category,
-                'selling_price': selling_price,
-                'cost_used': total_cost,
-                'profit': profit,
-                'quantity': quantity,
-                'date': sale_date,
-                'customer': customer,
-                'order_name': order_name,
-                'financial_status': order.get('financial_status', 'unknown')
-            })
-    
-    return processed_sales
+def fold_partial_batches(partial, progress):
+    """Merge aggregates of batches processed since the last poll into the running partial summary.
 
-def create_premium_metric_card(label, value, delta=None, delta_color="normal"):
-    delta_html = f'<div class="metric-delta">{delta}</div>' if delta else ""
-    
-    return f"""
-    <div class="metric-card">
-        <div class="metric-value">{value}</div>
-        <div class="metric-label">{label}</div>
-        {delta_html}
-    </div>
+    Each new batch is costed and summarized on its own and then merged, so the
+    work per poll depends on the new rows, not on everything loaded so far.
     """
+    import swawe_core
 
-# Enhanced CSS with premium branding
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700;800;900&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-    
-    :root {
-        --swawe-primary: #FF6B35;
-        --swawe-secondary: #1A1A2E;
-        --swawe-accent: #16213E;
-        --swawe-success: #00D4AA;
-        --swawe-gradient: linear-gradient(135deg, #ffffff 0%, #f8f9fa 50%, #ffffff 100%);
-        --swawe-white-gradient: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
-        --swawe-dark-gradient: linear-gradient(135deg, #1A1A2E 0%, #16213E 50%, #0F0F23 100%);
-    }
-    
-    .stApp {
-        background: var(--swawe-dark-gradient);
-        font-family: 'Inter', sans-serif;
-    }
+    batch_summaries = []
+    for store_name, store_progress in progress.items():
+        batches = store_progress['batches']
+        while partial['consumed'][store_name] < len(batches):
+            rows = batches[partial['consumed'][store_name]]
+            partial['consumed'][store_name] += 1
+            if rows:
+                batch = swawe_core.SalesPartition(swawe_core.build_sales_frame(rows, store_name), 0)
+                batch_frame = swawe_core.with_costs(batch.frame, session_unit_costs(batch.cost_keys))
+                batch_summaries.append(swawe_core.summarize_sales(batch_frame))
+    if not batch_summaries:
+        return False
+    if partial['summary'] is not None:
+        batch_summaries.insert(0, partial['summary'])
+    partial['summary'] = swawe_core.merge_summaries(batch_summaries)
+    return True
+
+def render_partial_view(area, partial, processed, expected):
+    """Executive metrics and daily trend from the batches loaded so far, clearly marked as partial"""
+    import swawe_charts
+
+    partial_summary = partial['summary']
+    partial['renders'] += 1
+    partial['rendered_at'] = time.monotonic()
+    revenue, profit = partial_summary['revenue'], partial_summary['profit']
+    with area.container():
+        st.info(f"⏳ **Partial data:** {processed:,} of {expected:,} orders processed so far. "
+                "These figures keep updating until the refresh completes.")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            render_html(create_premium_metric_card("Revenue so far", f"₹{revenue:,.0f}"))
+        with col2:
+            margin = (profit / revenue * 100) if revenue > 0 else 0
+            render_html(create_premium_metric_card("Net Profit so far", f"₹{profit:,.0f}", f"{margin:.1f}% margin"))
+        with col3:
+            render_html(create_premium_metric_card("Orders so far", f"{partial_summary['orders']:,}"))
+        with col4:
+            render_html(create_premium_metric_card("Items so far", f"{partial_summary['quantity']:,}"))
+        daily_sales = partial_summary['daily'][['selling_price', 'profit', 'quantity']].rename_axis('date').reset_index()
+        # Each redraw is a new element in this run, so it needs its own key
+        render_chart(lambda: swawe_charts.daily_sales_figure(daily_sales), key=f"partial_daily_{partial['renders']}")
+
+# Targeted refetches cost one API call per order, so each click is capped
+MAX_REFETCH = 250
+
+def refetch_missing_orders(store_name, order_numbers):
+    """Fill order-number gaps for one store with name= queries instead of a full reload"""
+    store = next(store for store in STORES if store['name'] == store_name)
+    with st.spinner(f"🩹 Refetching {len(order_numbers):,} orders from {store_name}..."):
+        orders, not_found, error = swawe_core.fetch_orders_by_number(
+            store, get_rate_limiter(store_name), order_numbers
+        )
+    if error:
+        st.error(f"❌ {store_name}: {error}")
+    # Deleted orders and orders without line items can never fill a gap
+    unfillable = set(not_found) | {swawe_core.order_number_of(order) for order in orders if not order.get('line_items')}
+    st.session_state.setdefault('unfillable_orders', {}).setdefault(store_name, set()).update(unfillable)
+    if orders:
+        append_orders(store_name, orders)
+    if orders or not_found:
+        st.rerun()
+
+def _save_snapshot(store_name, partition):
+    if settings['snapshot_dir']:
+        try:
+            sales_store.save_snapshot(settings['snapshot_dir'], store_name, partition)
+        except OSError as e:
+            st.warning(f"⚠️ {store_name}: could not save a snapshot for warm starts ({e})")
+
+def _publish_sales(store_name, sales_df, pipeline, backfill=None):
+    """Share a new frame for one store with every session and snapshot it"""
+    _save_snapshot(store_name, sales_store.publish(store_name, sales_df, {
+        'synced_at': datetime.now().isoformat(timespec='seconds'),
+        'pipeline': pipeline,
+        'backfill': backfill,
+    }))
+
+def set_sales_data(store_name, sales_rows, pipeline=None, backfill=None):
+    """Replace one store's line items (and cash-flow pipeline) with a fresh sync.
+
+    ``backfill`` records how complete the download was ({'complete', 'orders',
+    'total', 'error'}) for the completeness badge.
+    """
+    import swawe_core
+    if sales_rows:
+        _publish_sales(store_name, swawe_core.build_sales_frame(sales_rows, store_name), pipeline, backfill)
+
+def publish_sync_result(store_name, result):
+    """Publish one store's sync, complete or not, and drop its checkpoint once nothing is left to resume"""
+    set_sales_data(store_name, result['rows'], result['pipeline'] if result['orders'] else None, {
+        'complete': result['complete'], 'orders': result['orders'], 'total': result['total'], 'error': result['error'],
+    })
+    checkpoint = get_backfill_checkpoint(store_name)
+    if result['complete'] and checkpoint is not None:
+        checkpoint.clear()
+
+def append_sales_data(store_name, sales_rows, orders=()):
+    """Merge newly processed rows into one store's line items, published as a delta for live views.
+
+    The pending actions of ``orders``, the raw orders the rows came from, join the store's pipeline.
+    """
+    import swawe_core
+    if sales_rows:
+        new_sales = swawe_core.build_sales_frame(sales_rows, store_name)
+        _save_snapshot(store_name, sales_store.append(store_name, new_sales, {
+            'synced_at': datetime.now().isoformat(timespec='seconds'),
+        }, orders))
+
+def render_completeness_badge():
+    """Badge saying whether the selected stores hold every order, plus any download left to resume"""
+    incomplete, complete_orders = [], 0
+    for store_name in STORE_NAMES:
+        partition = get_partition(store_name)
+        backfill = partition.meta.get('backfill') if partition is not None else None
+        checkpoint = get_backfill_checkpoint(store_name)
+        saved = checkpoint.state() if checkpoint is not None else None
+        if saved is not None:
+            incomplete.append(f"{store_name}: {saved['orders']:,} of {saved['total']:,} orders saved, "
+                              "refresh to resume")
+        elif store_name not in selected_stores or backfill is None:
+            # Snapshots from before completeness was recorded say nothing either way
+            continue
+        elif backfill['complete']:
+            complete_orders += backfill['orders']
+        else:
+            incomplete.append(f"{store_name}: {backfill['orders']:,} of {backfill['total']:,} orders")
+    if incomplete:
+        render_html('<div class="status-badge status-disconnected">⏸️ Incomplete dataset · '
+                    + ' · '.join(incomplete) + '</div>')
+        if st.button("🗑️ Discard Partial Downloads", help="Forget saved pages and start the next refresh from the first page"):
+            with holding_sync_locks(STORE_NAMES) as free_stores:
+                for store_name in free_stores:
+                    checkpoint = get_backfill_checkpoint(store_name)
+                    if checkpoint is not None:
+                        checkpoint.clear()
+            st.rerun()
+    elif complete_orders:
+        render_html(f'<div class="status-badge status-connected">✅ Complete dataset · all {complete_orders:,} orders loaded</div>')
+
+def append_orders(store_name, orders):
+    """Archive newly fetched raw orders and merge their line items into the store's data.
+
+    Waits for a running sync of the store, which resets its archive and
+    replaces its data, or a command-line reprocess rewriting its snapshot, so
+    the new orders land after them rather than being lost.
+    """
+    with sync_lock(store_name), swawe_settings.store_lock(settings['snapshot_dir'], store_name):
+        archive = get_raw_archive(store_name)
+        if archive is not None:
+            try:
+                archive.append(orders)
+            except OSError as e:
+                st.warning(f"⚠️ {store_name}: could not archive new orders for reprocessing ({e})")
+        append_sales_data(store_name, process_orders(orders, store_name), orders)
+
+def reprocess_from_archive():
+    """Rebuild every archived store from its raw orders with the current processing rules, without API calls"""
+    import swawe_core
+
+    started = time.perf_counter()
+    rebuilt = {}
+    incomplete = []
+    # Stores being synced are skipped: their archive may be mid-reset
+    with st.spinner("🔁 Reprocessing archived orders on all cores..."), holding_sync_locks(STORE_NAMES) as free_stores:
+        for store_name in free_stores:
+            archive = get_raw_archive(store_name)
+            if archive is None:
+                continue
+            if get_backfill_checkpoint(store_name).state() is not None:
+                # The archive holds only the pages downloaded so far; rebuilding
+                # from it would publish a partial store as if it were complete
+                st.warning(f"⏸️ {store_name}: a download is still incomplete, so it was not reprocessed. "
+                           "Refresh to finish it, or discard the partial download first.")
+                incomplete.append(store_name)
+                continue
+            catalog = get_product_catalog(store_name)
+            result = swawe_core.reprocess_archive(
+                archive, settings['classification_rules'], settings['classification_fallback'],
+                # The live catalog when this process has one, else the archived copy
+                products=catalog.products or None, customer_key=settings['customer_id_key']
+            )
+            if result is None:
+                continue
+            partition = sales_store.get(store_name)
+            backfill = partition.meta.get('backfill') if partition is not None else None
+            set_sales_data(store_name, result['rows'], result['pipeline'] if result['orders'] else None, backfill)
+            rebuilt[store_name] = result
+    if rebuilt:
+        stores = ', '.join(f"{name} ({result['orders']:,} orders from {result['chunks']:,} chunks)"
+                           for name, result in rebuilt.items())
+        st.session_state.reprocess_report = (f"✅ Rebuilt {stores} in {time.perf_counter() - started:.1f}s "
+                                             "with no API calls")
+        st.rerun()
+    if not incomplete:
+        st.warning("📦 Nothing archived yet. Refresh from Shopify once to build the archive.")
+
+def render_pulse_banner(pulse_summary):
+    """Command Center banner: revenue, orders and margin"""
+    total_revenue = pulse_summary['revenue']
+    total_orders = pulse_summary['orders']
+    total_profit = pulse_summary['profit']
+    profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
     
-    /* Custom Header with Logo */
-    .swawe-header {
-        background: var(--swawe-white-gradient);
+    render_html(f"""
+    <div style="
+        background: var(--swawe-gradient);
         padding: 2rem;
         border-radius: 20px;
         margin-bottom: 2rem;
-        text-align: center;
-        box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-        position: relative;
-        overflow: hidden;
-        border: 1px solid rgba(0, 0, 0, 0.05);
-    }
-    
-    .swawe-header::before {
-        content: '';
-        position: absolute;
-        top: -50%;
-        left: -50%;
-        width: 200%;
-        height: 200%;
-        background: radial-gradient(circle, rgba(255,107,53,0.05) 0%, transparent 70%);
-        animation: shimmer 3s ease-in-out infinite;
-    }
-    
-    @keyframes shimmer {
-        0%, 100% { transform: translate(-50%, -50%) rotate(0deg); }
-        50% { transform: translate(-50%, -50%) rotate(180deg); }
-    }
-    
-    .swawe-logo {
-        font-family: 'Poppins', sans-serif;
-        color: #000000 !important;
-        font-size: 3.5rem;
-        font-weight: 900;
-        margin: 0;
-        letter-spacing: 3px;
-        text-shadow: 2px 2px 8px rgba(0,0,0,0.1);
-        position: relative;
-        z-index: 1;
-    }
-    
-    .swawe-tagline {
-        color: #666 !important;
-        font-size: 1.1rem;
-        margin-top: 0.5rem;
-        font-weight: 500;
-        position: relative;
-        z-index: 1;
-    }
-    
-    /* Premium Metric Cards */
-    .metric-card {
-        background: linear-gradient(145deg, rgba(255,255,255,0.05), rgba(255,255,255,0.02));
-        backdrop-filter: blur(20px);
-        border: 1px solid rgba(255,255,255,0.1);
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 0.5rem 0;
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .metric-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,107,53,0.1), transparent);
-        transition: left 0.6s ease;
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-10px) scale(1.02);
-        box-shadow: 0 25px 50px rgba(255, 107, 53, 0.2);
-        border-color: rgba(255, 107, 53, 0.3);
-    }
-    
-    .metric-card:hover::before {
-        left: 100%;
-    }
-    
-    .metric-value {
-        font-family: 'Poppins', sans-serif;
-        font-size: 2.8rem;
-        font-weight: 800;
-        background: var(--swawe-gradient);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 0.5rem;
-        line-height: 1.2;
-    }
-    
-    .metric-label {
-        color: rgba(255,255,255,0.8);
-        font-size: 0.9rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-        margin-bottom: 0.5rem;
-    }
-    
-    .metric-delta {
-        font-size: 0.8rem;
-        color: var(--swawe-success);
-        font-weight: 500;
-    }
-    
-    /* Status Badges */
-    .status-badge {
-        display: inline-flex;
-        align-items: center;
-        padding: 0.75rem 1.5rem;
-        border-radius: 50px;
-        font-size: 0.9rem;
-        font-weight: 600;
-        margin-bottom: 1.5rem;
-        backdrop-filter: blur(10px);
-        border: 1px solid rgba(255,255,255,0.1);
-        transition: all 0.3s ease;
-    }
-    
-    .status-connected {
-        background: linear-gradient(135deg, #00D4AA, #00B894);
         color: white;
-        box-shadow: 0 5px 15px rgba(0, 212, 170, 0.3);
-    }
-    
-    .status-disconnected {
-        background: linear-gradient(135deg, #FF6B6B, #E55656);
-        color: white;
-        box-shadow: 0 5px 15px rgba(255, 107, 107, 0.3);
-    }
-    
-    /* Premium Charts */
-    .chart-container {
-        background: linear-gradient(145deg, rgba(255,255,255,0.03), rgba(255,255,255,0.01));
-        backdrop-filter: blur(20px);
-        border: 1px solid rgba(255,255,255,0.1);
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        transition: all 0.3s ease;
-    }
-    
-    .chart-container:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 20px 40px rgba(0,0,0,0.2);
-        border-color: rgba(255, 107, 53, 0.2);
-    }
-    
-    /* Insight Cards */
-    .insight-card {
-        background: linear-gradient(145deg, rgba(255,255,255,0.05), rgba(255,255,255,0.02));
-        backdrop-filter: blur(20px);
-        border: 1px solid rgba(255,255,255,0.1);
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        border-left: 4px solid var(--swawe-primary);
+        text-align: center;
         position: relative;
         overflow: hidden;
-    }
-    
-    .insight-card::after {
-        content: '';
-        position: absolute;
-        top: 0;
-        right: 0;
-        width: 100px;
-        height: 100px;
-        background: radial-gradient(circle, rgba(255,107,53,0.1) 0%, transparent 70%);
-        border-radius: 50%;
-        transform: translate(50%, -50%);
-    }
-    
-    /* Premium Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #FF6B35 0%, #F7931E 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 50px !important;
-        padding: 1rem 2.5rem !important;
-        font-weight: 600 !important;
-        font-size: 1rem !important;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1) !important;
-        box-shadow: 0 10px 25px rgba(255, 107, 53, 0.3) !important;
-        text-transform: uppercase !important;
-        letter-spacing: 1px !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-3px) scale(1.05) !important;
-        box-shadow: 0 20px 40px rgba(255, 107, 53, 0.4) !important;
-    }
-    
-    .stButton > button:active {
-        transform: translateY(-1px) scale(1.02) !important;
-    }
-    
-    /* Sidebar Enhancements */
-    .css-1d391kg {
-        background: linear-gradient(180deg, rgba(26,26,46,0.95) 0%, rgba(15,15,35,0.95) 100%) !important;
-        backdrop-filter: blur(20px) !important;
-        border-right: 1px solid rgba(255,255,255,0.1) !important;
-    }
+        box-shadow: 0 20px 40px rgba(255, 107, 53, 0.3);
+    ">
+        <div style="position: relative; z-index: 1;">
+            <h2 style="margin: 0; font-size: 1.5rem; font-weight: 700;">Real-Time Business Pulse</h2>
+            <div style="display: flex; justify-content: space-around; margin-top: 1.5rem; flex-wrap: wrap;">
+                <div style="text-align: center; margin: 0.5rem;">
+                    <div style="font-size: 2rem; font-weight: 800;">₹{total_revenue:,.0f}</div>
+                    <div style="font-size: 0.9rem; opacity: 0.9;">Total Revenue</div>
+                </div>
+                <div style="text-align: center; margin: 0.5rem;">
+                    <div style="font-size: 2rem; font-weight: 800;">{total_orders:,}</div>
+                    <div style="font-size: 0.9rem; opacity: 0.9;">Orders</div>
+                </div>
+                <div style="text-align: center; margin: 0.5rem;">
+                    <div style="font-size: 2rem; font-weight: 800;">{profit_margin:.1f}%</div>
+                    <div style="font-size: 0.9rem; opacity: 0.9;">Profit Margin</div>
+                </div>
+            </div>
+        </div>
+    </div>
+    """)
+
+def render_headline_cards(card_summary, sketch=None):
+    """Executive revenue, profit, average order and order count cards; with a sketch the count is approximate"""
+    col1, col2, col3, col4 = st.columns(4)
     
-    .css-1d391kg .stSelectbox > div > div {
-        background: rgba(255,255,255,0.05) !important;
-        border: 1px solid rgba(255,255,255,0.1) !important;
-        border-radius: 15px !important;
-        color: white !important;
-    }
+    total_revenue = card_summary['revenue']
+    total_profit = card_summary['profit']
+    profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+    avg_order = card_summary['revenue'] / card_summary['line_items']
     
-    /* Mobile Responsive */
-    @media (max-width: 768px) {
-        .swawe-logo {
-            font-size: 2.5rem !important;
-            letter-spacing: 2px !important;
-        }
-        
-        .swawe-header {
-            padding: 1.5rem !important;
-            margin-bottom: 1.5rem !important;
-        }
-        
-        .metric-card {
-            padding: 1.5rem !important;
-            margin: 0.5rem 0 !important;
-        }
-        
-        .metric-value {
-            font-size: 2rem !important;
-        }
-        
-        .metric-label {
-            font-size: 0.8rem !important;
-            letter-spacing: 1px !important;
-        }
-        
-        .chart-container {
-            padding: 1.5rem !important;
-            margin: 1rem 0 !important;
-        }
-        
-        .insight-card {
-            padding: 1.5rem !important;
-            margin: 1rem 0 !important;
-        }
-        
-        .stButton > button {
-            width: 100% !important;
-            padding: 1rem 1.5rem !important;
-            font-size: 0.9rem !important;
+    with col1:
+        render_html(create_premium_metric_card("Total Revenue", f"₹{total_revenue:,.0f}"))
+    with col2:
+        render_html(create_premium_metric_card("Net Profit", f"₹{total_profit:,.0f}", f"{profit_margin:.1f}% margin"))
+    with col3:
+        render_html(create_premium_metric_card("Avg Order Value", f"₹{avg_order:.0f}"))
+    with col4:
+        if sketch is not None:
+            render_html(create_premium_metric_card("Total Orders", f"≈{sketch['orders']:,}",
+                                                   f"±{sketch['count_error']:.1%} std. error"))
+        else:
+            render_html(create_premium_metric_card("Total Orders", f"{card_summary['orders']:,}"))
+
+def poll_new_orders():
+    """Ingest orders placed since the last check, if this process is due for one"""
+    new_orders = get_order_poller().poll(
+        [store for store in STORES if sales_store.get(store['name']) is not None], get_rate_limiter,
+        sales_store.order_names
+    )
+    for store_name, orders in (new_orders or {}).items():
+        append_orders(store_name, orders)
+
+def get_live_view():
+    """This session's summary of the selected stores and range, kept current from appended rows.
+
+    Starts from the summary of the partitions this rerun pinned. Each live
+    tick then costs and folds in only the rows published as deltas after the
+    versions already applied, so a dashboard left open all day never
+    rescans the history.
+    """
+    base_versions = {name: get_partition(name).version for name in selected_stores}
+    key = (tuple(base_versions.items()), st.session_state.cost_version, range_start, range_end)
+    # Kept in the memory budget; if it was evicted, the deltas are folded in again from the base
+    live = session_cached('live_view', key,
+                          lambda: {'versions': base_versions, 'summary': summary, 'new_orders': 0})
+    versions = dict(live['versions'])
+    new_orders = live['new_orders']
+
+    # A range ending on the last loaded day stays open, so today's orders count
+    open_ended = range_end == last_day
+    batch_summaries = []
+    for store_name in selected_stores:
+        deltas = sales_store.deltas_since(store_name, versions[store_name])
+        if deltas is None:
+            # The store was reloaded rather than appended to: start over from a full rerun
+            st.rerun(scope='app')
+        for version, delta in deltas:
+            versions[store_name] = version
+            in_range = delta['date'] >= pd.Timestamp(range_start)
+            if not open_ended:
+                in_range &= delta['date'] < pd.Timestamp(range_end) + pd.Timedelta(days=1)
+            if not in_range.any():
+                continue
+            batch = swawe_core.SalesPartition(delta[in_range], 0)
+            batch_frame = swawe_core.with_costs(batch.frame, session_unit_costs(batch.cost_keys))
+            batch_summaries.append(swawe_core.summarize_sales(batch_frame))
+            new_orders += batch_frame['order_name'].nunique()
+    if versions != live['versions']:
+        live = {
+            'versions': versions,
+            'summary': swawe_core.merge_summaries([live['summary']] + batch_summaries) if batch_summaries
+            else live['summary'],
+            'new_orders': new_orders,
         }
-    }
-    
-    /* Loading Animation */
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.5; }
-    }
-    
-    .loading {
-        animation: pulse 2s ease-in-out infinite;
-    }
-    
-    /* Premium Scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: rgba(255,255,255,0.05);
-        border-radius: 10px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--swawe-gradient);
-        border-radius: 10px;
-    }
+        memory_budget.put(session_id, 'live_view', key, live)
+    return live
+
+def render_live_panel(compact):
+    """Headline figures that poll for new orders and update on a timer; run as a fragment, so no full rerun"""
+    poll_new_orders()
+    live = get_live_view()
+    if compact:
+        render_pulse_banner(live['summary'])
+    else:
+        render_headline_cards(live['summary'])
+        recent_days = live['summary']['daily'].tail(30)[['selling_price', 'profit', 'quantity']].rename_axis('date').reset_index()
+        render_chart(lambda: swawe_charts.daily_sales_figure(recent_days), key='live_daily_sales')
+    poll_errors = [f"{name}: {error}" for name, error in get_order_poller().last_errors.items() if error]
+    st.caption(f"📡 Live · updated {datetime.now():%H:%M:%S} · {live['new_orders']:,} new orders since this view loaded"
+               + (f" · ⚠️ {'; '.join(poll_errors)}" if poll_errors else ""))
+
+def get_partition(store_name):
+    """Shared, read-only line items of one store as this rerun sees them.
+
+    Pinned for the rest of the rerun, so a publish from another session
+    cannot change the data halfway through a page. The pin is a script
+    global, so an idle session never keeps an old partition alive.
+    """
+    if store_name not in pinned_partitions:
+        pinned_partitions[store_name] = sales_store.get(store_name)
+    return pinned_partitions[store_name]
+
+def date_bounds(sales_df, start_date, end_date):
+    """Row positions [lo, hi) of a time-sorted frame falling in [start_date, end_date], by two binary searches"""
+    dates = sales_df['date']
+    lo = dates.searchsorted(pd.Timestamp(start_date), side='left')
+    hi = dates.searchsorted(pd.Timestamp(end_date) + pd.Timedelta(days=1), side='left')
+    return int(lo), int(hi)
+
+def filter_by_date(sales_df, start_date, end_date):
+    """Slice a time-sorted frame to [start_date, end_date]"""
+    lo, hi = date_bounds(sales_df, start_date, end_date)
+    return sales_df.iloc[lo:hi]
+
+def get_window(store_name):
+    """One store's line items inside the selected date range, with this session's costs"""
+    partition = get_partition(store_name)
+    return swawe_core.with_costs(filter_by_date(partition.frame, range_start, range_end), get_key_costs(store_name))
+
+def get_store_summary(store_name):
+    """Aggregates for one store and the selected date range, cached per dataset version"""
+    key = (get_partition(store_name).version, st.session_state.cost_version, range_start, range_end)
+    return session_cached(('store_summary', store_name), key,
+                          lambda: swawe_core.summarize_sales(get_window(store_name)))
+
+def get_customer_analytics():
+    """Repeat-purchase, lifetime-value and cohort figures for the selected stores and range"""
+    key = (tuple(get_partition(name).version for name in selected_stores),
+           st.session_state.cost_version, range_start, range_end)
+
+    def build():
+        sales_df = get_raw_sales()
+        # Snapshots saved before customer ids existed have no such column
+        return swawe_core.customer_analytics(sales_df) if 'customer_id' in sales_df.columns else None
+
+    return session_cached('customer_analytics', key, build)
+
+def get_sketch_metrics():
+    """Approximate distinct counts and percentiles for the selected stores and range.
+
+    Read from each partition's per-day sketches, so the cost depends on the
+    number of days rather than rows; costs don't enter, so no cost version.
+    """
+    key = (tuple(get_partition(name).version for name in selected_stores), range_start, range_end)
+    return session_cached('sketch_metrics', key, lambda: swawe_core.sketch_metrics(swawe_core.merge_sketch_windows(
+        get_partition(name).sketch_window(range_start, range_end) for name in selected_stores)))
+
+def get_cost_mix():
+    """Revenue and units of the selected stores and range, split by the cost that prices them.
+
+    Per-SKU costs are folded into a fixed cost, so a scenario only varies
+    the hoodie, t-shirt (also used for other categories) and additional costs.
+    """
+    key = (tuple(get_partition(name).version for name in selected_stores),
+           st.session_state.cost_version, range_start, range_end)
+
+    def build():
+        lookup = session_cost_lookup()
+        mixes = []
+        for name in selected_stores:
+            partition = get_partition(name)
+            mixes.append(swawe_core.cost_mix(filter_by_date(partition.frame, range_start, range_end),
+                                             partition.cost_keys, lookup, SCENARIO_CATEGORIES, 'T-Shirts'))
+        return swawe_core.merge_cost_mixes(mixes)
+
+    return session_cached('cost_mix', key, build)
+
+def get_store_daily(store_name):
+    """One store's full-history daily revenue and profit, cached per data and cost version"""
+    partition = get_partition(store_name)
+
+    def build():
+        costed = swawe_core.with_costs(partition.frame, get_key_costs(store_name))
+        return costed.groupby('date')[['selling_price', 'profit']].sum()
+
+    return session_cached(('store_daily', store_name), (partition.version, st.session_state.cost_version), build)
+
+def get_growth_tracker():
+    """Growth tracker for the selected stores, updated in place from their daily totals.
+
+    Growth looks back past the start of the selected range, so it uses the
+    full history and is read as of the range end.
+    """
+    dailies = [get_store_daily(name) for name in selected_stores]
+    daily = dailies[0] if len(dailies) == 1 else pd.concat(dailies).groupby(level=0).sum()
+    name = ('growth_tracker', tuple(selected_stores))
+    # Updated in place and measured again, so the budget sees its arrays grow
+    tracker = session_cached(name, None, swawe_core.GrowthTracker)
+    tracker.update(daily)
+    memory_budget.put(session_id, name, None, tracker)
+    return tracker
+
+def get_forecast(horizon):
+    """Revenue and unit forecasts per category for the selected stores, from the last loaded day.
+
+    Neither depends on cost settings or the date range, so one result per
+    data version and horizon is shared by every session. On a new version
+    the stores' forecaster only refits from the first day that changed.
+    """
+    store_names = tuple(selected_stores)
+
+    def category_daily(name):
+        partition = get_partition(name)
+        daily, _ = memory_budget.get_or_build(None, ('category_daily', name), partition.version,
+                                              lambda: swawe_core.category_daily_totals(partition.frame))
+        return daily
+
+    def build():
+        dailies = [category_daily(name) for name in store_names]
+        daily = dailies[0] if len(dailies) == 1 else pd.concat(dailies).groupby(level=0).sum()
+        forecaster = get_forecaster(store_names)
+        forecaster.update(daily.sort_index(axis=1))
+        forecast = forecaster.forecast(horizon)
+        if forecast is not None:
+            forecast['history'] = daily['revenue'].sum(axis=1).tail(8 * 7)
+        return forecast
+
+    versions = tuple(get_partition(name).version for name in store_names)
+    forecast, _ = memory_budget.get_or_build(None, ('forecast', store_names, horizon), versions, build)
+    return forecast
+
+def format_growth(value):
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+def get_raw_sales():
+    """Line items of the selected stores and date range, for tables and exports"""
+    frames = [get_window(name) for name in selected_stores]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+def get_sales_preview():
+    """Uncosted line items of the selected stores and range in date order, for paging.
+
+    Returns (frame, rank), where rank[p] is the position in frame of row p of
+    get_raw_sales(); rank is None for one store, whose window already is in
+    date order. Several stores are merged by date once per dataset version.
+    """
+    if len(selected_stores) == 1:
+        return filter_by_date(get_partition(selected_stores[0]).frame, range_start, range_end), None
+    key = (tuple(get_partition(name).version for name in selected_stores), range_start, range_end)
+
+    def build():
+        combined = pd.concat([filter_by_date(get_partition(name).frame, range_start, range_end)
+                              for name in selected_stores], ignore_index=True)
+        order = np.argsort(combined['date'].to_numpy(), kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return combined.iloc[order].reset_index(drop=True), rank
+
+    return session_cached('sales_preview', key, build)
+
+def with_session_costs(rows):
+    """This session's costs joined onto a few line items of any of the selected stores"""
+    parts = [swawe_core.with_costs(rows[rows['store'] == name], get_key_costs(name)) for name in rows['store'].unique()]
+    return pd.concat(parts).loc[rows.index] if parts else swawe_core.with_costs(rows, np.zeros(0))
+
+def search_sales(query):
+    """Positions in get_raw_sales() of the line items whose order, item or customer contains query.
+
+    Answered from each store's trigram index (built on the first search of
+    a dataset version), so typing never scans the table.
+    """
+    positions = []
+    offset = 0
+    for name in selected_stores:
+        partition = get_partition(name)
+        lo, hi = date_bounds(partition.frame, range_start, range_end)
+        rows = partition.search(query)
+        rows = rows[(rows >= lo) & (rows < hi)]
+        positions.append(rows - lo + offset)
+        offset += hi - lo
+    return np.concatenate(positions)
+
+def get_pipeline():
+    """Cash-flow pipeline figures summed over the selected stores"""
+    pipelines = [get_partition(name).meta['pipeline'] for name in selected_stores if get_partition(name).meta.get('pipeline')]
+    if not pipelines:
+        return None
+    combined = {key: sum(p[key] for p in pipelines) for key in pipelines[0] if key != 'pending_orders_list'}
+    combined['pending_orders_list'] = [order for p in pipelines for order in p['pending_orders_list']]
+    return combined
+
+def process_orders(orders, store_name):
+    """Flatten orders into line items classified by the store's product rules (costs are joined later)"""
+    import swawe_core
+    return swawe_core.line_items_from_orders(orders, get_classifier(), get_product_catalog(store_name),
+                                             customer_key=settings['customer_id_key'])
+
+def bump_cost_version():
+    """Invalidate profits derived from the previous cost settings"""
+    st.session_state.cost_version += 1
+
+def session_cost_lookup():
+    """This session's per-SKU/variant base costs as a cost_lookup() series"""
+    import pandas as pd
+    import swawe_core
+
+    unit_costs = st.session_state.get('unit_costs')
+    return swawe_core.cost_lookup(unit_costs) if unit_costs is not None else pd.Series(dtype=float)
+
+def session_unit_costs(cost_keys):
+    """Unit cost of each sku/variant/category combination under this session's cost settings"""
+    import swawe_core
+
+    lookup = session_cost_lookup()
+    category_costs = {'Hoodies': st.session_state.hoodie_base_cost, 'T-Shirts': st.session_state.tshirt_base_cost}
+    return swawe_core.unit_costs(
+        cost_keys, lookup, category_costs,
+        # Categories without their own cost are costed like t-shirts
+        st.session_state.tshirt_base_cost, st.session_state.additional_cost
+    )
+
+def get_key_costs(store_name):
+    """This session's cost overlay for one store: one unit cost per cost key, recomputed per data and cost version"""
+    partition = get_partition(store_name)
+    return session_cached(('cost_overlay', store_name), (partition.version, st.session_state.cost_version),
+                          lambda: session_unit_costs(partition.cost_keys))
+
+def session_cached(name, key, build):
+    """This session's value for name, built for key, from the process memory budget.
+
+    The value is rebuilt when the key changes, and also when the budget
+    evicted it or released the session after it went idle.
+    """
+    value, _ = memory_budget.get_or_build(session_id, name, key, build)
+    return value
+
+def session_export(name, build_frame):
+    """CSV bytes of build_frame() for a download button, kept in the memory budget so
+    reruns with the same data, costs and range skip encoding it again"""
+    key = (tuple(get_partition(store_name).version for store_name in selected_stores),
+           st.session_state.cost_version, range_start, range_end)
+    # Customer ids stay in the dashboard; exports keep only the masked customer text
+    return session_cached(('export', name), key, lambda: build_frame().drop(columns='customer_id', errors='ignore')
+                          .to_csv(index=False).encode('utf-8'))
+
+def track_payload(kind, nbytes):
+    """Add bytes sent to the browser during this rerun to the payload meter"""
+    meter = st.session_state.payload_meter
+    meter[kind] = meter.get(kind, 0) + nbytes
+
+def render_html(html, target=None):
+    """Render raw HTML and account for its size"""
+    track_payload('html', len(html.encode('utf-8')))
+    (target or st).markdown(html, unsafe_allow_html=True)
+
+def cost_signature():
+    """This session's cost settings as a hashable value, computed once per cost version.
+
+    Unlike cost_version it is equal across sessions with equal settings, so
+    caches shared between sessions can key on it.
+    """
+    cached = st.session_state.get('cost_signature')
+    if cached is None or cached[0] != st.session_state.cost_version:
+        unit_costs = st.session_state.get('unit_costs')
+        unit_cost_hash = (None if unit_costs is None
+                          else int(pd.util.hash_pandas_object(unit_costs, index=False).sum()))
+        cached = (st.session_state.cost_version, (
+            st.session_state.hoodie_base_cost, st.session_state.tshirt_base_cost,
+            st.session_state.additional_cost, unit_cost_hash,
+        ))
+        st.session_state.cost_signature = cached
+    return cached[1]
+
+def render_chart(build, chart_id=None, **kwargs):
+    """Render the Plotly figure returned by build().
+
+    With a chart_id the figure comes from the process memory budget,
+    keyed by the chart, the selected stores' data versions, the cost
+    settings and the date range; build() only runs on a miss, so it should
+    also do the data preparation that only the chart needs.
+    """
+    if chart_id is None:
+        fig = build()
+        if measure_payload:
+            track_payload('charts', len(fig.to_json().encode('utf-8')))
+    else:
+        key = (chart_id, tuple((name, get_partition(name).version) for name in selected_stores),
+               cost_signature(), range_start, range_end)
+        # Shared by every session (owner None); each distinct key is its own entry
+        fig, nbytes = memory_budget.get_or_build(None, ('figure',) + key, None, build,
+                                                 size=lambda fig: len(fig.to_json().encode('utf-8')))
+        track_payload('charts', nbytes)
+    st.plotly_chart(fig, use_container_width=True, **kwargs)
+
+def render_table(df, **kwargs):
+    """Render a dataframe, estimating its Arrow payload when diagnostics are on"""
+    if measure_payload:
+        track_payload('tables', int(df.memory_usage(index=True, deep=True).sum()))
+    st.dataframe(df, **kwargs)
+
+def render_paged_table(df, key, sort_column=None, descending=True, filter_columns=(), page_size=25, search=None,
+                       sorted_by=None, prepare=None, **kwargs):
+    """Filter, sort and page a table on the server so only the visible rows are sent.
+
+    The filter matches filter_columns by substring, unless search is given:
+    then search(query) returns the ascending positions of the matching rows.
+    A df already in ascending sorted_by order is paged by that column by
+    slicing, and prepare(rows), when given, adds derived columns (costs) to
+    the visible rows only.
+    """
+    columns = list(df.columns if prepare is None else prepare(df.iloc[:0]).columns)
+    page_key = f"{key}_page"
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+
+    with col1:
+        query = st.text_input("🔎 Filter", key=f"{key}_filter", placeholder="Type to filter rows...",
+                              disabled=not (filter_columns or search))
+    with col2:
+        sort_by = st.selectbox("Sort by", columns, key=f"{key}_sort",
+                               index=columns.index(sort_column) if sort_column in columns else 0)
+    with col3:
+        descending = st.toggle("Descending", value=descending, key=f"{key}_desc")
+
+    view = df
+    search_ms = None
+    if query and search is not None:
+        started = time.perf_counter()
+        view = view.iloc[search(query)]
+        search_ms = (time.perf_counter() - started) * 1000
+    elif query and filter_columns:
+        mask = None
+        for column in filter_columns:
+            hits = view[column].astype(str).str.contains(query, case=False, regex=False)
+            mask = hits if mask is None else mask | hits
+        view = view[mask]
+
+    if prepare is not None and sort_by not in view.columns:
+        # Ordering by a derived column needs it on every row
+        view, prepare = prepare(view), None
+
+    total_rows = len(view)
+    page_count = max(1, -(-total_rows // page_size))
+    # Keep the page number valid when a new filter shrinks the result
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    with col4:
+        page_number = st.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+
+    start = (page_number - 1) * page_size
+    stop = start + page_size
+    if sort_by == sorted_by and descending:
+        # Filtering and search keep the order, so the page is a slice
+        window = view.iloc[max(total_rows - stop, 0):max(total_rows - start, 0)].iloc[::-1]
+    elif sort_by == sorted_by:
+        window = view.iloc[start:stop]
+    elif stop < total_rows and (pd.api.types.is_numeric_dtype(view[sort_by])
+                                or pd.api.types.is_datetime64_any_dtype(view[sort_by])):
+        # Partial selection: only rows up to the requested page need ordering
+        window = (view.nlargest(stop, sort_by) if descending else view.nsmallest(stop, sort_by)).iloc[start:stop]
+    else:
+        window = view.sort_values(sort_by, ascending=not descending, kind='stable').iloc[start:stop]
+    if prepare is not None:
+        window = prepare(window)
+
+    render_table(window, use_container_width=True, **kwargs)
+    st.caption(f"Rows {min(start + 1, total_rows):,}–{min(stop, total_rows):,} of {total_rows:,}"
+               + (f" · found in {search_ms:,.1f} ms" if search_ms is not None else ""))
+
+def create_premium_metric_card(label, value, delta=None, delta_color="normal"):
+    delta_html = f'<div class="metric-delta">{delta}</div>' if delta else ""
     
-    ::-webkit-scrollbar-thumb:hover {
-        background: linear-gradient(135deg, #FF6B35 0%, #F7931E 100%);
-    }
-</style>
-""", unsafe_allow_html=True)
+    return (f'<div class="metric-card"><div class="metric-value">{value}</div>'
+            f'<div class="metric-label">{label}</div>{delta_html}</div>')
+
+# Enhanced CSS with premium branding, served once as a static file when possible
+if st.get_option("server.enableStaticServing"):
+    render_html(swawe_theme.STYLESHEET_LINK)
+else:
+    render_html(swawe_theme.PREMIUM_CSS)
 
 # Premium Header with SWAWE Logo
-st.markdown("""
-<div class="swawe-header">
-    <img src="https://cdn.shopify.com/s/files/1/0604/9733/0266/files/bimi-svg-tiny-12-ps.svg?v=1754005795" 
-         style="height: 80px; margin-bottom: 1rem; filter: drop-shadow(0 4px 8px rgba(0,0,0,0.1));" 
-         alt="SWAWE Logo">
-    <h1 class="swawe-logo">SWAWE</h1>
-    <p class="swawe-tagline">Fashion Analytics & Business Intelligence</p>
-</div>
-""", unsafe_allow_html=True)
+render_html(swawe_theme.HEADER_HTML)
 
 # Enhanced Connection Status
 if shopify_connected:
-    st.markdown('<div class="status-badge status-connected">✨ Connected to Shopify Store</div>', unsafe_allow_html=True)
-    check_for_new_orders()
+    render_html('<div class="status-badge status-connected">✨ Connected to Shopify Store</div>')
+    # Live mode ingests new orders itself
+    if not st.session_state.get('live_mode'):
+        check_for_new_orders()
 else:
-    st.markdown('<div class="status-badge status-disconnected">⚠️ Shopify Not Connected - Add credentials in Settings</div>', unsafe_allow_html=True)
+    render_html('<div class="status-badge status-disconnected">⚠️ Shopify Not Connected - Add credentials in Settings</div>')
 
 # Enhanced Navigation with Profit Configuration
 page = st.sidebar.selectbox("🎯 Choose Dashboard Section:", 
-    ["Executive Dashboard", "Sales Analytics", "Product Intelligence", "Data Management"],
+    ["Executive Dashboard", "Sales Analytics", "Product Intelligence", "Customer Intelligence", "Scenario Explorer", "Data Management"],
     help="Select the analytics section you want to explore")
 
+# Store view: one storefront or all of them combined
+loaded_stores = [name for name in STORE_NAMES if get_partition(name) is not None]
+selected_stores = loaded_stores
+if len(loaded_stores) > 1:
+    store_view = st.sidebar.selectbox("🏪 Store View", [ALL_STORES] + loaded_stores,
+                                      help="Show one storefront or all stores combined")
+    if store_view != ALL_STORES:
+        selected_stores = [store_view]
+
+# Global date-range filter over the time-sorted dataset
+if data_loaded:
+    # Frames are date-sorted, so the bounds are the first and last rows
+    store_frames = [get_partition(name).frame for name in selected_stores]
+    first_day = min(frame['date'].iloc[0] for frame in store_frames).date()
+    last_day = max(frame['date'].iloc[-1] for frame in store_frames).date()
+    picked_range = st.sidebar.date_input(
+        "📅 Date Range",
+        value=(first_day, last_day),
+        min_value=first_day,
+        max_value=last_day,
+        help="Limit every page, chart and export to this period"
+    )
+    # While the second date is being picked the widget returns a single date
+    range_start = picked_range[0] if picked_range else first_day
+    range_end = picked_range[1] if len(picked_range) > 1 else last_day
+live_mode = data_loaded and shopify_connected and st.sidebar.checkbox(
+    "📡 Live Mode", key='live_mode',
+    help=f"Check for new orders every {settings['live_refresh_seconds']}s and update the headline figures in place"
+)
+approximate_metrics = data_loaded and st.sidebar.checkbox(
+    "⚡ Approximate Metrics",
+    help="Answer headline counts and percentiles from per-day sketches, with their error shown"
+)
+
 # Profit Margin Configuration
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 💰 **Profit Configuration**")
 st.sidebar.markdown("*Adjust margins to analyze different pricing scenarios*")
 
-# Initialize default margins in session state
-if 'hoodie_base_cost' not in st.session_state:
-    st.session_state.hoodie_base_cost = 500
-if 'tshirt_base_cost' not in st.session_state:
-    st.session_state.tshirt_base_cost = 210
-if 'additional_cost' not in st.session_state:
-    st.session_state.additional_cost = 370
-
 with st.sidebar.expander("🔧 **Margin Settings**", expanded=False):
     st.markdown("**Product Costs:**")
     
@@ -656,9 +1140,9 @@ with st.sidebar.expander("🔧 **Margin Settings**", expanded=False):
         st.session_state.tshirt_base_cost = tshirt_cost
         st.session_state.additional_cost = additional_cost
         
-        # Recalculate profits if data exists
-        if st.session_state.sales_data:
-            st.session_state.sales_data = recalculate_profits(st.session_state.sales_data)
+        # Profits are re-joined for the new costs on demand
+        bump_cost_version()
+        if data_loaded:
             st.success("💡 Profits recalculated!")
     
     # Show current margin preview
@@ -666,33 +1150,88 @@ with st.sidebar.expander("🔧 **Margin Settings**", expanded=False):
     hoodie_total = hoodie_cost + additional_cost
     tshirt_total = tshirt_cost + additional_cost
     
-    st.markdown(f"""
+    render_html(f"""
     <div style="background: rgba(255,107,53,0.1); padding: 0.75rem; border-radius: 8px; font-size: 0.85rem;">
         🧥 <strong>Hoodie Total Cost:</strong> ₹{hoodie_total}<br>
         👕 <strong>T-Shirt Total Cost:</strong> ₹{tshirt_total}
     </div>
-    """, unsafe_allow_html=True)
-    
+    """)
+
+    # Per-SKU costs override the category costs above (additional costs still apply)
+    st.markdown("**Per-SKU Costs:**")
+    if data_loaded:
+        if 'unit_costs' not in st.session_state:
+            st.session_state.unit_costs = pd.DataFrame({'sku': pd.Series(dtype=str), 'unit_cost': pd.Series(dtype=float)})
+            st.session_state.unit_cost_source = st.session_state.unit_costs
+
+        cost_csv = st.file_uploader("📥 Import Cost CSV", type="csv",
+                                    help="Columns: sku (or variant_id) and unit_cost (or cost)")
+        if cost_csv is not None and st.session_state.get('cost_csv_id') != cost_csv.file_id:
+            st.session_state.cost_csv_id = cost_csv.file_id
+            imported = pd.read_csv(cost_csv, dtype=str)
+            imported.columns = [column.strip().lower() for column in imported.columns]
+            key_column = next((c for c in ('sku', 'variant_id') if c in imported.columns), None)
+            cost_column = next((c for c in ('unit_cost', 'cost') if c in imported.columns), None)
+            if key_column is None or cost_column is None:
+                st.error("❌ Cost CSV needs a sku or variant_id column and a unit_cost or cost column")
+            else:
+                imported = pd.DataFrame({
+                    'sku': imported[key_column].str.strip(),
+                    'unit_cost': pd.to_numeric(imported[cost_column], errors='coerce'),
+                }).dropna()
+                # The editor restarts from the imported table
+                st.session_state.unit_cost_source = imported.reset_index(drop=True)
+                st.session_state.unit_costs = st.session_state.unit_cost_source
+                bump_cost_version()
+                st.success(f"💡 Imported {len(imported)} SKU costs")
+
+        edited_costs = st.data_editor(
+            st.session_state.unit_cost_source,
+            num_rows="dynamic",
+            hide_index=True,
+            key='unit_cost_editor',
+            column_config={
+                'sku': st.column_config.TextColumn("SKU / Variant ID"),
+                'unit_cost': st.column_config.NumberColumn("Base Cost (₹)", min_value=0, step=10),
+            }
+        )
+        if not edited_costs.equals(st.session_state.unit_costs):
+            st.session_state.unit_costs = edited_costs
+            bump_cost_version()
+        covered = int(swawe_core.cost_lookup(edited_costs).size)
+        st.caption(f"{covered} SKU costs set; other items use their category cost")
+    else:
+        st.caption("Load data to set costs per SKU or variant")
+
     if st.button("🔄 Reset to Defaults", help="Reset to original cost values"):
-        st.session_state.hoodie_base_cost = 500
-        st.session_state.tshirt_base_cost = 210
-        st.session_state.additional_cost = 370
-        if st.session_state.sales_data:
-            st.session_state.sales_data = recalculate_profits(st.session_state.sales_data)
+        for cost_key, default_cost in DEFAULT_COSTS.items():
+            st.session_state[cost_key] = default_cost
+        bump_cost_version()
         st.rerun()
 
+# Aggregate after margin edits so profits are current for this rerun. The combined
+# view merges per-store aggregates instead of rescanning the merged raw rows.
+summary = None
+if data_loaded:
+    summary = swawe_core.merge_summaries(get_store_summary(name) for name in selected_stores)
+has_sales = summary is not None and summary['line_items'] > 0
+EMPTY_RANGE_MESSAGE = "📅 No sales in the selected date range. Widen the range in the sidebar."
+
 # Enhanced Shopify Quick Links
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🏪 **Shopify Quick Access**")
 if shopify_connected:
-    st.sidebar.markdown(f"""
-    <div style="background: rgba(255,255,255,0.03); padding: 1rem; border-radius: 15px; border: 1px solid rgba(255,255,255,0.1);">
-        <a href="https://{SHOPIFY_STORE_URL}/admin/orders" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">📦 Orders</a>
-        <a href="https://{SHOPIFY_STORE_URL}/admin/products" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">🛍️ Products</a>
-        <a href="https://{SHOPIFY_STORE_URL}/admin/customers" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">👥 Customers</a>
-        <a href="https://{SHOPIFY_STORE_URL}/admin/settings" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">⚙️ Settings</a>
-    </div>
-    """, unsafe_allow_html=True)
+    for store in STORES:
+        store_heading = f'<div style="color: rgba(255,255,255,0.6); font-size: 0.8rem;">{store["name"]}</div>' if len(STORES) > 1 else ""
+        render_html(f"""
+        <div style="background: rgba(255,255,255,0.03); padding: 1rem; border-radius: 15px; border: 1px solid rgba(255,255,255,0.1); margin-bottom: 0.5rem;">
+            {store_heading}
+            <a href="https://{store['url']}/admin/orders" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">📦 Orders</a>
+            <a href="https://{store['url']}/admin/products" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">🛍️ Products</a>
+            <a href="https://{store['url']}/admin/customers" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">👥 Customers</a>
+            <a href="https://{store['url']}/admin/settings" target="_blank" style="color: #FF6B35; text-decoration: none; display: block; padding: 0.5rem 0;">⚙️ Settings</a>
+        </div>
+        """, st.sidebar)
 else:
     st.sidebar.info("Connect Shopify to see admin links")
 
@@ -701,48 +1240,14 @@ st.sidebar.markdown("---")
 admin_widget_view = st.sidebar.checkbox("🎛️ **Compact Widget View**", help="Switch to a condensed dashboard view for quick insights")
 
 # Premium Admin Widget View
-if admin_widget_view and st.session_state.sales_data:
+if admin_widget_view and has_sales:
     st.markdown("### 🎛️ **SWAWE Command Center**")
     
-    sales_df = pd.DataFrame(st.session_state.sales_data)
-    
-    # Premium Stats Banner
-    total_revenue = sales_df['selling_price'].sum()
-    total_orders = sales_df['order_name'].nunique()
-    total_profit = sales_df['profit'].sum()
-    profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-    
-    st.markdown(f"""
-    <div style="
-        background: var(--swawe-gradient);
-        padding: 2rem;
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        color: white;
-        text-align: center;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 20px 40px rgba(255, 107, 53, 0.3);
-    ">
-        <div style="position: relative; z-index: 1;">
-            <h2 style="margin: 0; font-size: 1.5rem; font-weight: 700;">Real-Time Business Pulse</h2>
-            <div style="display: flex; justify-content: space-around; margin-top: 1.5rem; flex-wrap: wrap;">
-                <div style="text-align: center; margin: 0.5rem;">
-                    <div style="font-size: 2rem; font-weight: 800;">₹{total_revenue:,.0f}</div>
-                    <div style="font-size: 0.9rem; opacity: 0.9;">Total Revenue</div>
-                </div>
-                <div style="text-align: center; margin: 0.5rem;">
-                    <div style="font-size: 2rem; font-weight: 800;">{total_orders:,}</div>
-                    <div style="font-size: 0.9rem; opacity: 0.9;">Orders</div>
-                </div>
-                <div style="text-align: center; margin: 0.5rem;">
-                    <div style="font-size: 2rem; font-weight: 800;">{profit_margin:.1f}%</div>
-                    <div style="font-size: 0.9rem; opacity: 0.9;">Profit Margin</div>
-                </div>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    # Premium Stats Banner, refreshed in place in live mode
+    if live_mode:
+        st.fragment(run_every=settings['live_refresh_seconds'])(render_live_panel)(compact=True)
+    else:
+        render_pulse_banner(summary)
     
     # Quick Actions
     st.markdown("#### 🚀 **Quick Actions**")
@@ -750,11 +1255,11 @@ if admin_widget_view and st.session_state.sales_data:
     
     with col1:
         if st.button("📊 Export Analytics", use_container_width=True):
-            csv = sales_df.to_csv(index=False)
+            csv = session_export('analytics', get_raw_sales)
             st.download_button(
                 label="💾 Download Data",
                 data=csv,
-                file_name=f"swawe_analytics_{datetime.now().strftime('%Y%m%d')}.csv",
+                file_name=f"swawe_analytics_{range_start:%Y%m%d}-{range_end:%Y%m%d}.csv",
                 mime="text/csv",
                 use_container_width=True
             )
@@ -765,7 +1270,7 @@ if admin_widget_view and st.session_state.sales_data:
     
     with col3:
         if st.button("🏪 Open Shopify", use_container_width=True):
-            st.markdown(f'<meta http-equiv="refresh" content="0; url=https://{SHOPIFY_STORE_URL}/admin">', unsafe_allow_html=True)
+            render_html(f'<meta http-equiv="refresh" content="0; url=https://{SHOPIFY_STORE_URL}/admin">')
 
 # Main Dashboard Content
 if not admin_widget_view:
@@ -774,85 +1279,105 @@ if not admin_widget_view:
         
         if shopify_connected:
             if st.button("🔄 Refresh Data from Shopify", type="primary"):
-                with st.spinner("🔍 Analyzing your SWAWE business data..."):
-                    orders = fetch_all_orders()
-                    if orders:
-                        st.session_state.sales_data = process_orders(orders)
-                        unique_orders = len(set(sale['order_name'] for sale in st.session_state.sales_data))
-                        st.success(f"✅ Loaded {unique_orders} orders with {len(st.session_state.sales_data)} items!")
+                # Locks stay held until results are published and finished checkpoints cleared
+                with st.spinner("🔍 Analyzing your SWAWE business data..."), holding_sync_locks(STORE_NAMES) as free_stores:
+                    results = fetch_all_orders(free_stores)
+                    if any(result['orders'] for result in results.values()):
+                        item_count = 0
+                        for store_name, result in results.items():
+                            publish_sync_result(store_name, result)
+                            item_count += len(result['rows'])
+                        order_count = sum(result['orders'] for result in results.values())
+                        st.success(f"✅ Loaded {order_count} orders with {item_count} items!")
                         st.rerun()
+
+            snapshot_times = sorted(get_partition(name).meta['synced_at'] for name in selected_stores
+                                    if get_partition(name).meta.get('restored') and get_partition(name).meta.get('synced_at'))
+            if snapshot_times:
+                st.caption(f"⚡ Showing saved data from the sync at {snapshot_times[0].replace('T', ' ')}. "
+                           "Refresh to pick up newer orders.")
+
+        render_completeness_badge()
         
-        if st.session_state.sales_data:
-            sales_df = pd.DataFrame(st.session_state.sales_data)
-            
-            # Premium Metrics with Profit Analysis
-            col1, col2, col3, col4 = st.columns(4)
-            
-            total_revenue = sales_df['selling_price'].sum()
-            total_profit = sales_df['profit'].sum()
-            profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-            unique_orders = sales_df['order_name'].nunique()
-            avg_order = sales_df['selling_price'].mean()
-            
-            with col1:
-                st.markdown(create_premium_metric_card("Total Revenue", f"₹{total_revenue:,.0f}"), unsafe_allow_html=True)
-            with col2:
-                profit_color = "positive" if total_profit > 0 else "negative"
-                st.markdown(create_premium_metric_card("Net Profit", f"₹{total_profit:,.0f}", f"{profit_margin:.1f}% margin"), unsafe_allow_html=True)
-            with col3:
-                st.markdown(create_premium_metric_card("Avg Order Value", f"₹{avg_order:.0f}"), unsafe_allow_html=True)
-            with col4:
-                st.markdown(create_premium_metric_card("Total Orders", f"{unique_orders:,}"), unsafe_allow_html=True)
+        if has_sales:
+            # Premium Metrics with Profit Analysis; in live mode they refresh in place
+            if live_mode:
+                st.fragment(run_every=settings['live_refresh_seconds'])(render_live_panel)(compact=False)
+            else:
+                render_headline_cards(summary, get_sketch_metrics() if approximate_metrics else None)
+
+            if approximate_metrics:
+                sketch = get_sketch_metrics()
+                order_values = sketch['order_value']
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    # Snapshots saved before customer ids were kept have no customer sketch
+                    if sketch['customers'] is None:
+                        render_html(create_premium_metric_card("Customers", "n/a"))
+                    else:
+                        render_html(create_premium_metric_card("Customers", f"≈{sketch['customers']:,}",
+                                                               f"±{sketch['count_error']:.1%} std. error"))
+                for column, (label, q) in zip((col2, col3), (("Median Order", 0.5), ("P90 Order", 0.9))):
+                    value, rank_error = order_values[q]
+                    with column:
+                        render_html(create_premium_metric_card(
+                            label, f"₹{value:,.0f}" if value is not None else "n/a",
+                            f"±{rank_error:.1%} rank" if value is not None else None))
+                with col4:
+                    value, rank_error = sketch['price'][0.5]
+                    render_html(create_premium_metric_card(
+                        "Median Item Price", f"₹{value:,.0f}" if value is not None else "n/a",
+                        f"P99 order ₹{order_values[0.99][0]:,.0f} · ±{rank_error:.1%} rank" if value is not None else None))
+                st.caption("⚡ Approximate: distinct counts from HyperLogLog, percentiles from t-digest. "
+                           "Rank errors bound how far each percentile's true position can be from the one asked for.")
             
             # Cash Flow Pipeline Section
-            if hasattr(st.session_state, 'total_pending_revenue'):
+            pipeline = get_pipeline()
+            if pipeline:
                 st.markdown("### 💰 **Cash Flow Pipeline**")
                 
-                # Get the actual values from session state
-                fulfill_count = getattr(st.session_state, 'orders_to_fulfill_count', 0)
-                fulfill_revenue = getattr(st.session_state, 'orders_to_fulfill_revenue', 0)
-                capture_count = getattr(st.session_state, 'payments_to_capture_count', 0)
-                capture_revenue = getattr(st.session_state, 'payments_to_capture_revenue', 0)
-                
-                # Debug: Show what we actually have
-                st.error(f"DEBUG: fulfill_count = {fulfill_count}, capture_count = {capture_count}")
+                # Get the actual values, summed over the selected stores
+                fulfill_count = pipeline['orders_to_fulfill_count']
+                fulfill_revenue = pipeline['orders_to_fulfill_revenue']
+                capture_count = pipeline['payments_to_capture_count']
+                capture_revenue = pipeline['payments_to_capture_revenue']
                 
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    st.markdown(create_premium_metric_card(
+                    render_html(create_premium_metric_card(
                         "📦 Orders to Fulfill", 
                         f"{fulfill_count:,}",
                         f"₹{fulfill_revenue:,.0f} revenue (unfulfilled orders)"
-                    ), unsafe_allow_html=True)
+                    ))
                 
                 with col2:
-                    st.markdown(create_premium_metric_card(
+                    render_html(create_premium_metric_card(
                         "💰 Payments to Capture", 
                         f"{capture_count:,}",
                         f"₹{capture_revenue:,.0f} from shipped orders"
-                    ), unsafe_allow_html=True)
+                    ))
                 
                 with col3:
                     total_count = fulfill_count + capture_count
                     total_revenue = fulfill_revenue + capture_revenue
-                    st.markdown(create_premium_metric_card(
+                    render_html(create_premium_metric_card(
                         "🎯 Total Action Items", 
                         f"{total_count:,}",
                         f"₹{total_revenue:,.0f} requiring attention"
-                    ), unsafe_allow_html=True)
+                    ))
 
                 # Add detailed pending orders table
-                if hasattr(st.session_state, 'pending_orders_list') and st.session_state.pending_orders_list:
+                if pipeline['pending_orders_list']:
                     st.markdown("#### 🚨 **Orders Requiring Action**")
-                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+                    render_html('<div class="chart-container">')
                     
-                    pending_df = pd.DataFrame(st.session_state.pending_orders_list)
+                    pending_df = pd.DataFrame(pipeline['pending_orders_list'])
                     pending_df['created_at'] = pd.to_datetime(pending_df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
-                    pending_df = pending_df.sort_values('total_price', ascending=False)
                     
                     # Style the dataframe for better visibility
                     styled_df = pending_df.rename(columns={
+                        'store': '🏪 Store',
                         'order_name': '🛍️ Order',
                         'total_price': '💰 Value (₹)',
                         'customer_email': '👤 Customer',
@@ -861,10 +1386,12 @@ if not admin_widget_view:
                         'status_type': '⚡ Action Needed'
                     })
                     
-                    st.dataframe(
+                    render_paged_table(
                         styled_df,
-                        use_container_width=True,
-                        height=300,
+                        key='pending_orders',
+                        sort_column='💰 Value (₹)',
+                        filter_columns=('🛍️ Order', '👤 Customer'),
+                        page_size=10,
                         hide_index=True
                     )
                     
@@ -872,11 +1399,12 @@ if not admin_widget_view:
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button("📦 Go to Shopify Orders", type="primary", use_container_width=True):
-                            st.markdown(f'<meta http-equiv="refresh" content="0; url=https://{SHOPIFY_STORE_URL}/admin/orders">', unsafe_allow_html=True)
+                            render_html(f'<meta http-equiv="refresh" content="0; url=https://{SHOPIFY_STORE_URL}/admin/orders">')
                     
                     with col2:
                         if st.button("📧 Export Action List", use_container_width=True):
-                            csv = styled_df.to_csv(index=False)
+                            csv = session_export('pending_actions',
+                                                 lambda: styled_df.sort_values('💰 Value (₹)', ascending=False))
                             st.download_button(
                                 label="💾 Download CSV",
                                 data=csv,
@@ -885,14 +1413,14 @@ if not admin_widget_view:
                                 use_container_width=True
                             )
                     
-                    st.markdown('</div>', unsafe_allow_html=True)
+                    render_html('</div>')
                 
                 # Add business insight
                 if total_count > 0:
-                    total_revenue_all = pd.DataFrame(st.session_state.sales_data)['selling_price'].sum()
+                    total_revenue_all = summary['revenue']
                     pipeline_percentage = (total_revenue / total_revenue_all * 100) if total_revenue_all > 0 else 0
                     
-                    st.markdown(f"""
+                    render_html(f"""
                     <div class="insight-card">
                         <h4 style="color: #FF6B35; margin-bottom: 1rem; font-size: 1.2rem;">💡 Business Action Insight</h4>
                         <p style="color: rgba(255,255,255,0.9); line-height: 1.6; font-size: 1rem;">
@@ -902,20 +1430,21 @@ if not admin_widget_view:
                         Priority: Ship the {fulfill_count} unfulfilled orders first, then follow up on the {capture_count} pending payments.
                         </p>
                     </div>
-                    """, unsafe_allow_html=True)
+                    """)
             
             # Profit Analysis by Category
             st.markdown("#### 💰 **Profit Analysis by Category**")
             col1, col2 = st.columns(2)
             
+            by_category = summary['by_category']
             with col1:
-                hoodie_data = sales_df[sales_df['category'] == 'Hoodies']
-                if len(hoodie_data) > 0:
-                    hoodie_profit = hoodie_data['profit'].sum()
-                    hoodie_margin = (hoodie_profit / hoodie_data['selling_price'].sum() * 100) if len(hoodie_data) > 0 else 0
-                    hoodie_avg_profit = hoodie_data['profit'].mean()
+                if 'Hoodies' in by_category.index:
+                    hoodie_data = by_category.loc['Hoodies']
+                    hoodie_profit = hoodie_data['profit']
+                    hoodie_margin = (hoodie_profit / hoodie_data['selling_price'] * 100) if hoodie_data['selling_price'] else 0
+                    hoodie_avg_profit = hoodie_profit / hoodie_data['line_items']
                     
-                    st.markdown(f"""
+                    render_html(f"""
                     <div class="metric-card">
                         <div style="display: flex; align-items: center; margin-bottom: 1rem;">
                             <span style="font-size: 2rem; margin-right: 0.5rem;">🧥</span>
@@ -934,16 +1463,16 @@ if not admin_widget_view:
                             <span>Cost Used:</span><strong>₹{st.session_state.hoodie_base_cost + st.session_state.additional_cost}</strong>
                         </div>
                     </div>
-                    """, unsafe_allow_html=True)
+                    """)
             
             with col2:
-                tshirt_data = sales_df[sales_df['category'] == 'T-Shirts']
-                if len(tshirt_data) > 0:
-                    tshirt_profit = tshirt_data['profit'].sum()
-                    tshirt_margin = (tshirt_profit / tshirt_data['selling_price'].sum() * 100) if len(tshirt_data) > 0 else 0
-                    tshirt_avg_profit = tshirt_data['profit'].mean()
+                if 'T-Shirts' in by_category.index:
+                    tshirt_data = by_category.loc['T-Shirts']
+                    tshirt_profit = tshirt_data['profit']
+                    tshirt_margin = (tshirt_profit / tshirt_data['selling_price'] * 100) if tshirt_data['selling_price'] else 0
+                    tshirt_avg_profit = tshirt_profit / tshirt_data['line_items']
                     
-                    st.markdown(f"""
+                    render_html(f"""
                     <div class="metric-card">
                         <div style="display: flex; align-items: center; margin-bottom: 1rem;">
                             <span style="font-size: 2rem; margin-right: 0.5rem;">👕</span>
@@ -962,72 +1491,36 @@ if not admin_widget_view:
                             <span>Cost Used:</span><strong>₹{st.session_state.tshirt_base_cost + st.session_state.additional_cost}</strong>
                         </div>
                     </div>
-                    """, unsafe_allow_html=True)
+                    """)
             
             # Premium Charts
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                sales_df['date'] = pd.to_datetime(sales_df['date'])
-                monthly_data = sales_df.groupby(sales_df['date'].dt.to_period('M')).agg({
-                    'selling_price': 'sum',
-                    'profit': 'sum'
-                }).reset_index()
-                monthly_data['month'] = monthly_data['date'].astype(str)
+                render_html('<div class="chart-container">')
+                monthly_data = swawe_core.monthly_totals(summary)
                 
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(x=monthly_data['month'], y=monthly_data['selling_price'],
-                                       mode='lines+markers', name='Revenue', 
-                                       line=dict(color='#FF6B35', width=4),
-                                       marker=dict(size=10, color='#FF6B35')))
-                fig.add_trace(go.Scatter(x=monthly_data['month'], y=monthly_data['profit'],
-                                       mode='lines+markers', name='Profit',
-                                       line=dict(color='#00D4AA', width=4),
-                                       marker=dict(size=10, color='#00D4AA')))
-                
-                fig.update_layout(
-                    title="📈 Monthly Performance Trend",
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white', size=12),
-                    title_font_size=16,
-                    xaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
-                    yaxis=dict(gridcolor='rgba(255,255,255,0.1)'),
-                    legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+                render_chart(lambda: swawe_charts.monthly_trend_figure(monthly_data), chart_id='monthly_trend')
+                render_html('</div>')
             
             with col2:
-                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                category_data = sales_df.groupby('category').agg({
-                    'selling_price': 'sum',
-                    'profit': 'sum'
-                }).reset_index()
+                render_html('<div class="chart-container">')
+                category_data = by_category[['selling_price', 'profit']].rename_axis('category').reset_index()
                 
-                fig = px.bar(category_data, x='category', y=['selling_price', 'profit'],
-                           title="📊 Category Performance", barmode='group',
-                           color_discrete_sequence=['#FF6B35', '#00D4AA'])
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white', size=12),
-                    title_font_size=16,
-                    legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+                render_chart(lambda: swawe_charts.category_performance_figure(category_data),
+                             chart_id='category_performance')
+                render_html('</div>')
             
             # Premium Business Insights
             st.markdown("### 💡 **Business Insights**")
             
-            profitable_orders = (sales_df['profit'] > 0).sum()
-            profit_rate = (profitable_orders / len(sales_df)) * 100
+            profitable_orders = summary['profitable_items']
+            profit_rate = (profitable_orders / summary['line_items']) * 100
+            profit_margin = (summary['profit'] / summary['revenue'] * 100) if summary['revenue'] > 0 else 0
             
             col1, col2 = st.columns(2)
             with col1:
-                st.markdown(f"""
+                render_html(f"""
                 <div class="insight-card">
                     <h4 style="color: #FF6B35; margin-bottom: 1rem; font-size: 1.2rem;">📈 Profitability Analysis</h4>
                     <p style="color: rgba(255,255,255,0.9); line-height: 1.6; font-size: 1rem;">
@@ -1035,181 +1528,401 @@ if not admin_widget_view:
                     Your best performing category generates <strong>₹{category_data['profit'].max():,.0f}</strong> in profits.
                     </p>
                 </div>
-                """, unsafe_allow_html=True)
+                """)
             
             with col2:
                 best_month = monthly_data.loc[monthly_data['profit'].idxmax(), 'month'] if len(monthly_data) > 0 else "N/A"
-                st.markdown(f"""
+                growth = get_growth_tracker().metrics(range_end)
+                mom_revenue, mom_profit = growth['mom']['revenue'], growth['mom']['profit']
+                if mom_revenue is None:
+                    growth_sentence = "There is not yet enough history to compare the last 30 days with the 30 before."
+                else:
+                    direction = "grew" if mom_revenue >= 0 else "declined"
+                    growth_sentence = (f"Revenue <strong>{direction} {abs(mom_revenue):.1f}%</strong> in the last 30 days "
+                                       f"versus the 30 before (profit {format_growth(mom_profit)}, "
+                                       f"year over year {format_growth(growth['yoy']['revenue'])}).")
+                forecast = get_forecast(30)
+                if forecast is not None:
+                    growth_sentence += (f" The next 30 days are forecast at <strong>₹{forecast['mean']['revenue'].to_numpy().sum():,.0f}</strong>"
+                                        f" in revenue from {forecast['mean']['units'].to_numpy().sum():,.0f} units.")
+                render_html(f"""
                 <div class="insight-card">
                     <h4 style="color: #FF6B35; margin-bottom: 1rem; font-size: 1.2rem;">🚀 Growth Trends</h4>
                     <p style="color: rgba(255,255,255,0.9); line-height: 1.6; font-size: 1rem;">
-                    Your business shows <strong>consistent growth</strong> across multiple months.
+                    {growth_sentence}
                     Best performing month: <strong>{best_month}</strong> with strong profit margins and excellent customer retention.
                     </p>
                 </div>
-                """, unsafe_allow_html=True)
+                """)
             
+        elif data_loaded:
+            st.info(EMPTY_RANGE_MESSAGE)
         else:
-            st.markdown("""
+            render_html("""
             <div style="text-align: center; padding: 3rem; background: rgba(255,255,255,0.02); border-radius: 20px; border: 1px solid rgba(255,255,255,0.1);">
                 <h3 style="color: #FF6B35; margin-bottom: 1rem;">🚀 Ready to Analyze Your SWAWE Business?</h3>
                 <p style="color: rgba(255,255,255,0.8); font-size: 1.1rem; margin-bottom: 2rem;">
                 Click the button above to load your Shopify data and unlock powerful business insights.
                 </p>
             </div>
-            """, unsafe_allow_html=True)
+            """)
 
     elif page == "Sales Analytics":
         st.markdown("### 📊 **Sales Analytics & Insights**")
         
-        if st.session_state.sales_data:
-            sales_df = pd.DataFrame(st.session_state.sales_data)
-            
+        if has_sales:
             # Sales Performance Overview
             col1, col2, col3 = st.columns(3)
+            daily_totals = summary['daily']
             with col1:
-                daily_avg = sales_df.groupby(pd.to_datetime(sales_df['date']).dt.date)['selling_price'].sum().mean()
+                daily_avg = daily_totals['selling_price'].mean()
                 st.metric("📈 Daily Avg Revenue", f"₹{daily_avg:,.0f}")
             with col2:
-                best_day = sales_df.groupby('date')['selling_price'].sum().max()
+                best_day = daily_totals['selling_price'].max()
                 st.metric("🏆 Best Day Revenue", f"₹{best_day:,.0f}")
+            growth_tracker = get_growth_tracker()
+            growth = growth_tracker.metrics(range_end)
             with col3:
-                growth_rate = 15.2  # Calculate actual growth rate
-                st.metric("📊 Growth Rate", f"{growth_rate}%", delta="2.3%")
+                # Last 30 days against the 30 before, with the week-over-week change as the delta
+                mom_revenue = growth['mom']['revenue']
+                wow_revenue = growth['wow']['revenue']
+                st.metric("📊 Growth Rate (30d)", format_growth(mom_revenue),
+                          delta=None if wow_revenue is None else f"{wow_revenue:+.1f}% week over week",
+                          help=f"Revenue in the 30 days to {range_end:%d %b %Y} versus the 30 days before")
             
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            sales_df['date'] = pd.to_datetime(sales_df['date'])
-            daily_sales = sales_df.groupby('date').agg({
-                'selling_price': 'sum',
-                'profit': 'sum',
-                'quantity': 'sum'
-            }).reset_index()
+            render_html('<div class="chart-container">')
+            render_chart(lambda: swawe_charts.daily_sales_figure(
+                daily_totals[['selling_price', 'profit', 'quantity']].rename_axis('date').reset_index(),
+                rolling=growth_tracker.rolling(7).loc[pd.Timestamp(range_start):pd.Timestamp(range_end)]
+            ), chart_id='daily_sales')
+            render_html('</div>')
+
+            # Period-over-period growth and rolling averages, as of the end of the range
+            st.markdown(f"#### 📐 **Growth as of {range_end:%d %b %Y}**")
+            growth_rows = []
+            for label, key in (("Revenue", 'revenue'), ("Profit", 'profit')):
+                growth_rows.append({
+                    '': label,
+                    'Week over Week': format_growth(growth['wow'][key]),
+                    'Month over Month (30d)': format_growth(growth['mom'][key]),
+                    'Year over Year (30d)': format_growth(growth['yoy'][key]),
+                    '7-day Avg': "n/a" if growth['avg_7'][key] is None else f"₹{growth['avg_7'][key]:,.0f}",
+                    '30-day Avg': "n/a" if growth['avg_30'][key] is None else f"₹{growth['avg_30'][key]:,.0f}",
+                })
+            render_table(pd.DataFrame(growth_rows), hide_index=True, use_container_width=True)
             
-            fig = px.line(daily_sales, x='date', y='selling_price', 
-                         title="📈 Daily Sales Performance", 
-                         color_discrete_sequence=['#FF6B35'])
-            fig.update_traces(line=dict(width=4), marker=dict(size=8))
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white', size=12),
-                title_font_size=16
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            # Forward-looking revenue and units per category from the full history
+            st.markdown("#### 🔮 **Sales Forecast**")
+            horizon = st.selectbox("Forecast horizon", [7, 14, 30, 60], index=2,
+                                   format_func=lambda days: f"Next {days} days")
+            forecast = get_forecast(horizon)
+            if forecast is None:
+                st.info("🔮 The forecast needs at least two weeks of sales history.")
+            else:
+                mean = forecast['mean']
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric(f"💰 Forecast Revenue ({horizon}d)", f"₹{mean['revenue'].to_numpy().sum():,.0f}",
+                              help="Sum of the daily forecasts; the band on the chart shows their uncertainty")
+                with col2:
+                    st.metric(f"📦 Forecast Units ({horizon}d)", f"{mean['units'].to_numpy().sum():,.0f}")
+                
+                render_html('<div class="chart-container">')
+                render_chart(lambda: swawe_charts.forecast_figure(
+                    forecast['history'], mean['revenue'].sum(axis=1),
+                    forecast['lower']['revenue'].sum(axis=1), forecast['upper']['revenue'].sum(axis=1)
+                ), chart_id=('forecast', horizon))
+                render_html('</div>')
+                
+                category_forecast = pd.DataFrame({
+                    '💰 Revenue': mean['revenue'].sum(),
+                    '📦 Units': mean['units'].sum(),
+                    '📅 Revenue / Day': mean['revenue'].mean(),
+                }).round(0).sort_values('💰 Revenue', ascending=False)
+                render_table(category_forecast.rename_axis('🏷️ Category').reset_index(),
+                             hide_index=True, use_container_width=True)
+                st.caption(f"Holt-Winters with weekly seasonality over daily totals up to "
+                           f"{forecast['history'].index[-1]:%d %b %Y}, independent of the selected range.")
             
             # Product Analysis
             col1, col2 = st.columns(2)
             with col1:
-                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                product_sales = sales_df.groupby('item_name').agg({
-                    'selling_price': 'sum',
-                    'quantity': 'sum'
-                }).sort_values('selling_price', ascending=False).head(10)
-                
-                fig = px.bar(product_sales, x=product_sales.index, y='selling_price',
-                            title="🏆 Top 10 Products by Revenue",
-                            color_discrete_sequence=['#FF6B35'])
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white', size=12),
-                    title_font_size=16,
-                    xaxis_tickangle=-45
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+                render_html('<div class="chart-container">')
+                render_chart(lambda: swawe_charts.top_products_figure(
+                    summary['by_item'][['selling_price', 'quantity']].nlargest(10, 'selling_price')
+                ), chart_id='top_products')
+                render_html('</div>')
             
             with col2:
-                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                category_profit = sales_df.groupby('category')['profit'].sum()
-                fig = px.pie(values=category_profit.values, names=category_profit.index,
-                            title="💰 Profit Distribution by Category",
-                            color_discrete_sequence=['#FF6B35', '#00D4AA'])
-                fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='white', size=12),
-                    title_font_size=16
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+                render_html('<div class="chart-container">')
+                render_chart(lambda: swawe_charts.category_profit_figure(summary['by_category']['profit']),
+                             chart_id='category_profit')
+                render_html('</div>')
+        elif data_loaded:
+            st.info(EMPTY_RANGE_MESSAGE)
         else:
             st.info("🔍 Load data from Executive Dashboard first to see detailed analytics.")
 
     elif page == "Product Intelligence":
         st.markdown("### 🛍️ **Product Intelligence**")
         
-        if st.session_state.sales_data:
-            sales_df = pd.DataFrame(st.session_state.sales_data)
-            
+        if has_sales:
             # Product Overview Metrics
             col1, col2, col3, col4 = st.columns(4)
+            by_item = summary['by_item']
             with col1:
-                st.metric("🏷️ Total Products", sales_df['item_name'].nunique())
+                st.metric("🏷️ Total Products", len(by_item))
             with col2:
-                avg_price = sales_df['selling_price'].mean()
+                avg_price = summary['revenue'] / summary['line_items']
                 st.metric("💰 Avg Product Price", f"₹{avg_price:.0f}")
             with col3:
-                best_product = sales_df.groupby('item_name')['profit'].sum().idxmax()
+                best_product = by_item['profit'].idxmax()
                 st.metric("🏆 Best Seller", best_product[:20] + "..." if len(best_product) > 20 else best_product)
             with col4:
-                total_items_sold = sales_df['quantity'].sum()
+                total_items_sold = summary['quantity']
                 st.metric("📦 Items Sold", f"{total_items_sold:,}")
             
             # Detailed Product Analysis
             st.markdown("#### 📊 **Product Performance Matrix**")
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+            render_html('<div class="chart-container">')
             
-            product_analysis = sales_df.groupby('item_name').agg({
-                'selling_price': ['sum', 'mean', 'count'],
-                'profit': ['sum', 'mean'],
-                'quantity': 'sum'
+            # Means are derived from the merged sums and counts
+            product_analysis = pd.DataFrame({
+                '💰 Total Revenue': by_item['selling_price'],
+                '💵 Avg Price': by_item['selling_price'] / by_item['line_items'],
+                '📝 Orders': by_item['line_items'],
+                '💎 Total Profit': by_item['profit'],
+                '📈 Avg Profit': by_item['profit'] / by_item['line_items'],
+                '📦 Qty Sold': by_item['quantity'],
             }).round(2)
+            product_analysis = product_analysis.rename_axis('🏷️ Product').reset_index()
             
-            product_analysis.columns = ['💰 Total Revenue', '💵 Avg Price', '📝 Orders', '💎 Total Profit', '📈 Avg Profit', '📦 Qty Sold']
-            product_analysis = product_analysis.sort_values('💰 Total Revenue', ascending=False)
-            
-            # Style the dataframe
-            st.dataframe(
+            # Only the visible page of the matrix is sent to the browser
+            render_paged_table(
                 product_analysis,
-                use_container_width=True,
-                height=400
+                key='product_matrix',
+                sort_column='💰 Total Revenue',
+                filter_columns=('🏷️ Product',),
+                hide_index=True
             )
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_html('</div>')
             
+        elif data_loaded:
+            st.info(EMPTY_RANGE_MESSAGE)
         else:
             st.info("🔍 Load data from Executive Dashboard first to see product intelligence.")
 
+    elif page == "Customer Intelligence":
+        st.markdown("### 👥 **Customer Intelligence**")
+        
+        customers = get_customer_analytics() if has_sales else None
+        if customers is not None:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("👥 Customers", f"{customers['customers']:,}")
+            with col2:
+                st.metric("🔁 Repeat Purchase Rate", f"{customers['repeat_rate']:.1f}%",
+                          help=f"{customers['repeat_customers']:,} customers ordered more than once in this period")
+            with col3:
+                st.metric("🛒 Orders per Customer", f"{customers['orders_per_customer']:.2f}")
+            with col4:
+                st.metric("💎 Customer Lifetime Value", f"₹{customers['clv_revenue']:,.0f}",
+                          delta=f"₹{customers['clv_profit']:,.0f} profit", delta_color="off",
+                          help="Average revenue per customer over the selected period")
+            
+            render_html('<div class="chart-container">')
+            render_chart(lambda: swawe_charts.cohort_retention_figure(customers['retention']),
+                         chart_id='cohort_retention')
+            render_html('</div>')
+            
+            render_html('<div class="chart-container">')
+            render_chart(lambda: swawe_charts.new_customers_figure(customers['cohort_sizes']),
+                         chart_id='new_customers')
+            render_html('</div>')
+            
+            retention = customers['retention']
+            second_month = retention[1].mean() if retention.shape[1] > 1 else None
+            retention_sentence = (f"On average <strong>{second_month:.1f}%</strong> of a month's new customers order again the following month."
+                                  if second_month is not None and pd.notna(second_month) else
+                                  "Select a longer period to see how cohorts come back month to month.")
+            render_html(f"""
+            <div class="insight-card">
+                <h4 style="color: #FF6B35; margin-bottom: 1rem; font-size: 1.2rem;">💡 Customer Insight</h4>
+                <p style="color: rgba(255,255,255,0.9); line-height: 1.6; font-size: 1rem;">
+                <strong>{customers['repeat_rate']:.1f}%</strong> of your {customers['customers']:,} customers bought more than once,
+                and a customer is worth <strong>₹{customers['clv_revenue']:,.0f}</strong> in revenue on average.
+                {retention_sentence}
+                </p>
+            </div>
+            """)
+        elif has_sales:
+            st.info("👤 This data has no customer ids yet. Refresh from Shopify to compute them.")
+        elif data_loaded:
+            st.info(EMPTY_RANGE_MESSAGE)
+        else:
+            st.info("🔍 Load data from Executive Dashboard first to see customer intelligence.")
+
+    elif page == "Scenario Explorer":
+        st.markdown("### 🧪 **Scenario Explorer**")
+        
+        if has_sales:
+            st.caption("Profit and margin of the selected sales under a whole grid of cost settings at once. "
+                       "Per-SKU costs stay fixed; other categories are costed like t-shirts.")
+            hoodie_now = st.session_state.hoodie_base_cost
+            tshirt_now = st.session_state.tshirt_base_cost
+            additional_now = st.session_state.additional_cost
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                hoodie_range = st.slider("🧥 Hoodie Base Cost (₹)", 0, 2000,
+                                         (max(0, hoodie_now - 200), min(2000, hoodie_now + 200)), step=10)
+            with col2:
+                tshirt_range = st.slider("👕 T-Shirt Base Cost (₹)", 0, 1000,
+                                         (max(0, tshirt_now - 100), min(1000, tshirt_now + 100)), step=10)
+            with col3:
+                additional_range = st.slider("📦 Additional Costs (₹)", 0, 1000,
+                                             (max(0, additional_now - 100), min(1000, additional_now + 100)), step=10)
+            col1, col2 = st.columns(2)
+            with col1:
+                grid_steps = st.select_slider("🔢 Values per Cost", options=[5, 11, 21, 41, 81], value=21,
+                                              help="Every combination of the three costs is evaluated")
+            with col2:
+                target_margin = st.slider("🎯 Target Margin (%)", 0, 80, 30)
+            
+            hoodie_grid = np.linspace(*hoodie_range, grid_steps)
+            tshirt_grid = np.linspace(*tshirt_range, grid_steps)
+            additional_grid = np.linspace(*additional_range, grid_steps)
+            mix = get_cost_mix()
+            sweep_started = time.perf_counter()
+            sweep = swawe_core.scenario_sweep(mix, [hoodie_grid, tshirt_grid], additional_grid)
+            sweep_ms = (time.perf_counter() - sweep_started) * 1000
+            current = swawe_core.scenario_sweep(mix, [[hoodie_now], [tshirt_now]], [additional_now])
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("💎 Current Profit", f"₹{current['profit'].item():,.0f}")
+            with col2:
+                st.metric("📊 Current Margin", f"{current['margin'].item():.1f}%")
+            with col3:
+                on_target = int((sweep['margin'] >= target_margin).sum())
+                st.metric("🎯 Scenarios on Target", f"{on_target:,} / {sweep['margin'].size:,}")
+            with col4:
+                st.metric("📉 Worst-Case Margin", f"{sweep['margin'].min():.1f}%",
+                          help="Margin with every cost at the top of its range")
+            st.caption(f"⚡ {sweep['margin'].size:,} scenarios evaluated in {sweep_ms:.1f} ms")
+            
+            # One additional-cost slice of the grid at a time
+            shown_additional = st.select_slider(
+                "📦 Additional Cost Shown", options=additional_grid.tolist(),
+                value=additional_grid[np.abs(additional_grid - additional_now).argmin()].item(),
+                format_func=lambda cost: f"₹{cost:,.0f}"
+            )
+            slice_index = additional_grid.tolist().index(shown_additional)
+            grid_key = (hoodie_range, tshirt_range, additional_range, grid_steps, slice_index)
+            marker = ((hoodie_now, tshirt_now) if hoodie_range[0] <= hoodie_now <= hoodie_range[1]
+                      and tshirt_range[0] <= tshirt_now <= tshirt_range[1] else None)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                render_html('<div class="chart-container">')
+                render_chart(lambda: swawe_charts.scenario_surface_figure(
+                                 sweep['profit'][:, :, slice_index], hoodie_grid, tshirt_grid,
+                                 "💎 Profit Surface (₹)", "Profit", marker),
+                             chart_id=('scenario_profit',) + grid_key)
+                render_html('</div>')
+            with col2:
+                render_html('<div class="chart-container">')
+                render_chart(lambda: swawe_charts.scenario_surface_figure(
+                                 sweep['margin'][:, :, slice_index], hoodie_grid, tshirt_grid,
+                                 "📊 Margin Surface (%)", "Margin %", marker),
+                             chart_id=('scenario_margin',) + grid_key)
+                render_html('</div>')
+            
+            render_html('<div class="chart-container">')
+            additional_sweep = swawe_core.scenario_sweep(mix, [[hoodie_now], [tshirt_now]], additional_grid)
+            render_chart(lambda: swawe_charts.scenario_additional_figure(
+                             additional_grid, additional_sweep['profit'][0, 0], additional_sweep['margin'][0, 0]),
+                         chart_id=('scenario_additional', additional_range, grid_steps))
+            render_html('</div>')
+            
+            if st.button("✅ Apply Shown Additional Cost", help="Use this additional cost in the Margin Settings"):
+                st.session_state.additional_cost = int(round(shown_additional))
+                bump_cost_version()
+                st.rerun()
+        elif data_loaded:
+            st.info(EMPTY_RANGE_MESSAGE)
+        else:
+            st.info("🔍 Load data from Executive Dashboard first to explore cost scenarios.")
+
     elif page == "Data Management":
         st.markdown("### 📁 **Data Management & Export**")
         
-        if st.session_state.sales_data:
-            sales_df = pd.DataFrame(st.session_state.sales_data)
-            
+        if has_sales:
             # Data Overview
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("📋 Total Orders", sales_df['order_name'].nunique())
+                st.metric("📋 Total Orders", summary['orders'])
             with col2:
-                st.metric("📝 Line Items", len(sales_df))
+                st.metric("📝 Line Items", summary['line_items'])
             with col3:
-                st.metric("💰 Revenue", f"₹{sales_df['selling_price'].sum():,.0f}")
+                st.metric("💰 Revenue", f"₹{summary['revenue']:,.0f}")
             with col4:
-                st.metric("💎 Profit", f"₹{sales_df['profit'].sum():,.0f}")
+                st.metric("💎 Profit", f"₹{summary['profit']:,.0f}")
             
-            # Order Range Information
-            order_numbers = [int(name.replace('#', '')) for name in sales_df['order_name'].unique() if name.startswith('#')]
-            if order_numbers:
-                min_order = min(order_numbers)
-                max_order = max(order_numbers)
-                st.success(f"📊 Order Range: #{min_order} to #{max_order} ({max_order - min_order + 1} orders)")
+            # Order Range Information, per store since order numbers are per store
+            for store_name in selected_stores:
+                order_numbers = get_window(store_name)['order_number'].dropna()
+                if order_numbers.empty:
+                    continue
+                min_order = int(order_numbers.min())
+                max_order = int(order_numbers.max())
+                store_label = f"{store_name} " if len(selected_stores) > 1 else ""
+                # Numbers a refetch could not fill (deleted or empty orders) are not reported again
+                unfillable = st.session_state.get('unfillable_orders', {}).get(store_name, set())
+                missing = [n for n in swawe_core.missing_order_numbers(order_numbers).tolist() if n not in unfillable]
+                if not missing:
+                    st.success(f"📊 {store_label}Order Range: #{min_order} to #{max_order} ({max_order - min_order + 1} orders, complete)")
+                    continue
+
+                st.warning(f"⚠️ {store_label}Order Range: #{min_order} to #{max_order} with "
+                           f"{len(missing):,} missing orders")
+                with st.expander(f"🔎 Missing orders{' in ' + store_name if len(selected_stores) > 1 else ''}"):
+                    shown = ", ".join(f"#{n}" for n in missing[:200])
+                    st.caption(shown + (f" … and {len(missing) - 200:,} more" if len(missing) > 200 else ""))
+                    if shopify_connected and st.button(f"🩹 Refetch {min(len(missing), MAX_REFETCH):,} missing orders",
+                                                       key=f"refetch_{store_name}"):
+                        refetch_missing_orders(store_name, missing[:MAX_REFETCH])
             
-            # Data Preview
+            # Raw order archive: replay downloaded orders through the current processing rules
+            archives = {name: get_raw_archive(name) for name in STORE_NAMES}
+            archived_chunks = sum(len(archive.chunks()) for archive in archives.values() if archive is not None)
+            if archived_chunks:
+                archived_mb = sum(archive.nbytes() for archive in archives.values() if archive is not None) / 1e6
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.caption(f"📦 Raw order archive: {archived_chunks:,} chunks, {archived_mb:,.1f} MB compressed. "
+                               "Reprocess after changing classification rules to rebuild every store locally.")
+                with col2:
+                    if st.button("🔁 Reprocess Archive", use_container_width=True,
+                                 help="Rebuild line items from archived orders on all CPU cores; no Shopify calls"):
+                        reprocess_from_archive()
+            if 'reprocess_report' in st.session_state:
+                st.success(st.session_state.pop('reprocess_report'))
+
+            # Data Preview, searchable by order, product or customer
             st.markdown("#### 👀 **Data Preview**")
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            st.dataframe(sales_df.head(20), use_container_width=True, height=400)
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_html('<div class="chart-container">')
+            preview, preview_rank = get_sales_preview()
+            render_paged_table(
+                preview,
+                key='data_preview',
+                sort_column='date',
+                search=search_sales if preview_rank is None else lambda query: np.sort(preview_rank[search_sales(query)]),
+                sorted_by='date',
+                prepare=with_session_costs,
+                hide_index=True
+            )
+            render_html('</div>')
             
             # Export Section
             st.markdown("#### 💾 **Export Options**")
@@ -1217,11 +1930,11 @@ if not admin_widget_view:
             
             with col1:
                 if st.button("📊 Export Complete Dataset", type="primary", use_container_width=True):
-                    csv = sales_df.to_csv(index=False)
+                    csv = session_export('complete_data', get_raw_sales)
                     st.download_button(
                         label="💾 Download CSV File",
                         data=csv,
-                        file_name=f"swawe_complete_data_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                        file_name=f"swawe_complete_data_{range_start:%Y%m%d}-{range_end:%Y%m%d}.csv",
                         mime="text/csv",
                         use_container_width=True
                     )
@@ -1230,13 +1943,14 @@ if not admin_widget_view:
                 if st.button("📈 Export Analytics Summary", use_container_width=True):
                     # Create summary data
                     summary_data = {
-                        'Metric': ['Total Revenue', 'Total Profit', 'Total Orders', 'Avg Order Value', 'Profit Margin'],
+                        'Metric': ['Period', 'Total Revenue', 'Total Profit', 'Total Orders', 'Avg Order Value', 'Profit Margin'],
                         'Value': [
-                            f"₹{sales_df['selling_price'].sum():,.0f}",
-                            f"₹{sales_df['profit'].sum():,.0f}",
-                            f"{sales_df['order_name'].nunique():,}",
-                            f"₹{sales_df['selling_price'].mean():,.0f}",
-                            f"{(sales_df['profit'].sum() / sales_df['selling_price'].sum() * 100):.1f}%"
+                            f"{range_start:%Y-%m-%d} to {range_end:%Y-%m-%d}",
+                            f"₹{summary['revenue']:,.0f}",
+                            f"₹{summary['profit']:,.0f}",
+                            f"{summary['orders']:,}",
+                            f"₹{summary['revenue'] / summary['line_items']:,.0f}",
+                            f"{(summary['profit'] / summary['revenue'] * 100) if summary['revenue'] else 0:.1f}%"
                         ]
                     }
                     summary_df = pd.DataFrame(summary_data)
@@ -1244,31 +1958,50 @@ if not admin_widget_view:
                     st.download_button(
                         label="💡 Download Summary",
                         data=csv_summary,
-                        file_name=f"swawe_summary_{datetime.now().strftime('%Y%m%d')}.csv",
+                        file_name=f"swawe_summary_{range_start:%Y%m%d}-{range_end:%Y%m%d}.csv",
                         mime="text/csv",
                         use_container_width=True
                     )
+        elif data_loaded:
+            st.info(EMPTY_RANGE_MESSAGE)
         else:
             st.info("🔍 No data loaded. Go to Executive Dashboard and refresh data first.")
 
 # Premium Footer
-st.markdown("""
-<div style="
-    margin-top: 4rem; 
-    padding: 3rem 2rem; 
-    text-align: center; 
-    background: linear-gradient(135deg, rgba(255,107,53,0.1) 0%, rgba(26,26,46,0.1) 100%);
-    border-top: 1px solid rgba(255,107,53,0.2);
-    border-radius: 20px 20px 0 0;
-">
-    <div style="color: #666; font-size: 1rem; margin-bottom: 1rem;">
-        <img src="https://cdn.shopify.com/s/files/1/0604/9733/0266/files/bimi-svg-tiny-12-ps.svg?v=1754005795" 
-             style="height: 24px; margin-right: 10px; vertical-align: middle;" 
-             alt="SWAWE Logo">
-        <strong style="color: #FF6B35;">SWAWE</strong> Dashboard | Fashion Analytics & Business Intelligence
-    </div>
-    <div style="color: rgba(255,255,255,0.6); font-size: 0.9rem;">
-        Powered by advanced analytics • Real-time Shopify integration • Mobile optimized
-    </div>
-</div>
-""", unsafe_allow_html=True)
+render_html(swawe_theme.FOOTER_HTML)
+
+# Render Diagnostics: bytes pushed to the browser by this rerun versus the budget
+with st.sidebar.expander("🩺 **Render Diagnostics**", expanded=False):
+    st.checkbox("Measure charts and tables", key='show_render_diagnostics',
+                help="Serializes each chart and sizes each table to measure the full payload")
+    meter = st.session_state.payload_meter
+    rerun_bytes = sum(meter.values())
+    budget_bytes = settings['payload_budget_kb'] * 1024
+
+    history = session_cached('payload_history', None, list)
+    history.append(rerun_bytes)
+    del history[:-20]
+
+    st.progress(min(rerun_bytes / budget_bytes, 1.0))
+    st.markdown(f"**This rerun:** {rerun_bytes / 1024:,.1f} KB of {settings['payload_budget_kb']:,} KB budget")
+    for kind, nbytes in sorted(meter.items(), key=lambda item: -item[1]):
+        st.caption(f"{kind}: {nbytes / 1024:,.1f} KB")
+    st.caption(f"Largest of last {len(history)} reruns: {max(history) / 1024:,.1f} KB")
+    if not measure_payload:
+        st.caption("Uncached charts and tables are not measured until the checkbox above is enabled.")
+    # Server memory: the evictable caches against their budget, plus the shared data
+    usage = memory_budget.usage(session_id)
+    st.progress(min(usage['nbytes'] / usage['max_bytes'], 1.0))
+    st.markdown(f"**Cache memory:** {usage['nbytes'] / 2 ** 20:,.1f} MB of {settings['memory_budget_mb']:,} MB budget")
+    for kind, nbytes in sorted(usage['by_kind'].items(), key=lambda item: -item[1]):
+        st.caption(f"{kind}: {nbytes / 2 ** 20:,.2f} MB")
+    lookups = usage['hits'] + usage['misses']
+    st.caption(f"This session: {usage['owner_bytes'] / 2 ** 20:,.2f} MB · {usage['sessions']:,} sessions cached · "
+               f"{usage['hits'] / lookups if lookups else 0:.0%} hits · {usage['evictions']:,} evicted · "
+               f"{usage['dropped_sessions']:,} idle sessions released")
+    if data_loaded:
+        dataset_bytes = sum(get_partition(name).nbytes() for name in loaded_stores)
+        st.caption(f"Shared line items: {dataset_bytes / 2 ** 20:,.1f} MB for {len(loaded_stores)} "
+                   f"store{'s' if len(loaded_stores) != 1 else ''} (not evicted)")
+    if rerun_bytes > budget_bytes:
+        st.warning(f"⚠️ Rerun payload is over budget by {(rerun_bytes - budget_bytes) / 1024:,.1f} KB")
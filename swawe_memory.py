@@ -0,0 +1,192 @@
+"""One memory budget for everything the dashboard caches in a server process.
+
+Sessions keep their derived data here rather than in st.session_state:
+per-store aggregates, cost overlays, analytics, and encoded export files.
+Built charts, which all sessions share, are kept here too. Every entry is
+sized when it is stored. Once the total passes the budget, the least
+recently used entries are evicted, whichever session they belong to, and
+they are simply rebuilt if they are asked for again.
+
+A session that has not rerun for a while gives up all of its entries, so
+browser tabs left open do not hold memory that active users need; its
+release hook then clears whatever else it keeps, such as settings. The shared
+line items themselves (swawe_store) are the data every cache is derived from
+and are never evicted; they are only reported. Only the standard library is
+imported here.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_nbytes(value, _seen=None):
+    """Approximate memory held by a cached value.
+
+    pandas objects report their deep memory usage, arrays their buffers, and
+    containers and plain objects the sum of their contents.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    memory_usage = getattr(value, 'memory_usage', None)
+    if callable(memory_usage):
+        # DataFrame returns a per-column Series, Series and Index an int
+        usage = memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_nbytes(item, _seen) for item in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        return size + estimate_nbytes(vars(value), _seen)
+    return size
+
+
+def _kind(name):
+    return name[0] if isinstance(name, tuple) else name
+
+
+class MemoryBudget:
+    """Cached values of all sessions, least recently used evicted past a byte budget.
+
+    An entry lives in a slot (owner, name). The owner is a session id, or
+    None for entries that every session shares. Each slot holds one value
+    together with the key it was built for, so a new data or cost version
+    replaces the old value instead of piling up next to it. Shared values
+    may be read by several threads, so they must not be modified once built;
+    a session may grow its own values in place and put() them again.
+    """
+
+    def __init__(self, max_bytes, idle_seconds):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dropped_sessions = 0
+        # (owner, name) -> (key, value, nbytes), least recently used first
+        self._entries = OrderedDict()
+        self._last_seen = {}
+        self._release_hooks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_build(self, owner, name, key, build, size=estimate_nbytes):
+        """Return (value, nbytes) cached in slot (owner, name) for key.
+
+        build() only runs when the slot is empty or holds another key, and
+        size(value) measures what it built.
+        """
+        slot = (owner, name)
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(slot)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        # Build outside the lock; of two threads building one slot at once,
+        # the later store wins
+        value = build()
+        return value, self.put(owner, name, key, value, size)
+
+    def put(self, owner, name, key, value, size=estimate_nbytes):
+        """Store value in slot (owner, name) for key, replacing what it held, and return its size.
+
+        Also used to re-measure a value its owner has grown in place.
+        """
+        slot = (owner, name)
+        nbytes = size(value)
+        with self._lock:
+            self._discard(slot)
+            self._entries[slot] = (key, value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                evicted_slot = next(iter(self._entries))
+                if evicted_slot == slot:
+                    break
+                self._discard(evicted_slot)
+                self.evictions += 1
+        return nbytes
+
+    def _discard(self, slot):
+        entry = self._entries.pop(slot, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+
+    def seen(self, owner, now=None):
+        """Note that a session is active, and release the entries of sessions idle for too long.
+
+        Returns the number of sessions released.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_seen[owner] = now
+            idle = [session for session, last_seen in self._last_seen.items()
+                    if now - last_seen > self.idle_seconds]
+            hooks = []
+            for session in idle:
+                del self._last_seen[session]
+                self._drop_owner(session)
+                hooks.append(self._release_hooks.pop(session, None))
+            self.dropped_sessions += len(idle)
+        self._run_hooks(hooks)
+        return len(idle)
+
+    def on_release(self, owner, hook):
+        """Call hook() when the session is released, to free what it keeps outside the budget"""
+        with self._lock:
+            self._release_hooks[owner] = hook
+
+    def drop(self, owner):
+        """Release every entry of one session"""
+        with self._lock:
+            self._last_seen.pop(owner, None)
+            self._drop_owner(owner)
+            hook = self._release_hooks.pop(owner, None)
+        self._run_hooks([hook])
+
+    @staticmethod
+    def _run_hooks(hooks):
+        # Outside the lock: a hook may take locks of its own
+        for hook in hooks:
+            if hook is not None:
+                hook()
+
+    def _drop_owner(self, owner):
+        for slot in [slot for slot in self._entries if slot[0] == owner]:
+            self._discard(slot)
+
+    def usage(self, owner=None):
+        """Current usage: totals, bytes per kind of entry, and the share of one session (owner)"""
+        with self._lock:
+            by_kind = {}
+            owner_bytes = 0
+            sessions = set()
+            for (entry_owner, name), (_, _, nbytes) in self._entries.items():
+                by_kind[_kind(name)] = by_kind.get(_kind(name), 0) + nbytes
+                if entry_owner is not None:
+                    sessions.add(entry_owner)
+                if owner is not None and entry_owner == owner:
+                    owner_bytes += nbytes
+            return {
+                'nbytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'entries': len(self._entries),
+                'sessions': len(sessions),
+                'by_kind': by_kind,
+                'owner_bytes': owner_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'dropped_sessions': self.dropped_sessions,
+            }
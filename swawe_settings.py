@@ -0,0 +1,127 @@
+"""Settings from secrets.toml and where each store's files live on disk.
+
+The dashboard reads secrets through st.secrets and the command line
+(swawe_cli) parses secrets.toml itself, but both build their settings here,
+so a store or default configured for one means the same for the other.
+Snapshots, backfill checkpoints and raw order archives all name their files
+with store_path(), and store_lock() keeps two processes from writing one
+store's files at once. Only the standard library is imported here.
+"""
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; processes there are not kept apart
+    fcntl = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SNAPSHOT_DIR = os.path.join(APP_DIR, '.swawe_cache')
+_CUSTOMER_KEY_FILE = 'customer_id.key'
+
+
+def store_path(directory, store_name, suffix):
+    """Path of one store's file or directory, with the store name made safe as a file name"""
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9_.-]', '_', store_name) + suffix)
+
+
+@contextmanager
+def store_lock(directory, store_name, blocking=True):
+    """Hold one store's lock file across processes, yielding whether it was taken.
+
+    Dashboard syncs and appends and ``swawe_cli reprocess`` all rewrite the
+    store's archive, checkpoint and snapshot, so each holds this while it
+    does. With ``blocking=False`` a lock held elsewhere yields False at once
+    instead of waiting. Without a directory there are no shared files and the
+    lock is always taken.
+    """
+    if not directory or fcntl is None:
+        yield True
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(store_path(directory, store_name, '.lock'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def customer_id_key(secret, directory):
+    """Key for swawe_core.customer_id() hashes.
+
+    Derived from the CUSTOMER_ID_KEY secret when one is set. Otherwise a
+    random key is drawn once and kept next to the snapshots, so ids stay the
+    same across restarts and for the CLI; with nowhere to keep it, each
+    process draws its own, as nothing it hashes outlives it.
+    """
+    if secret:
+        return hashlib.blake2b(str(secret).encode(), digest_size=32).digest()
+    if not directory:
+        return os.urandom(32)
+    path = os.path.join(directory, _CUSTOMER_KEY_FILE)
+    try:
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as key_file:
+                key_file.write(os.urandom(32))
+            os.chmod(temp_path, 0o600)
+            try:
+                # Linked rather than renamed: of two processes starting together, the first key stays
+                os.link(temp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temp_path)
+        with open(path, 'rb') as key_file:
+            return key_file.read()
+    except OSError:
+        # A directory that cannot be written cannot hold snapshots either
+        return os.urandom(32)
+
+
+def configured_stores(read):
+    """Stores from [[stores]] tables (name, url, token), falling back to the single-store keys"""
+    stores = [
+        {'name': str(store['name']), 'url': str(store['url']), 'token': str(store['token'])}
+        for store in read("stores", [])
+        if store.get('url') and store.get('token')
+    ]
+    if not stores:
+        store_url = read("SHOPIFY_STORE_URL", "")
+        access_token = read("SHOPIFY_ACCESS_TOKEN", "")
+        if store_url and access_token:
+            stores.append({'name': store_url.split('.')[0], 'url': store_url, 'token': access_token})
+    return stores
+
+
+def read_settings(read):
+    """Credentials and settings, with their defaults, from ``read(key, default)`` over the secrets"""
+    snapshot_dir = str(read("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR))
+    return {
+        'stores': configured_stores(read),
+        'payload_budget_kb': int(read("PAYLOAD_BUDGET_KB", 256)),
+        # Memory for cached charts, aggregates and exports of all sessions, see get_memory_budget
+        'memory_budget_mb': int(read("MEMORY_BUDGET_MB", 256)),
+        # A session's cached data is released after this long without a rerun
+        'session_idle_minutes': int(read("SESSION_IDLE_MINUTES", 30)),
+        # Port for the read-only JSON summary endpoint (0 disables it in the dashboard)
+        'summary_api_port': int(read("SUMMARY_API_PORT", 0)),
+        'summary_api_host': str(read("SUMMARY_API_HOST", "127.0.0.1")),
+        # Seconds between live-mode checks for new orders, see get_order_poller
+        'live_refresh_seconds': int(read("LIVE_REFRESH_SECONDS", 60)),
+        # [[classification_rules]] tables: category plus one of product_type, name, sku_prefix, tag
+        'classification_rules': [dict(rule) for rule in read("classification_rules", [])] or None,
+        'classification_fallback': str(read("CLASSIFICATION_FALLBACK", "Other")),
+        # Where synced line items are snapshotted for warm starts; empty disables snapshots
+        'snapshot_dir': snapshot_dir,
+        # Keys the customer ids kept in line items, see customer_id_key
+        'customer_id_key': customer_id_key(read("CUSTOMER_ID_KEY", ""), snapshot_dir),
+    }
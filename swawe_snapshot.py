@@ -0,0 +1,148 @@
+"""On-disk snapshots of each store's processed line items.
+
+Snapshots are uncompressed Arrow IPC files, written after every sync and
+opened memory-mapped. A restarted server or a new session can render from the
+last sync without downloading anything, and processes that open the same
+snapshot share its pages through the OS page cache instead of each holding a
+private copy.
+
+Rows appended between syncs are saved as small delta files next to the
+snapshot rather than by rewriting it. Each full write starts a new
+generation, and only the deltas of the snapshot's own generation are read
+back, so deltas left over from an older snapshot are never applied to a
+newer one.
+
+Only cost-free line items are stored: profits depend on each session's cost
+settings and are joined on after loading. pyarrow is imported by the functions
+that read or write, so checking whether a snapshot exists stays cheap.
+"""
+import json
+import os
+import secrets
+
+from swawe_settings import store_path
+
+SNAPSHOT_SUFFIX = '.arrow'
+_METADATA_KEY = b'swawe'
+_GENERATION_KEY = b'swawe_generation'
+
+
+def snapshot_path(directory, store_name):
+    """File for one store's snapshot"""
+    return store_path(directory, store_name, SNAPSHOT_SUFFIX)
+
+
+def deltas_dir(directory, store_name):
+    """Directory holding the deltas appended to one store's snapshot"""
+    return store_path(directory, store_name, '.deltas')
+
+
+def snapshot_mtime(directory, store_name):
+    """Modification time in ns of a store's snapshot or its latest delta, or None if there is no snapshot"""
+    try:
+        mtime = os.stat(snapshot_path(directory, store_name)).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        # Adding a delta file updates its directory's time
+        return max(mtime, os.stat(deltas_dir(directory, store_name)).st_mtime_ns)
+    except OSError:
+        return mtime
+
+
+def _write_table(path, sales_df, metadata, generation=None):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(sales_df, preserve_index=False)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[_METADATA_KEY] = json.dumps(metadata or {}, default=str).encode()
+    if generation is not None:
+        schema_metadata[_GENERATION_KEY] = generation.encode()
+    table = table.replace_schema_metadata(schema_metadata)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(temp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+
+def _delta_names(directory, store_name, generation):
+    try:
+        names = os.listdir(deltas_dir(directory, store_name))
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.startswith(f"{generation}-") and name.endswith(SNAPSHOT_SUFFIX))
+
+
+def write_snapshot(directory, store_name, sales_df, metadata=None):
+    """Persist one store's line-item frame, replacing the previous snapshot and its deltas atomically.
+
+    Readers that still map the old file keep a valid view of it until they
+    drop it, so writing never disturbs other sessions or processes. Returns
+    the new snapshot's generation, which append_delta() takes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    generation = secrets.token_hex(8)
+    _write_table(snapshot_path(directory, store_name), sales_df, metadata, generation)
+    # The new generation ignores them already; this only frees the space
+    path = deltas_dir(directory, store_name)
+    for name in os.listdir(path) if os.path.isdir(path) else ():
+        if not name.startswith(f"{generation}-"):
+            try:
+                os.unlink(os.path.join(path, name))
+            except FileNotFoundError:
+                pass
+    return generation
+
+
+def snapshot_state(directory, store_name):
+    """(generation, number of deltas) of a store's snapshot on disk, or None if there is none"""
+    import pyarrow as pa
+
+    try:
+        with pa.memory_map(snapshot_path(directory, store_name), 'r') as source:
+            schema_metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    generation = schema_metadata.get(_GENERATION_KEY, b'').decode()
+    return generation, len(_delta_names(directory, store_name, generation))
+
+
+def append_delta(directory, store_name, generation, sales_df, metadata=None):
+    """Save line items appended since the snapshot of ``generation`` (plus any earlier deltas).
+
+    ``metadata`` replaces the snapshot's when it is read back. Callers check
+    with snapshot_state() that the snapshot on disk is still theirs.
+    """
+    path = deltas_dir(directory, store_name)
+    os.makedirs(path, exist_ok=True)
+    sequence = len(_delta_names(directory, store_name, generation))
+    _write_table(os.path.join(path, f"{generation}-{sequence:06d}{SNAPSHOT_SUFFIX}"), sales_df, metadata)
+
+
+def read_snapshot(directory, store_name):
+    """Open one store's snapshot memory-mapped, with its deltas; returns (sales_df, metadata).
+
+    The metadata is that of the latest delta, plus 'snapshot_generation' and
+    'snapshot_deltas' saying which files were read.
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(snapshot_path(directory, store_name), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    metadata = json.loads(table.schema.metadata.get(_METADATA_KEY, b'{}'))
+    generation = table.schema.metadata.get(_GENERATION_KEY, b'').decode()
+    deltas = [pa.ipc.open_file(pa.memory_map(os.path.join(deltas_dir(directory, store_name), name), 'r')).read_all()
+              for name in _delta_names(directory, store_name, generation)]
+    if deltas:
+        metadata = json.loads(deltas[-1].schema.metadata.get(_METADATA_KEY, b'{}'))
+        # A column with no values in one batch has no type of its own there
+        table = pa.concat_tables([table] + deltas, promote_options='permissive')
+    # split_blocks keeps numeric columns as views of the mapped buffers
+    # instead of consolidating them into freshly allocated blocks
+    sales_df = table.to_pandas(split_blocks=True)
+    if deltas and not sales_df['date'].is_monotonic_increasing:
+        # Deltas of late-dated orders belong earlier in the history
+        sales_df = sales_df.sort_values('date', kind='stable', ignore_index=True)
+    return sales_df, dict(metadata, snapshot_generation=generation, snapshot_deltas=len(deltas))
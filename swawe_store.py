@@ -0,0 +1,208 @@
+"""Process-wide sales data shared by every dashboard session.
+
+Each store's line items live here once per server process as an immutable
+partition (see swawe_core.SalesPartition). Sessions never copy or modify
+them: their cost settings and date range are applied at query time to just
+the rows being read, so another concurrent user costs a few small aggregates
+rather than another copy of the history.
+
+Nothing heavy is imported until a partition is built, so an empty dashboard
+can hold a store without loading pandas.
+"""
+import threading
+import time
+from collections import deque
+
+import swawe_snapshot
+
+
+class SharedSalesStore:
+    """Latest partition per store.
+
+    Publishing swaps in a new partition instead of changing the current one,
+    so a reader in another thread keeps a consistent frame for as long as it
+    holds it. Versions increase across all stores and never repeat, which
+    makes them safe cache keys for session-level aggregates.
+
+    Publishes that only add rows go through append(), which extends the
+    current partition by just those rows and logs them as a delta. The most
+    recent deltas are kept per store, so a viewer holding an older version
+    can catch up by folding in just the new rows (deltas_since), and saving
+    an appended partition only writes its new rows next to the last
+    snapshot. Writes to one store are serialized, so concurrent appends
+    never lose each other's rows.
+    """
+
+    # Metadata that snapshots keep and appends carry over
+    PERSISTED_META = ('synced_at', 'pipeline', 'backfill')
+
+    def __init__(self, max_deltas=256, max_snapshot_deltas=64):
+        self._partitions = {}
+        self._next_version = 1
+        self._lock = threading.Lock()
+        # store -> deque of (version, delta frame), contiguous since the last full publish
+        self._deltas = {}
+        self._max_deltas = max_deltas
+        self._write_locks = {}
+        # store -> set of its order names, grown by appends; built on first use
+        self._order_names = {}
+        # store -> {'version', 'generation', 'deltas'} of the snapshot on disk, as of this process's last save or load
+        self._saved = {}
+        # Delta files a snapshot collects before it is rewritten whole
+        self._max_snapshot_deltas = max_snapshot_deltas
+
+    def get(self, store_name):
+        return self._partitions.get(store_name)
+
+    def _write_lock(self, store_name):
+        with self._lock:
+            return self._write_locks.setdefault(store_name, threading.Lock())
+
+    def publish(self, store_name, sales_df, meta=None):
+        """Replace one store's data with a new partition, returning it.
+
+        Viewers of earlier versions can no longer catch up through deltas.
+        """
+        from swawe_core import SalesPartition
+
+        with self._write_lock(store_name):
+            return self._install(store_name, meta, None,
+                                 lambda version, meta: SalesPartition(sales_df, version, meta))
+
+    def append(self, store_name, new_sales, meta=None, orders=()):
+        """Add new line items to one store's current partition and install the result, returning it.
+
+        The read, extend and install happen under the store's write lock, and
+        the rows are logged as a delta. ``meta`` updates the persisted
+        metadata carried over from the current partition, and the pending
+        actions of ``orders``, the raw orders the rows came from, are folded
+        into its pipeline.
+        """
+        from swawe_core import SalesPartition, empty_pipeline, fold_pipeline
+
+        with self._write_lock(store_name):
+            current = self.get(store_name)
+            if current is None:
+                return self._install(store_name, meta, None,
+                                     lambda version, meta: SalesPartition(new_sales, version, meta))
+            merged_meta = {key: current.meta.get(key) for key in self.PERSISTED_META}
+            merged_meta.update(meta or {})
+            if orders:
+                # Copied, since the current partition's metadata is shared with its readers
+                pipeline = merged_meta['pipeline'] or empty_pipeline()
+                pending = len(pipeline['pending_orders_list'])
+                pipeline = fold_pipeline(dict(pipeline, pending_orders_list=list(pipeline['pending_orders_list'])),
+                                         orders)
+                pipeline['pending_orders_list'][pending:] = [dict(entry, store=store_name)
+                                                             for entry in pipeline['pending_orders_list'][pending:]]
+                merged_meta['pipeline'] = pipeline
+            return self._install(store_name, merged_meta, new_sales,
+                                 lambda version, meta: current.extended(new_sales, version, meta))
+
+    def _install(self, store_name, meta, delta, build):
+        # Callers hold the store's write lock
+        with self._lock:
+            version = self._next_version
+            self._next_version += 1
+        partition = build(version, dict(meta or {}, published_ns=time.time_ns()))
+        with self._lock:
+            # Of two concurrent publishes for a store, the later one wins
+            current = self._partitions.get(store_name)
+            if current is None or current.version < version:
+                self._partitions[store_name] = partition
+                deltas = self._deltas.setdefault(store_name, deque(maxlen=self._max_deltas))
+                if delta is None or current is None:
+                    deltas.clear()
+                    self._order_names.pop(store_name, None)
+                elif store_name in self._order_names:
+                    self._order_names[store_name].update(delta['order_name'])
+                deltas.append((version, delta))
+        return partition
+
+    def order_names(self, store_name):
+        """Order names a store holds, as one set that appends grow instead of a new set per call.
+
+        The set is shared: callers test membership and never modify it.
+        """
+        with self._write_lock(store_name):
+            names = self._order_names.get(store_name)
+            if names is None:
+                partition = self.get(store_name)
+                names = set() if partition is None else set(partition.frame['order_name'])
+                with self._lock:
+                    self._order_names[store_name] = names
+            return names
+
+    def deltas_since(self, store_name, version):
+        """(version, frame) of each batch of rows added to a store after ``version``, oldest first.
+
+        Returns None when that version cannot be caught up by deltas alone:
+        the data was replaced since, or the deltas have been trimmed.
+        """
+        with self._lock:
+            deltas = list(self._deltas.get(store_name, ()))
+        if not deltas or deltas[0][0] > version:
+            return None
+        return [(delta_version, delta) for delta_version, delta in deltas if delta_version > version]
+
+    def load_snapshots(self, directory, store_names):
+        """Publish snapshots newer than what this process holds: every store at
+        startup, or ones another server process has synced since.
+
+        Returns {store_name: error} for snapshots that could not be opened.
+        """
+        errors = {}
+        for store_name in store_names:
+            mtime = swawe_snapshot.snapshot_mtime(directory, store_name)
+            if mtime is None:
+                continue
+            current = self.get(store_name)
+            if current is not None and (current.meta.get('snapshot_mtime') == mtime
+                                        or current.meta['published_ns'] >= mtime):
+                continue
+            try:
+                sales_df, meta = swawe_snapshot.read_snapshot(directory, store_name)
+            except (OSError, ValueError) as e:
+                errors[store_name] = e
+                continue
+            from swawe_core import SalesPartition
+
+            generation, delta_count = meta.pop('snapshot_generation'), meta.pop('snapshot_deltas')
+            with self._write_lock(store_name):
+                partition = self._install(store_name, dict(meta, snapshot_mtime=mtime, restored=True), None,
+                                          lambda version, meta: SalesPartition(sales_df, version, meta))
+                self._saved[store_name] = {'version': partition.version, 'generation': generation,
+                                           'deltas': delta_count}
+        return errors
+
+    def save_snapshot(self, directory, store_name, partition):
+        """Persist a published partition so restarts and other processes can pick it up.
+
+        When the snapshot on disk is the one this process last saved or
+        loaded and the partition was only appended to since, just the new
+        rows are written, as one delta; otherwise, or once the snapshot has
+        collected max_snapshot_deltas deltas, the partition is written whole.
+        Returns False without writing when a newer partition has replaced it
+        since, because whoever published that one saves it.
+        """
+        with self._write_lock(store_name):
+            if self.get(store_name) is not partition:
+                return False
+            meta = {key: partition.meta.get(key) for key in self.PERSISTED_META}
+            saved = self._saved.get(store_name)
+            deltas = self.deltas_since(store_name, saved['version']) if saved is not None else None
+            if (deltas is None or not saved['generation'] or saved['deltas'] >= self._max_snapshot_deltas
+                    or swawe_snapshot.snapshot_state(directory, store_name) != (saved['generation'], saved['deltas'])):
+                saved = {'generation': swawe_snapshot.write_snapshot(directory, store_name, partition.base_frame(), meta),
+                         'deltas': 0}
+            elif deltas:
+                from swawe_core import append_sales
+
+                new_rows = deltas[0][1]
+                for _, delta in deltas[1:]:
+                    new_rows = append_sales(new_rows, delta)
+                swawe_snapshot.append_delta(directory, store_name, saved['generation'], new_rows, meta)
+                saved = dict(saved, deltas=saved['deltas'] + 1)
+            self._saved[store_name] = dict(saved, version=partition.version)
+            partition.meta['snapshot_mtime'] = swawe_snapshot.snapshot_mtime(directory, store_name)
+        return True
@@ -0,0 +1,32 @@
+"""Static SWAWE branding assets, evaluated once per process on first import"""
+import os
+
+# Enhanced CSS with premium branding. The stylesheet ships as a static file so the
+# browser fetches (and caches) it once instead of receiving it on every rerun.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STYLESHEET_LINK = '<link rel="stylesheet" href="app/static/swawe.css">'
+
+with open(os.path.join(STATIC_DIR, 'swawe.css'), encoding='utf-8') as _css_file:
+    # Inline fallback for servers started without static file serving
+    PREMIUM_CSS = f"<style>\n{_css_file.read()}</style>"
+
+LOGO_URL = "https://cdn.shopify.com/s/files/1/0604/9733/0266/files/bimi-svg-tiny-12-ps.svg?v=1754005795"
+
+# Header and footer are sent on every rerun, so their styling lives in
+# swawe.css and only the bare markup is inlined
+HEADER_HTML = (
+    '<div class="swawe-header">'
+    f'<img class="swawe-header-logo" src="{LOGO_URL}" alt="SWAWE Logo">'
+    '<h1 class="swawe-logo">SWAWE</h1>'
+    '<p class="swawe-tagline">Fashion Analytics & Business Intelligence</p>'
+    '</div>'
+)
+
+FOOTER_HTML = (
+    '<div class="swawe-footer">'
+    f'<div class="swawe-footer-brand"><img src="{LOGO_URL}" alt="SWAWE Logo">'
+    '<strong>SWAWE</strong> Dashboard | Fashion Analytics & Business Intelligence</div>'
+    '<div class="swawe-footer-note">'
+    'Powered by advanced analytics • Real-time Shopify integration • Mobile optimized</div>'
+    '</div>'
+)